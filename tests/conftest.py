@@ -0,0 +1,25 @@
+import pathlib
+
+import pytest
+
+import vhkt.filestorage
+
+
+class FakeClock:
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def hk_storage():
+    return vhkt.filestorage.FileHotKeysStorage(pathlib.Path(__file__).parent.parent / 'hotkeys' / 'vim.yaml',
+                                               use_cache=False)
+
+
+@pytest.fixture
+def storage(hk_storage, tmp_path):
+    return vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
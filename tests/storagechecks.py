@@ -0,0 +1,64 @@
+from vhkt.basic import BasicLearningResultsStorage
+
+
+def action_results(storage, action_key):
+    return (
+        storage.action_success(action_key),
+        storage.action_guesses(action_key),
+        storage.action_correct_guesses(action_key),
+        storage.action_error_guesses(action_key),
+        storage.action_learning_in_process(action_key),
+        storage.action_skipped(action_key),
+    )
+
+
+def aggregates(storage):
+    return (
+        storage.actions_learned_count,
+        storage.actions_learning_in_process_count,
+        storage.actions_guesses_count,
+        storage.actions_error_guesses_count,
+        storage.skipped_actions_count,
+        storage.actions_to_learn_count,
+        storage.actions_count,
+        storage.all_actions_learned_successfully,
+    )
+
+
+def recounted_aggregates(storage):
+    # Same fields as "aggregates" counted by walking all actions, without scheduler
+    keys = storage.actions_keys
+    learned_count = BasicLearningResultsStorage.actions_learned_count.fget(storage)
+    skipped_count = len([key for key in keys if storage.action_skipped(key)])
+    return (
+        learned_count,
+        BasicLearningResultsStorage.actions_learning_in_process_count.fget(storage),
+        BasicLearningResultsStorage.actions_guesses_count.fget(storage),
+        BasicLearningResultsStorage.actions_error_guesses_count.fget(storage),
+        skipped_count,
+        len(keys) - learned_count - skipped_count,
+        len(keys),
+        bool(keys) and all(storage.action_success(key) or storage.action_skipped(key) for key in keys),
+    )
+
+
+def play_random_operations(storages, rnd, operations_count, remove=False):
+    # Applies same random changes to all storages and checks that they report same results as first one
+    for _ in range(operations_count):
+        action_key = rnd.choice(storages[0].actions_keys)
+        operation = rnd.random()
+        for storage in storages:
+            if operation < 0.5:
+                storage.set_action_guess_correct(action_key)
+            elif operation < 0.85:
+                storage.set_action_guess_wrong(action_key)
+            elif operation < 0.9:
+                storage.skip_action(action_key)
+            elif operation < 0.95 or not remove or len(storage.actions_keys) == 1:
+                storage.set_action_learned_successfully(action_key)
+            else:
+                storage.remove_results_for_action(action_key)
+        for storage in storages[1:]:
+            if action_key in storages[0].actions_keys:
+                assert action_results(storage, action_key) == action_results(storages[0], action_key)
+            assert aggregates(storage) == aggregates(storages[0])
@@ -0,0 +1,85 @@
+import io
+import json
+import pathlib
+import shutil
+import subprocess
+import sys
+
+from vhkt.batch import BatchTutor
+
+REPO_DIR_PATH = pathlib.Path(__file__).parent.parent
+
+
+def run_batch(hk_storage, storage, records, buffer_lines=BatchTutor.DEFAULT_BUFFER_LINES):
+    fin = io.StringIO(''.join((record if isinstance(record, str) else json.dumps(record)) + '\n' for record in records))
+    fout = io.StringIO()
+    BatchTutor(hk_storage, storage, fin, fout, buffer_lines).tutor()
+    return [json.loads(line) for line in fout.getvalue().splitlines()]
+
+
+def test_answers_for_given_action(hk_storage, storage):
+    action_key = 'delete_current_line'
+    results = run_batch(hk_storage,
+                        storage,
+                        [{'action': action_key, 'answer': 'd,d'},
+                         {'action': action_key, 'answer': ['x']},
+                         {'action': action_key, 'skip': True}])
+    assert results[0] == {'action': action_key,
+                          'answer': ['d', 'd'],
+                          'correct': True,
+                          'hotkeys': ['dd'],
+                          'learned': False,
+                          'line': 1}
+    assert results[1]['correct'] is False
+    assert results[2]['skipped'] is True
+    assert results[3]['done'] is True
+    assert (results[3]['answers'], results[3]['correct_answers']) == (2, 1)
+    assert storage.action_guesses(action_key) == 2
+    assert storage.action_skipped(action_key)
+
+
+def test_answers_for_asked_questions(hk_storage, storage):
+    # Correct answer for each asked action is known only from result, so first answer is wrong on purpose
+    records = [{'answer': 'no such hot key'}]
+    results = run_batch(hk_storage, storage, records)
+    assert results[0]['question'].startswith('WHAT IS')
+    assert results[0]['correct'] is False
+    for _ in range(len(hk_storage.actions_keys) * 3):
+        results = run_batch(hk_storage, storage, records)
+        if results[-1]['all_learned']:
+            break
+        storage.set_action_learned_successfully(results[0]['action'])
+    assert results[-1]['all_learned']
+    assert 'error' in run_batch(hk_storage, storage, records)[0]
+
+
+def test_bad_records_reported(hk_storage, storage):
+    results = run_batch(hk_storage,
+                        storage,
+                        ['not json', '', '[1]', {'action': 'no_such_action', 'answer': 'x'}, {'answer': 1}],
+                        buffer_lines=1)
+    assert [result['line'] for result in results[:-1]] == [1, 3, 4, 5]
+    assert all('error' in result for result in results[:-1])
+    assert results[-1]['answers'] == 0
+
+
+def test_batch_interface_mode(tmp_path):
+    shutil.copy(REPO_DIR_PATH / 'hotkeys' / 'vim.yaml', tmp_path / 'vim.yaml')
+    (tmp_path / 'answers.jsonl').write_text(json.dumps({'action': 'undo', 'answer': 'u'}) + '\n')
+    process = subprocess.run([sys.executable,
+                              str(REPO_DIR_PATH / 'vhkt.py'),
+                              '-i',
+                              'batch',
+                              '--batch-input',
+                              str(tmp_path / 'answers.jsonl'),
+                              '-l',
+                              str(tmp_path / 'results.yaml'),
+                              str(tmp_path / 'vim.yaml')],
+                             capture_output=True,
+                             text=True,
+                             cwd=tmp_path,
+                             check=True)
+    results = [json.loads(line) for line in process.stdout.splitlines()]
+    assert results[0]['correct'] is True
+    assert results[1]['done'] is True
+    assert (tmp_path / 'results.yaml').is_file()
@@ -0,0 +1,71 @@
+import pathlib
+import shutil
+
+import pytest
+
+import vhkt.catalog
+import vhkt.filestorage
+
+
+@pytest.fixture
+def hotkeys_dir_path(tmp_path):
+    for hkdb_file_path in (pathlib.Path(__file__).parent.parent / 'hotkeys').glob('*.yaml'):
+        shutil.copy(hkdb_file_path, tmp_path)
+    return tmp_path
+
+
+def test_catalog_refresh(hotkeys_dir_path, monkeypatch):
+    catalog = vhkt.catalog.HotKeysCatalog(hotkeys_dir_path)
+    entries = catalog.refresh()
+    assert [entry.app_name for entry in entries] == ['Bash', 'Chrome', 'Vim']
+    vim_entry = entries[2]
+    assert vim_entry.actions_count == len(catalog.open(vim_entry).actions_keys)
+
+    loaded_files_names = []
+    original_init = vhkt.filestorage.FileHotKeysStorage.__init__
+
+    def tracking_init(self, hkdb_file_path, *args, **kwargs):
+        loaded_files_names.append(pathlib.Path(hkdb_file_path).name)
+        original_init(self, hkdb_file_path, *args, **kwargs)
+    monkeypatch.setattr(vhkt.filestorage.FileHotKeysStorage, '__init__', tracking_init)
+
+    (hotkeys_dir_path / 'chrome.yaml').unlink()
+    with open(hotkeys_dir_path / 'bash.yaml', 'a') as fout:
+        fout.write("  extra_action:\n    description: 'Extra'\n    hotkeys:\n      - 'x'\n")
+    catalog = vhkt.catalog.HotKeysCatalog(hotkeys_dir_path)
+    entries = catalog.refresh()
+    assert loaded_files_names == ['bash.yaml']
+    assert [entry.app_name for entry in entries] == ['Bash', 'Vim']
+    assert entries[0].actions_count == 16
+    assert entries[1] == vim_entry
+
+
+def test_catalog_skips_results_and_lists_broken_files(hotkeys_dir_path):
+    (hotkeys_dir_path / '.results-for-vim.yaml').write_text('actions: {}\n')
+    (hotkeys_dir_path / 'broken.yaml').write_text('actions:\n  undo: {}\n')
+    catalog = vhkt.catalog.HotKeysCatalog(hotkeys_dir_path, use_cache=False)
+    entries = catalog.refresh()
+    assert [(entry.app_name, entry.available) for entry in entries] == \
+        [('Bash', True), ('broken.yaml', False), ('Chrome', True), ('Vim', True)]
+    assert 'unavailable' in entries[1].title
+    assert not catalog.manifest_file_path.exists()
+
+
+def test_catalog_retries_broken_file_only_when_changed(hotkeys_dir_path, monkeypatch):
+    (hotkeys_dir_path / 'broken.yaml').write_text('actions:\n  undo: {}\n')
+    broken_entry, = [entry for entry in vhkt.catalog.HotKeysCatalog(hotkeys_dir_path).refresh() if not entry.available]
+
+    loaded_files_names = []
+    original_init = vhkt.filestorage.FileHotKeysStorage.__init__
+
+    def tracking_init(self, hkdb_file_path, *args, **kwargs):
+        loaded_files_names.append(pathlib.Path(hkdb_file_path).name)
+        original_init(self, hkdb_file_path, *args, **kwargs)
+    monkeypatch.setattr(vhkt.filestorage.FileHotKeysStorage, '__init__', tracking_init)
+
+    assert broken_entry in vhkt.catalog.HotKeysCatalog(hotkeys_dir_path).refresh()
+    assert loaded_files_names == []
+    shutil.copy(hotkeys_dir_path / 'vim.yaml', hotkeys_dir_path / 'broken.yaml')
+    entries = vhkt.catalog.HotKeysCatalog(hotkeys_dir_path).refresh()
+    assert loaded_files_names == ['broken.yaml']
+    assert all(entry.available for entry in entries)
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import vhkt.columnarstorage
+import vhkt.filestorage
+from vhkt.scheduler import LeitnerScheduler
+
+from tests.storagechecks import action_results, aggregates, play_random_operations
+
+
+def test_same_results_as_file_storage(hk_storage, tmp_path):
+    file_storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
+    columnar_storage = vhkt.columnarstorage.ColumnarLearningResultsStorage(tmp_path / 'results.columns', hk_storage)
+    play_random_operations((file_storage, columnar_storage), random.Random(2), 300, remove=True)
+    assert sorted(columnar_storage.actions_keys) == sorted(file_storage.actions_keys)
+    file_storage.save()
+    columnar_storage.save()
+
+    # Removed actions are added back on reload because they are still in hot keys storage
+    file_storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
+    reloaded_storage = vhkt.columnarstorage.ColumnarLearningResultsStorage(tmp_path / 'results.columns', hk_storage)
+    assert aggregates(reloaded_storage) == aggregates(file_storage)
+    for action_key in file_storage.actions_keys:
+        assert action_results(reloaded_storage, action_key) == action_results(file_storage, action_key)
+    assert reloaded_storage.random_nonlearned_action_key in file_storage._nonlearned_actions_keys
+
+
+def test_schedules_saved(hk_storage, tmp_path):
+    storage = vhkt.columnarstorage.ColumnarLearningResultsStorage(tmp_path / 'results.columns', hk_storage)
+    storage.set_scheduler(LeitnerScheduler())
+    action_key = storage.next_action_key
+    storage.set_action_guess_correct(action_key)
+    schedule = storage.action_schedule(action_key)
+    assert schedule
+    storage.save()
+    reloaded_storage = vhkt.columnarstorage.ColumnarLearningResultsStorage(tmp_path / 'results.columns', hk_storage)
+    assert reloaded_storage.action_schedule(action_key) == schedule
+    assert reloaded_storage.action_schedule(hk_storage.actions_keys[-1]) == {}
+
+
+def test_not_columnar_file_rejected(hk_storage, tmp_path):
+    (tmp_path / 'results.columns').write_text('actions: {}\n')
+    with pytest.raises(ValueError):
+        vhkt.columnarstorage.ColumnarLearningResultsStorage(tmp_path / 'results.columns', hk_storage)
+
+
+def test_import_results(hk_storage, tmp_path):
+    file_storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
+    for action_key in file_storage.actions_keys[:5]:
+        file_storage.set_action_guess_wrong(action_key)
+    file_storage.set_action_guess_correct(file_storage.actions_keys[0])
+    file_storage.skip_action(file_storage.actions_keys[6])
+    file_storage.set_action_learned_successfully(file_storage.actions_keys[7])
+    columnar_storage = vhkt.columnarstorage.ColumnarLearningResultsStorage(tmp_path / 'results.columns', hk_storage)
+    columnar_storage.import_results(file_storage)
+    assert aggregates(columnar_storage) == aggregates(file_storage)
+    for action_key in file_storage.actions_keys:
+        assert action_results(columnar_storage, action_key) == action_results(file_storage, action_key)
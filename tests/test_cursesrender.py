@@ -0,0 +1,74 @@
+import textwrap
+
+from vhkt.cursesrender import Alignment, DifferentialRenderer, LayoutCache, ScreenLine
+
+
+class RecordingWindow:
+
+    def __init__(self):
+        self.calls = []
+
+    def getmaxyx(self):
+        return 24, 80
+
+    def erase(self):
+        self.calls.append(('erase',))
+
+    def move(self, y, x):
+        pass
+
+    def clrtoeol(self):
+        self.calls.append(('clrtoeol',))
+
+    def addstr(self, y, x, text, attr):
+        self.calls.append(('addstr', y, text))
+
+    def noutrefresh(self):
+        pass
+
+
+def render(renderer, regions):
+    renderer.begin_frame()
+    for name, lines in regions.items():
+        renderer.set_region(name, lines)
+    renderer.end_frame()
+
+
+def test_only_changed_regions_redrawn():
+    window = RecordingWindow()
+    renderer = DifferentialRenderer(window, doupdate=lambda: None)
+    regions = {
+        'statistics': [ScreenLine(0, 0, 'stats', 0)],
+        'question': [ScreenLine(10, 5, 'question', 0)],
+        'input': [ScreenLine(12, 5, '> ', 0)],
+    }
+    render(renderer, regions)
+    assert window.calls[0] == ('erase',)
+    assert len([call for call in window.calls if call[0] == 'addstr']) == 3
+
+    window.calls = []
+    render(renderer, dict(regions, input=[ScreenLine(12, 5, '> 1', 0)]))
+    assert window.calls == [('clrtoeol',), ('addstr', 12, '> 1')]
+
+    window.calls = []
+    render(renderer, dict(regions, input=[ScreenLine(12, 5, '> 1', 0)]))
+    assert window.calls == []
+
+    window.calls = []
+    render(renderer, {'statistics': regions['statistics']})
+    assert window.calls == [('clrtoeol',), ('clrtoeol',)]
+
+
+def test_layout_cached(monkeypatch):
+    wraps = []
+    original_wrap = textwrap.wrap
+    monkeypatch.setattr(textwrap, 'wrap', lambda *args, **kwargs: wraps.append(args) or original_wrap(*args, **kwargs))
+    cache = LayoutCache()
+    lines = cache.layout('a b c d e f', 6, 0, 0, Alignment.TOP)
+    assert [line.text for line in lines] == ['a b c', 'd e f']
+    assert cache.layout('a b c d e f', 6, 0, 0, Alignment.TOP) is lines
+    assert len(wraps) == 1
+    assert [line.y for line in cache.layout('a b c d e f', 6, 23, 0, Alignment.BOTTOM)] == [22, 23]
+    assert [line.x for line in cache.layout('ab\nabcd', 10, 5, 0, Alignment.CENTER)] == [4, 3]
+    cache.clear()
+    assert len(cache) == 0
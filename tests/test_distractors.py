@@ -0,0 +1,45 @@
+import pathlib
+import random
+
+from vhkt.distractors import DistractorIndex, random_unique_items
+from vhkt.streamingstorage import StreamingFileHotKeysStorage
+
+
+def test_random_unique_items():
+    items = list(range(100))
+    assert sorted(random_unique_items(items, random.Random(0))) == items
+
+
+def test_distractors(hk_storage):
+    index = DistractorIndex(hk_storage)
+    rnd = random.Random(0)
+    for action_key in hk_storage.actions_keys:
+        correct_option = hk_storage.action_hotkeys_by_key(action_key)
+        distractors = index.distractors(action_key, 3, rnd)
+        assert len(distractors) == 3
+        assert len(set(distractors)) == len(distractors)
+        for option in distractors:
+            assert not set(option) & set(correct_option)
+
+
+def test_distractors_of_same_type(hk_storage):
+    index = DistractorIndex(hk_storage)
+    for action_key in hk_storage.actions_keys:
+        type_key = index._type_key(action_key)
+        correct_option = hk_storage.action_hotkeys_by_key(action_key)
+        same_type_options = {hk_storage.action_hotkeys_by_key(other_action_key)
+                             for other_action_key in hk_storage.actions_keys
+                             if index._type_key(other_action_key) == type_key}
+        same_type_distractors_count = sum(1
+                                          for option in same_type_options
+                                          if not set(option) & set(correct_option))
+        distractors = index.distractors(action_key, 3)
+        assert sum(1 for option in distractors if option in same_type_options) >= min(3, same_type_distractors_count)
+
+
+def test_distractors_load_only_drawn_actions():
+    storage = StreamingFileHotKeysStorage(pathlib.Path(__file__).parent.parent / 'hotkeys' / 'vim.yaml')
+    index = DistractorIndex(storage)
+    assert storage.loaded_actions_count == 0
+    assert len(index.distractors(storage.actions_keys[0], 3, random.Random(0))) == 3
+    assert storage.loaded_actions_count < len(storage.actions_keys)
@@ -0,0 +1,63 @@
+import marshal
+import pathlib
+import shutil
+
+import pytest
+
+import vhkt.filecache
+import vhkt.filestorage
+
+
+@pytest.fixture
+def hkdb_file_path(tmp_path):
+    path = tmp_path / 'vim.yaml'
+    shutil.copy(pathlib.Path(__file__).parent.parent / 'hotkeys' / 'vim.yaml', path)
+    return path
+
+
+def test_cache_created_and_used(hkdb_file_path, monkeypatch):
+    storage = vhkt.filestorage.FileHotKeysStorage(hkdb_file_path)
+    cache = vhkt.filecache.FileCache(hkdb_file_path)
+    assert cache.cache_file_path.is_file()
+
+    def fail_parse(raw_data):
+        raise AssertionError('Cache was not used')
+    monkeypatch.setattr(vhkt.filestorage.FileHotKeysStorage, '_parse', staticmethod(fail_parse))
+    cached_storage = vhkt.filestorage.FileHotKeysStorage(hkdb_file_path)
+    assert cached_storage.actions_keys == storage.actions_keys
+
+
+def test_stale_cache_rebuilt(hkdb_file_path):
+    vhkt.filestorage.FileHotKeysStorage(hkdb_file_path)
+    with open(hkdb_file_path, 'a') as fout:
+        fout.write("  extra_action:\n    description: 'Extra'\n    hotkeys:\n      - 'x'\n")
+    storage = vhkt.filestorage.FileHotKeysStorage(hkdb_file_path)
+    assert 'extra_action' in storage.actions_keys
+    assert storage.key_combination_type_by_key('extra_action') == 'hotkey'
+
+
+def test_no_cache_and_purge(hkdb_file_path):
+    vhkt.filestorage.FileHotKeysStorage(hkdb_file_path, use_cache=False)
+    cache = vhkt.filecache.FileCache(hkdb_file_path)
+    assert not cache.cache_dir_path.exists()
+    vhkt.filestorage.FileHotKeysStorage(hkdb_file_path)
+    vhkt.filecache.FileCache.purge(hkdb_file_path)
+    assert not cache.cache_dir_path.exists()
+
+
+def test_foreign_cache_file_not_loaded(hkdb_file_path):
+    storage = vhkt.filestorage.FileHotKeysStorage(hkdb_file_path)
+    cache = vhkt.filecache.FileCache(hkdb_file_path, storage.CACHE_VERSION)
+    cache.cache_file_path.write_bytes(b'{"version": 0}\n' + cache.cache_file_path.read_bytes())
+    assert cache.load(hkdb_file_path.read_bytes()) is None
+    assert vhkt.filestorage.FileHotKeysStorage(hkdb_file_path).actions_keys == storage.actions_keys
+
+
+@pytest.mark.parametrize('payload', [{'actions': {'undo': (1,)}}, {'actions': [1]}, {}, (1, 2)])
+def test_malformed_cache_payload_rebuilt(hkdb_file_path, payload):
+    storage = vhkt.filestorage.FileHotKeysStorage(hkdb_file_path)
+    cache = vhkt.filecache.FileCache(hkdb_file_path, storage.CACHE_VERSION)
+    signature = cache.cache_file_path.read_bytes().split(b'\n', 1)[0]
+    cache.cache_file_path.write_bytes(signature + b'\n' + marshal.dumps(payload))
+    assert vhkt.filestorage.FileHotKeysStorage(hkdb_file_path).actions_keys == storage.actions_keys
+    assert cache.load(hkdb_file_path.read_bytes()) != payload
@@ -2,6 +2,7 @@ import pytest
 import pathlib
 
 import vhkt.filestorage
+from vhkt.keycombo import Hotkey
 
 
 @pytest.fixture
@@ -12,3 +13,9 @@ def storage():
 
 def test_storage_not_empty(storage):
     assert storage.actions_keys
+
+
+def test_action_has_hotkey(storage):
+    assert storage.action_has_hotkey('delete_current_line', Hotkey.from_answer(['d', 'd']))
+    assert storage.action_has_hotkey('go_to_line', Hotkey.from_answer([':', 'N']))
+    assert not storage.action_has_hotkey('delete_current_line', Hotkey.from_answer(['d']))
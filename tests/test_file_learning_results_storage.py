@@ -0,0 +1,103 @@
+import pathlib
+import random
+
+import vhkt.filestorage
+
+from tests.storagechecks import aggregates, recounted_aggregates
+
+
+def test_aggregates_match_recount(storage, hk_storage, tmp_path):
+    rnd = random.Random(1)
+    operations = (storage.set_action_guess_correct,
+                  storage.set_action_guess_wrong,
+                  storage.skip_action,
+                  storage.set_action_learned_successfully)
+    for _ in range(500):
+        rnd.choice(operations)(rnd.choice(storage.actions_keys))
+        assert aggregates(storage) == recounted_aggregates(storage)
+    storage.remove_results_for_action(storage.actions_keys[0])
+    assert aggregates(storage) == recounted_aggregates(storage)
+    assert set(storage._nonlearned_actions_keys) == {
+        key for key in storage.actions_keys if not storage.action_success(key) and not storage.action_skipped(key)
+    }
+    storage.save()
+    reloaded_storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
+    assert aggregates(reloaded_storage) == recounted_aggregates(reloaded_storage)
+
+
+def test_random_nonlearned_action_key(storage):
+    for action_key in storage.actions_keys[:-2]:
+        storage.skip_action(action_key)
+    last_keys = storage.actions_keys[-2:]
+    prev_action_key = None
+    for _ in range(10):
+        action_key = storage.random_nonlearned_action_key
+        assert action_key in last_keys
+        assert action_key != prev_action_key
+        prev_action_key = action_key
+    storage.set_action_learned_successfully(last_keys[0])
+    assert storage.random_nonlearned_action_key == last_keys[1]
+    assert not storage.all_actions_learned_successfully
+    storage.set_action_learned_successfully(last_keys[1])
+    assert storage.all_actions_learned_successfully
+    assert storage.random_nonlearned_action_key is None
+
+
+def test_journal(hk_storage, tmp_path):
+    results_file_path = tmp_path / 'results.yaml'
+    storage = vhkt.filestorage.FileLearningResultsStorage(results_file_path, hk_storage, journal=True)
+    storage.save()
+    snapshot_mtime = results_file_path.stat().st_mtime_ns
+    action_keys = storage.actions_keys[:3]
+    storage.set_action_guess_correct(action_keys[0])
+    storage.set_action_guess_wrong(action_keys[1])
+    storage.skip_action(action_keys[2])
+    storage.save()
+    assert results_file_path.stat().st_mtime_ns == snapshot_mtime
+    assert pathlib.Path(storage.journal_file_path).is_file()
+
+    reloaded_storage = vhkt.filestorage.FileLearningResultsStorage(results_file_path, hk_storage, journal=True)
+    assert aggregates(reloaded_storage) == aggregates(storage)
+    reloaded_storage.close()
+    assert not pathlib.Path(storage.journal_file_path).exists()
+
+    reloaded_storage = vhkt.filestorage.FileLearningResultsStorage(results_file_path, hk_storage)
+    assert aggregates(reloaded_storage) == aggregates(storage)
+    assert reloaded_storage.action_skipped(action_keys[2])
+
+
+def test_journal_compaction(hk_storage, tmp_path):
+    results_file_path = tmp_path / 'results.yaml'
+    storage = vhkt.filestorage.FileLearningResultsStorage(results_file_path,
+                                                          hk_storage,
+                                                          journal=True,
+                                                          journal_compaction_size=200)
+    for action_key in storage.actions_keys[:10]:
+        storage.set_action_guess_wrong(action_key)
+        storage.save()
+        assert not pathlib.Path(storage.journal_file_path).is_file() \
+            or pathlib.Path(storage.journal_file_path).stat().st_size < 200 + 100
+
+    storage.close()
+    # Journal left from generation already compacted into snapshot must not be replayed again
+    with open(storage.journal_file_path, 'w') as fout:
+        fout.write('{"generation": 0}\n{"op": "guess", "key": "visual", "correct": false}\n')
+    reloaded_storage = vhkt.filestorage.FileLearningResultsStorage(results_file_path, hk_storage, journal=True)
+    assert aggregates(reloaded_storage) == aggregates(storage)
+
+
+def test_background_writer(hk_storage, tmp_path):
+    results_file_path = tmp_path / 'results.yaml'
+    storage = vhkt.filestorage.FileLearningResultsStorage(results_file_path, hk_storage, save_interval=60)
+    for action_key in storage.actions_keys[:5]:
+        storage.set_action_guess_wrong(action_key)
+        storage.save()
+    storage.flush()
+    reloaded_storage = vhkt.filestorage.FileLearningResultsStorage(results_file_path, hk_storage)
+    assert aggregates(reloaded_storage) == aggregates(storage)
+    storage.set_action_guess_correct(storage.actions_keys[0])
+    storage.save()
+    storage.close()
+    reloaded_storage = vhkt.filestorage.FileLearningResultsStorage(results_file_path, hk_storage)
+    assert aggregates(reloaded_storage) == aggregates(storage)
+    assert [path.name for path in tmp_path.iterdir()] == ['results.yaml']
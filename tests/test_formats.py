@@ -0,0 +1,60 @@
+import pathlib
+
+import pytest
+
+import vhkt.convert
+import vhkt.filestorage
+import vhkt.formats
+
+VIM_HOTKEYS_FILE_PATH = pathlib.Path(__file__).parent.parent / 'hotkeys' / 'vim.yaml'
+
+
+def hotkeys_data():
+    with open(VIM_HOTKEYS_FILE_PATH, 'rb') as fin:
+        return vhkt.formats.YAML_FORMAT.load(fin.read())
+
+
+@pytest.mark.parametrize('extension', ['.yaml', '.yml', '.json', '.marshal'])
+def test_format_round_trip(extension):
+    data_format = vhkt.formats.format_for_path(f'vim{extension.upper()}')
+    data = hotkeys_data()
+    assert data_format.load(data_format.dump(data)) == data
+
+
+def test_format_for_unknown_extension():
+    with pytest.raises(ValueError):
+        vhkt.formats.format_for_path('vim.txt')
+    assert vhkt.formats.format_for_path('vim.txt', vhkt.formats.YAML_FORMAT) is vhkt.formats.YAML_FORMAT
+
+
+def test_marshal_format_rejects_foreign_data():
+    with pytest.raises(ValueError):
+        vhkt.formats.FORMATS['.marshal'].load(b'{}')
+
+
+@pytest.mark.parametrize('extension', ['.json', '.marshal'])
+def test_converted_hot_keys_storage(extension, tmp_path):
+    converted_file_path = tmp_path / f'vim{extension}'
+    vhkt.convert.main([str(VIM_HOTKEYS_FILE_PATH), str(converted_file_path)])
+    yaml_storage = vhkt.filestorage.FileHotKeysStorage(VIM_HOTKEYS_FILE_PATH, use_cache=False)
+    storage = vhkt.filestorage.FileHotKeysStorage(converted_file_path, use_cache=False)
+    assert storage.app_name == yaml_storage.app_name
+    assert storage.actions_keys == yaml_storage.actions_keys
+    for action_key in yaml_storage.actions_keys:
+        assert storage.action_hotkeys_by_key(action_key) == yaml_storage.action_hotkeys_by_key(action_key)
+        assert storage.key_combination_type_by_key(action_key) == yaml_storage.key_combination_type_by_key(action_key)
+
+
+def test_json_learning_results_storage(tmp_path):
+    hk_storage = vhkt.filestorage.FileHotKeysStorage(VIM_HOTKEYS_FILE_PATH, use_cache=False)
+    storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.json', hk_storage)
+    action_key = hk_storage.actions_keys[0]
+    storage.set_action_guess_correct(action_key)
+    storage.skip_action(hk_storage.actions_keys[1])
+    storage.save()
+    storage.close()
+    with open(tmp_path / 'results.json', 'rb') as fin:
+        assert vhkt.formats.FORMATS['.json'].load(fin.read())['actions'][action_key]['correct_guesses'] == 1
+    storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.json', hk_storage)
+    assert storage.action_correct_guesses(action_key) == 1
+    assert storage.skipped_actions_count == 1
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+import vhkt.filestorage
+from vhkt.cursestui import InterfaceState
+from vhkt.headless import KEYS_CODES, HeadlessTuiDriver, parse_keys
+from vhkt.keyreader import KeyReader
+from vhkt.synthetic import write_synthetic_hotkeys_file
+from vhkt.tuibenchmark import benchmark
+
+
+def test_parse_keys():
+    assert parse_keys('x 1 Enter ctrl+h ctrl+k backspace idle') == [ord('x'), ord('1'), 10, 8, 11, 263, -1]
+    with pytest.raises(ValueError):
+        parse_keys('ctrl+z')
+
+
+def test_answer(hk_storage, storage):
+    driver = HeadlessTuiDriver(hk_storage, storage)
+    transitions = driver.play('x 1 enter')
+    assert storage.actions_guesses_count == 1
+    assert [(t.from_state, t.to_state) for t in transitions[:2]] == [
+        (InterfaceState.ASKING_QUESTION, InterfaceState.ANSWER_INPUT),
+        (InterfaceState.ANSWER_INPUT, InterfaceState.CHECKING_ANSWER),
+    ]
+    assert all(t.seconds >= 0 for t in transitions)
+
+
+def test_help_and_skip(hk_storage, storage):
+    driver = HeadlessTuiDriver(hk_storage, storage)
+    driver.play('x ctrl+h')
+    assert 'Key combination(s) for' in driver.window.screen_text()
+    driver = HeadlessTuiDriver(hk_storage, storage)
+    driver.play('x ctrl+k enter')
+    assert storage.skipped_actions_count == 1
+    assert 'Press correct hotkey index' in driver.window.screen_text()
+
+
+def test_answer_after_idle(hk_storage, storage):
+    driver = HeadlessTuiDriver(hk_storage, storage)
+    driver.play('x idle idle 1 idle enter')
+    assert storage.actions_guesses_count == 1
+    assert driver.tutor.last_response_seconds >= 3 * KeyReader.POLL_INTERVAL
+
+
+def test_question_time_limit(hk_storage, storage):
+    # First key closes welcome screen, then no keys are pressed till time is out
+    keys = iter(parse_keys('x'))
+
+    def wait_for_time_out(tutor):
+        if storage.actions_guesses_count == 0:
+            return next(keys, KEYS_CODES['idle'])
+        return None
+
+    driver = HeadlessTuiDriver(hk_storage, storage, question_time_limit=0.05)
+    driver.play(wait_for_time_out)
+    assert storage.actions_error_guesses_count == 1
+    assert 'Time is out!' in driver.window.screen_text()
+
+
+def test_synthetic_hotkeys_file(tmp_path):
+    hkdb_file_path = tmp_path / 'hotkeys.yaml'
+    write_synthetic_hotkeys_file(hkdb_file_path, 100, random.Random(0))
+    hk_storage = vhkt.filestorage.FileHotKeysStorage(hkdb_file_path, use_cache=False)
+    assert len(hk_storage.actions_keys) == 100
+
+
+def test_benchmark():
+    report = benchmark(20, 50)
+    assert report['transitions']['all']['count'] == 50
+    assert report['transitions']['all']['p50_ms'] <= report['transitions']['all']['p99_ms']
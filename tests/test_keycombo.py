@@ -0,0 +1,32 @@
+from vhkt.keycombo import Hotkey, KeyCombo, Modifier
+
+
+def test_key_combos_interned():
+    assert KeyCombo.parse('Ctrl+Shift+t') is KeyCombo(Modifier.CTRL | Modifier.SHIFT, 't')
+    assert KeyCombo.parse('Shift+Ctrl+t') is KeyCombo.parse('Ctrl+Shift+t')
+    assert KeyCombo.from_tuple(KeyCombo.parse('Alt+F4').to_tuple()) is KeyCombo.parse('Alt+F4')
+
+
+def test_hotkeys_parsing():
+    assert Hotkey.parse('dd') == Hotkey.parse(['d', 'd'])
+    assert Hotkey.parse('Alt+Space,n') is Hotkey((KeyCombo.parse('Alt+Space'), KeyCombo.parse('n')))
+    assert len(Hotkey.parse('Ctrl+w')) == 1
+    assert len(Hotkey.parse('F11')) == 1
+    assert str(Hotkey.parse(':set number')) == ':set number'
+    assert str(Hotkey.parse('gT')) == 'gT'
+    assert Hotkey.from_tuple(Hotkey.parse('gg').to_tuple()) is Hotkey.parse('gg')
+
+
+def test_hotkeys_from_answer():
+    assert Hotkey.from_answer([':', 'w', 'q']) == Hotkey.parse(':wq')
+    assert Hotkey.from_answer(['Ctrl+w', 'Ctrl+w']) is Hotkey.parse(['Ctrl+w', 'Ctrl+w'])
+    assert Hotkey.from_answer(['d', 'd']) == Hotkey.parse('dd')
+    assert Hotkey.from_answer(['Ctrl+r']) is Hotkey.parse('Ctrl+r')
+
+
+def test_hotkeys_spelling_kept():
+    hotkey = Hotkey.parse('Shift+Alt+t')
+    assert str(hotkey) == 'Shift+Alt+t'
+    assert hotkey == Hotkey.parse('Alt+Shift+t') and hash(hotkey) == hash(Hotkey.parse('Alt+Shift+t'))
+    assert Hotkey.parse('Ctrl+,') == Hotkey((KeyCombo(Modifier.CTRL, ','),))
+    assert len(Hotkey.parse('Ctrl+,,x')) == 2
@@ -0,0 +1,45 @@
+import pytest
+
+from vhkt.prefetch import PreparedQuestion, QuestionsPrefetcher
+
+
+@pytest.fixture
+def prepared_actions_keys():
+    return []
+
+
+@pytest.fixture
+def prefetcher(storage, prepared_actions_keys):
+    def prepare_question():
+        action_key = storage.next_action_key
+        prepared_actions_keys.append(action_key)
+        return PreparedQuestion(action_key, f'Question for {action_key}', [])
+    return QuestionsPrefetcher(prepare_question, storage, depth=2)
+
+
+def test_prefetched_question_is_used(prefetcher, prepared_actions_keys):
+    prefetcher.prefetch()
+    assert len(prefetcher) == 2
+    assert len(prepared_actions_keys) == 2
+    question = prefetcher.next_question()
+    assert question.action_key == prepared_actions_keys[0]
+    assert len(prepared_actions_keys) == 2
+    prefetcher.prefetch()
+    assert len(prepared_actions_keys) == 3
+
+
+def test_prefetched_question_is_dropped_when_action_is_skipped(prefetcher, storage, prepared_actions_keys):
+    prefetcher.prefetch()
+    storage.skip_action(prepared_actions_keys[0])
+    question = prefetcher.next_question()
+    assert question.action_key == prepared_actions_keys[1]
+
+
+def test_prefetched_question_is_dropped_when_action_is_learned(prefetcher, storage, prepared_actions_keys):
+    prefetcher.prefetch()
+    for action_key in prepared_actions_keys:
+        storage.set_action_learned_successfully(action_key)
+    question = prefetcher.next_question()
+    assert len(prepared_actions_keys) == 3
+    assert question.action_key == prepared_actions_keys[2]
+    assert not storage.action_success(question.action_key)
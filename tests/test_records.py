@@ -0,0 +1,49 @@
+import pathlib
+
+import vhkt.filestorage
+from vhkt.formats import YAML_FORMAT
+from vhkt.records import EMPTY_PROGRESS, Action, ActionProgress, actions_from_dicts, progresses_from_dicts
+
+VIM_HOTKEYS_FILE_PATH = pathlib.Path(__file__).parent.parent / 'hotkeys' / 'vim.yaml'
+
+
+def test_actions_from_dicts():
+    with open(VIM_HOTKEYS_FILE_PATH, 'rb') as fin:
+        actions_data = YAML_FORMAT.load(fin.read())['actions']
+    actions = actions_from_dicts(actions_data)
+    assert list(actions) == list(actions_data)
+    for action_key, action in actions.items():
+        assert Action.from_dict(action.to_dict(), {}) == action
+        assert action.type == actions_data[action_key].get('type', 'hotkey')
+    types = {}
+    for action in actions.values():
+        assert types.setdefault(str(action.type), action.type) is action.type
+
+
+def test_action_progress_round_trip():
+    data = {'guesses': 2, 'correct_guesses': 1, 'error_guesses': 1, 'schedule': {'due': 1.5}, 'note': 'kept'}
+    progress = ActionProgress.from_dict(data)
+    assert progress.extra == {'note': 'kept'}
+    assert progress.to_dict() == data
+    assert ActionProgress.from_dict({}) is EMPTY_PROGRESS
+    assert EMPTY_PROGRESS.to_dict() == {}
+
+
+def test_empty_progress_not_changed(tmp_path):
+    hk_storage = vhkt.filestorage.FileHotKeysStorage(VIM_HOTKEYS_FILE_PATH, use_cache=False)
+    storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
+    first_action_key, second_action_key = hk_storage.actions_keys[:2]
+    storage.set_action_guess_wrong(first_action_key)
+    storage.skip_action(second_action_key)
+    assert EMPTY_PROGRESS.to_dict() == {}
+    assert storage.action_guesses(first_action_key) == 1
+    assert storage.action_correct_guesses(first_action_key) == 0
+    assert storage.action_error_guesses(first_action_key) == 1
+    assert storage.action_guesses(hk_storage.actions_keys[2]) is None
+    storage.save()
+    with open(tmp_path / 'results.yaml', 'rb') as fin:
+        data = YAML_FORMAT.load(fin.read())
+    assert data['actions'][first_action_key] == {'guesses': 1, 'correct_guesses': 0, 'error_guesses': 1}
+    assert data['actions'][second_action_key] == {'skip': True}
+    assert data['actions'][hk_storage.actions_keys[2]] == {}
+    assert progresses_from_dicts(data['actions'])[hk_storage.actions_keys[2]] is EMPTY_PROGRESS
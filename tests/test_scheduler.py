@@ -0,0 +1,40 @@
+import pytest
+
+import vhkt.filestorage
+from tests.conftest import FakeClock
+from vhkt.scheduler import DueQueue, LeitnerScheduler, Sm2Scheduler
+
+
+def test_due_queue():
+    queue = DueQueue()
+    queue.extend([('a', 3), ('b', 1), ('c', 2)])
+    assert queue.peek() == (1, 'b')
+    assert queue.peek(exclude='b') == (2, 'c')
+    queue.remove('c')
+    assert queue.peek(exclude='b') == (3, 'a')
+    queue.push('b', 5)
+    assert queue.peek() == (3, 'a')
+    assert len(queue) == 2
+
+
+@pytest.mark.parametrize('scheduler_class', [LeitnerScheduler, Sm2Scheduler])
+def test_learned_actions_resurface(storage, hk_storage, tmp_path, scheduler_class):
+    clock = FakeClock(1000.0)
+    storage.set_scheduler(scheduler_class(clock=clock))
+    asked = set()
+    while not storage.all_actions_learned_successfully:
+        action_key = storage.next_action_key
+        asked.add(action_key)
+        storage.set_action_guess_correct(action_key)
+    assert asked == set(hk_storage.actions_keys)
+    assert storage.next_action_key is None
+    storage.save()
+
+    clock.now += 365 * 24 * 60 * 60
+    reloaded_storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
+    reloaded_storage.set_scheduler(scheduler_class(clock=clock))
+    assert not reloaded_storage.all_actions_learned_successfully
+    action_key = reloaded_storage.next_action_key
+    assert reloaded_storage.action_success(action_key)
+    reloaded_storage.set_action_guess_correct(action_key)
+    assert reloaded_storage.action_schedule(action_key)['due'] > clock.now
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import pathlib
+
+import pytest
+
+import vhkt.basic
+import vhkt.filestorage
+from vhkt.loadtest import run_load_test
+from vhkt.server import HotKeysServer, LearnerSession
+
+HOTKEYS_DIR_PATH = pathlib.Path(__file__).parent.parent / 'hotkeys'
+
+
+@pytest.fixture
+def server(tmp_path):
+    hk_storages = [vhkt.filestorage.FileHotKeysStorage(HOTKEYS_DIR_PATH / file_name, use_cache=False)
+                   for file_name in ('vim.yaml', 'bash.yaml')]
+    server = HotKeysServer(hk_storages, tmp_path, save_interval=None)
+    yield server
+    server.close()
+
+
+def request(server, session, **request_data):
+    return json.loads(server.handle_line(session, json.dumps(request_data).encode('utf-8')))
+
+
+def test_session(server, tmp_path):
+    session = LearnerSession()
+    assert request(server, session, op='apps') == {'ok': True, 'apps': ['Vim', 'Bash']}
+    assert not request(server, session, op='question')['ok']
+    assert not request(server, session, op='login', user='alice')['ok']
+    assert not request(server, session, op='login', user='../alice', app='Vim')['ok']
+    assert request(server, session, op='login', user='alice', app='Vim')['ok']
+    assert not request(server, session, op='answer', answer='x')['ok']
+    question = request(server, session, op='question')
+    assert question['question'].startswith('WHAT IS')
+    result = request(server, session, op='answer', answer='no such hot key')
+    assert (result['ok'], result['action'], result['correct']) == (True, question['action'], False)
+    assert not request(server, session, op='answer', answer='x')['ok']
+    question = request(server, session, op='question')
+    assert request(server, session, op='skip')['skipped']
+    assert (tmp_path / 'alice-Vim.yaml').is_file()
+    assert not request(server, session, op='no_such_op')['ok']
+    assert json.loads(server.handle_line(session, b'not json'))['ok'] is False
+
+
+def test_malformed_requests(server):
+    session = LearnerSession()
+    for line in (b'[]', b'5', b'{"op": ["apps"]}', b'{"op": "login", "user": "alice", "app": ["Vim"]}'):
+        assert json.loads(server.handle_line(session, line))['ok'] is False
+    request(server, session, op='login', user='alice', app='Vim')
+    request(server, session, op='question')
+    for answer in (5, {'a': 1}, ['d', 5]):
+        assert not request(server, session, op='answer', answer=answer)['ok']
+    assert 'correct' in request(server, session, op='answer', answer=['x'])
+
+
+def test_sessions_of_same_user_share_results(server):
+    first_session = LearnerSession()
+    second_session = LearnerSession()
+    for session in (first_session, second_session):
+        request(server, session, op='login', user='bob', app='Bash')
+    assert first_session.tutor.learning_results_storage is second_session.tutor.learning_results_storage
+    request(server, first_session, op='question')
+    request(server, first_session, op='answer', answer='x')
+    assert '1 guess(es)' in request(server, second_session, op='stats')['stats']
+    server.logout(first_session)
+    assert server._learners
+    server.logout(second_session)
+    assert not server._learners
+
+
+@pytest.mark.parametrize('results_backend', list(vhkt.basic.ResultsBackend))
+def test_load_test(tmp_path, results_backend):
+    hk_storage = vhkt.filestorage.FileHotKeysStorage(HOTKEYS_DIR_PATH / 'vim.yaml', use_cache=False)
+    server = HotKeysServer([hk_storage], tmp_path, results_backend)
+
+    async def run():
+        asyncio_server = await server.start(unix_socket_path=str(tmp_path / 'vhkt.sock'))
+        try:
+            return await run_load_test(5, 10, unix_socket_path=str(tmp_path / 'vhkt.sock'))
+        finally:
+            asyncio_server.close()
+            await asyncio_server.wait_closed()
+
+    report = asyncio.run(run())
+    server.close()
+    assert report['round_trips'] == 50
+    assert report['p50_ms'] <= report['p99_ms']
+    assert len(list(tmp_path.glob('learner-*'))) == 5
@@ -0,0 +1,53 @@
+import pathlib
+
+import pytest
+
+import vhkt.filestorage
+import vhkt.sqlitestorage
+from vhkt.keycombo import Hotkey
+
+HOTKEYS_DIR_PATH = pathlib.Path(__file__).parent.parent / 'hotkeys'
+
+
+@pytest.fixture
+def catalog_file_path(tmp_path):
+    path = tmp_path / 'hotkeys.sqlite3'
+    catalog = vhkt.sqlitestorage.SqliteHotKeysStorage(path)
+    for hkdb_file_path in sorted(HOTKEYS_DIR_PATH.glob('*.yaml')):
+        catalog.import_app(vhkt.filestorage.FileHotKeysStorage(hkdb_file_path, use_cache=False))
+    catalog.close()
+    return path
+
+
+def test_same_actions_as_file_storage(catalog_file_path):
+    file_storage = vhkt.filestorage.FileHotKeysStorage(HOTKEYS_DIR_PATH / 'vim.yaml', use_cache=False)
+    storage = vhkt.sqlitestorage.SqliteHotKeysStorage(catalog_file_path, 'Vim')
+    assert storage.apps_names == ['Bash', 'Chrome', 'Vim']
+    assert storage.actions_keys == file_storage.actions_keys
+    for key in file_storage.actions_keys:
+        assert storage.action_description_by_key(key) == file_storage.action_description_by_key(key)
+        assert storage.key_combination_type_by_key(key) == file_storage.key_combination_type_by_key(key)
+        assert storage.action_hotkeys_by_key(key) == file_storage.action_hotkeys_by_key(key)
+    assert storage.action_has_hotkey('delete_current_line', Hotkey.parse('dd'))
+    with pytest.raises(KeyError):
+        storage.action_description_by_key('no_such_action')
+
+
+def test_search(catalog_file_path):
+    storage = vhkt.sqlitestorage.SqliteHotKeysStorage(catalog_file_path, 'Chrome', search_query='tab')
+    assert storage.actions_keys
+    for key in storage.actions_keys:
+        assert 'tab' in storage.action_description_by_key(key).lower()
+    with pytest.raises(ValueError):
+        storage.select_app('No such app')
+
+
+def test_hotkeys_spelling_kept(tmp_path):
+    (tmp_path / 'app.yaml').write_text("app: App\nactions:\n"
+                                       "  delete_line:\n    description: 'Delete line'\n    hotkeys:\n      - 'dd'\n"
+                                       "  settings:\n    description: 'Open line settings'\n    hotkeys:\n      - 'Ctrl+,'\n")
+    catalog = vhkt.sqlitestorage.SqliteHotKeysStorage(tmp_path / 'hotkeys.sqlite3')
+    catalog.import_app(vhkt.filestorage.FileHotKeysStorage(tmp_path / 'app.yaml', use_cache=False))
+    storage = vhkt.sqlitestorage.SqliteHotKeysStorage(tmp_path / 'hotkeys.sqlite3', 'App', search_query='line')
+    assert [str(storage.action_hotkeys_by_key(key)[0]) for key in storage.actions_keys] == ['dd', 'Ctrl+,']
+    assert storage.action_has_hotkey('settings', Hotkey.from_answer(['Ctrl+,']))
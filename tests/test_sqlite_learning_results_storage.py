@@ -0,0 +1,30 @@
+import random
+
+import vhkt.filestorage
+import vhkt.sqlitestorage
+
+from tests.storagechecks import action_results, aggregates, play_random_operations
+
+
+def test_same_results_as_file_storage(hk_storage, tmp_path):
+    file_storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
+    sqlite_storage = vhkt.sqlitestorage.SqliteLearningResultsStorage(tmp_path / 'results.sqlite3', hk_storage)
+    play_random_operations((file_storage, sqlite_storage), random.Random(2), 300)
+    sqlite_storage.close()
+
+    reloaded_storage = vhkt.sqlitestorage.SqliteLearningResultsStorage(tmp_path / 'results.sqlite3', hk_storage)
+    assert aggregates(reloaded_storage) == aggregates(file_storage)
+    assert reloaded_storage.random_nonlearned_action_key in file_storage._nonlearned_actions_keys
+
+
+def test_import_results(hk_storage, tmp_path):
+    file_storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
+    for action_key in file_storage.actions_keys[:5]:
+        file_storage.set_action_guess_wrong(action_key)
+    file_storage.skip_action(file_storage.actions_keys[6])
+    file_storage.set_action_learned_successfully(file_storage.actions_keys[7])
+    sqlite_storage = vhkt.sqlitestorage.SqliteLearningResultsStorage(tmp_path / 'results.sqlite3', hk_storage)
+    sqlite_storage.import_results(file_storage)
+    assert aggregates(sqlite_storage) == aggregates(file_storage)
+    for action_key in file_storage.actions_keys:
+        assert action_results(sqlite_storage, action_key) == action_results(file_storage, action_key)
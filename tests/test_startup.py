@@ -0,0 +1,73 @@
+import pathlib
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+REPO_DIR_PATH = pathlib.Path(__file__).parent.parent
+
+# Budgets are generous to not fail on busy machines, typical values are several times lower
+IMPORT_TIME_BUDGET_SECONDS = 0.3
+TIME_TO_FIRST_QUESTION_BUDGET_SECONDS = 2.0
+
+
+def run_simple_text_session(tmp_path, *options):
+    # Answers first question with exit command, returns imports cumulative times in seconds and session duration
+    started = time.monotonic()
+    process = subprocess.run([sys.executable,
+                              '-X',
+                              'importtime',
+                              str(REPO_DIR_PATH / 'vhkt.py'),
+                              '-i',
+                              'simple-text',
+                              str(tmp_path / 'vim.yaml'),
+                              *options],
+                             input='\\e\n',
+                             capture_output=True,
+                             text=True,
+                             cwd=tmp_path,
+                             check=True)
+    duration = time.monotonic() - started
+    assert 'WHAT IS' in process.stdout
+    imports_times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        imports_times[name.strip()] = (int(cumulative) / 1e6, not name.startswith('  '))
+    return imports_times, duration
+
+
+@pytest.fixture
+def hkdb_dir_path(tmp_path):
+    shutil.copy(REPO_DIR_PATH / 'hotkeys' / 'vim.yaml', tmp_path / 'vim.yaml')
+    # Fills hot keys storage cache
+    run_simple_text_session(tmp_path, '-l', str(tmp_path / 'warmup.yaml'))
+    return tmp_path
+
+
+def check_budgets(imports_times, duration):
+    import_time = sum(cumulative for cumulative, top_level in imports_times.values() if top_level)
+    assert import_time < IMPORT_TIME_BUDGET_SECONDS
+    assert duration < TIME_TO_FIRST_QUESTION_BUDGET_SECONDS
+
+
+def test_yaml_results_startup(hkdb_dir_path):
+    imports_times, duration = run_simple_text_session(hkdb_dir_path, '-l', str(hkdb_dir_path / 'results.yaml'))
+    for module in ('curses', 'sqlite3', 'cProfile', 'vhkt.catalog', 'vhkt.cursestui', 'vhkt.cursestext'):
+        assert module not in imports_times
+    check_budgets(imports_times, duration)
+
+
+def test_sqlite_results_startup_without_yaml(hkdb_dir_path):
+    imports_times, duration = run_simple_text_session(hkdb_dir_path,
+                                                      '-b',
+                                                      'sqlite',
+                                                      '-l',
+                                                      str(hkdb_dir_path / 'results.sqlite3'))
+    # Hot keys storage is loaded from cache, so YAML parser is not needed
+    for module in ('yaml', 'curses', 'vhkt.catalog', 'vhkt.cursestui', 'vhkt.cursestext'):
+        assert module not in imports_times
+    check_budgets(imports_times, duration)
@@ -0,0 +1,34 @@
+from vhkt.storagebenchmark import benchmark, compare, memory_benchmark, results_from_json, results_to_json
+
+
+def test_benchmark():
+    results = benchmark(50, repeat=1, calls=10)
+    assert {result.case for result in results} == {
+        'hk_storage_load',
+        'hk_storage_load_json',
+        'hk_storage_load_marshal',
+        'hk_storage_load_cached',
+        'action_hotkeys_by_key',
+        'learning_results_storage_load',
+        'learning_results_storage_save',
+        'random_nonlearned_action_key',
+        'all_actions_learned_successfully',
+        'learning_stats',
+    }
+    assert all(result.actions_count == 50 and result.best_seconds > 0 for result in results)
+    assert results_from_json(results_to_json(results)) == results
+
+
+def test_compare():
+    baseline = benchmark(20, repeat=1, calls=10)
+    assert not compare(baseline, baseline)
+    slower = [result._replace(best_seconds=result.best_seconds * 2) for result in baseline]
+    regressions = compare(baseline, slower, tolerance=0.5)
+    assert len(regressions) == len(baseline)
+    assert all(abs(regression.ratio - 2) < 1e-9 for regression in regressions)
+
+
+def test_memory_benchmark():
+    results = memory_benchmark(1000)
+    assert [result.case for result in results] == ['hk_storage_actions', 'learning_results_storage_actions']
+    assert all(result.records_bytes < result.dicts_bytes for result in results)
@@ -0,0 +1,77 @@
+import pathlib
+import random
+import tracemalloc
+
+import pytest
+
+import vhkt.filestorage
+from vhkt.streamingstorage import StreamingFileHotKeysStorage
+from vhkt.synthetic import write_synthetic_hotkeys_file
+
+HOTKEYS_DIR_PATH = pathlib.Path(__file__).parent.parent / 'hotkeys'
+
+
+@pytest.mark.parametrize('hkdb_file_name', ['vim.yaml', 'bash.yaml', 'chrome.yaml'])
+def test_same_as_file_storage(hkdb_file_name):
+    file_storage = vhkt.filestorage.FileHotKeysStorage(HOTKEYS_DIR_PATH / hkdb_file_name, use_cache=False)
+    streaming_storage = StreamingFileHotKeysStorage(HOTKEYS_DIR_PATH / hkdb_file_name)
+    assert streaming_storage.app_name == file_storage.app_name
+    assert streaming_storage.actions_keys == file_storage.actions_keys
+    assert streaming_storage.loaded_actions_count == 0
+    for action_key in file_storage.actions_keys:
+        assert streaming_storage.key_combination_type_by_key(action_key) \
+            == file_storage.key_combination_type_by_key(action_key)
+        assert streaming_storage.action_description_by_key(action_key) \
+            == file_storage.action_description_by_key(action_key)
+        assert streaming_storage.action_hotkeys_by_key(action_key) == file_storage.action_hotkeys_by_key(action_key)
+    assert streaming_storage.loaded_actions_count == len(file_storage.actions_keys)
+
+
+def test_last_action_and_other_keys(tmp_path):
+    hkdb_file_path = tmp_path / 'hotkeys.yaml'
+    hkdb_file_path.write_text('actions:\n'
+                              '  first:\n'
+                              '    description: First\n'
+                              '    hotkeys: [a]\n'
+                              '  second: {description: Second, type: [hotkey, command], hotkeys: [b, ":c"]}\n'
+                              'app: Test\n'
+                              'link: http://example.com\n'
+                              'other_actions:\n'
+                              '  third:\n'
+                              '    description: Third\n'
+                              '    hotkeys:\n'
+                              '      - d')
+    storage = StreamingFileHotKeysStorage(hkdb_file_path)
+    assert storage.app_name == 'Test'
+    assert storage.actions_keys == ['first', 'second']
+    assert storage.key_combination_type_by_key('first') == 'hotkey'
+    assert storage.key_combination_type_by_key('second') == ['hotkey', 'command']
+    assert storage.action_description_by_key('second') == 'Second'
+    assert [str(hotkey) for hotkey in storage.action_hotkeys_by_key('second')] == ['b', ':c']
+    with pytest.raises(KeyError):
+        storage.action_hotkeys_by_key('third')
+
+
+def test_flow_style_actions_not_supported(tmp_path):
+    hkdb_file_path = tmp_path / 'hotkeys.yaml'
+    hkdb_file_path.write_text('app: Test\nactions: {first: {description: First, hotkeys: [a]}}\n')
+    with pytest.raises(ValueError):
+        StreamingFileHotKeysStorage(hkdb_file_path)
+
+
+def test_memory_proportional_to_loaded_actions(tmp_path):
+    hkdb_file_path = tmp_path / 'hotkeys.yaml'
+    write_synthetic_hotkeys_file(hkdb_file_path, 1000, random.Random(0))
+    tracemalloc.start()
+    try:
+        file_storage = vhkt.filestorage.FileHotKeysStorage(hkdb_file_path, use_cache=False)
+        file_storage_size = tracemalloc.get_traced_memory()[0]
+        del file_storage
+        tracemalloc.reset_peak()
+        streaming_storage_size_before = tracemalloc.get_traced_memory()[0]
+        streaming_storage = StreamingFileHotKeysStorage(hkdb_file_path)
+        streaming_storage_size = tracemalloc.get_traced_memory()[0] - streaming_storage_size_before
+    finally:
+        tracemalloc.stop()
+    assert streaming_storage_size < file_storage_size / 2
+    assert streaming_storage.loaded_actions_count == 0
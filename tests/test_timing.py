@@ -0,0 +1,41 @@
+import pathlib
+
+import vhkt.filestorage
+from tests.conftest import FakeClock
+from vhkt.headless import HeadlessTuiDriver
+from vhkt.timing import Timings, timings
+
+
+def test_timings():
+    clock = FakeClock()
+    stats = Timings(clock)
+    with stats.timer('op'):
+        clock.now += 0.005
+    stats.add('op', 2.0)
+    summary = stats.summary()['op']
+    assert summary['count'] == 2
+    assert summary['max_ms'] == 2000
+    assert summary['mean_ms'] == 1002.5
+    assert summary['histogram']['<10ms'] == 1
+    assert summary['histogram']['>=1000ms'] == 1
+    assert stats.get('op').last_seconds == 2.0
+
+
+def test_tui_timings(tmp_path):
+    timings.clear()
+    hk_storage = vhkt.filestorage.FileHotKeysStorage(pathlib.Path(__file__).parent.parent / 'hotkeys' / 'vim.yaml',
+                                                     use_cache=False)
+    storage = vhkt.filestorage.FileLearningResultsStorage(tmp_path / 'results.yaml', hk_storage)
+    driver = HeadlessTuiDriver(hk_storage, storage, show_timings=True)
+    driver.play('x 1 enter')
+    summary = timings.summary()
+    for name in ('hk_storage_load',
+                 'learning_results_storage_load',
+                 'learning_results_storage_save',
+                 'prepare_question',
+                 'prefetch',
+                 'state:asking-question',
+                 'state:answer-input',
+                 'state:check-answer'):
+        assert summary[name]['count'] > 0
+    assert ' ms, max ' in driver.tutor._statusbar_str
@@ -0,0 +1,32 @@
+import threading
+
+from vhkt.writer import BackgroundWriter, write_file_atomically
+
+
+def test_requests_coalesced():
+    writes = []
+    first_write_started = threading.Event()
+    release_first_write = threading.Event()
+
+    def write():
+        writes.append(1)
+        first_write_started.set()
+        release_first_write.wait()
+
+    writer = BackgroundWriter(write, interval=60)
+    writer.request()
+    first_write_started.wait()
+    for _ in range(100):
+        writer.request()
+    release_first_write.set()
+    writer.flush()
+    assert len(writes) == 2
+    writer.close()
+
+
+def test_write_file_atomically(tmp_path):
+    file_path = tmp_path / 'data.yaml'
+    write_file_atomically(file_path, 'a: 1\n')
+    write_file_atomically(file_path, 'a: 2\n')
+    assert file_path.read_text() == 'a: 2\n'
+    assert [path.name for path in tmp_path.iterdir()] == ['data.yaml']
@@ -2,52 +2,179 @@
 # 2020 Dmitriy Vinokurov gim6626@gmail.com
 
 import logging
+import signal
 import sys
 import argparse
-import curses
 from pathlib import Path
 
 import vhkt.basic
-import vhkt.cursestext
-import vhkt.cursestui
-import vhkt.filestorage
-import vhkt.simpletext
+import vhkt.filecache
+import vhkt.prefetch
+import vhkt.scheduler
+import vhkt.timing
+
+# Interfaces, storages and their dependencies like curses, YAML parser or SQLite are imported only when
+# selected, so startup does not pay for unused ones
 
 logger: logging.Logger = None
 args = None
 
+SQLITE_SUFFIXES = ('.sqlite3', '.sqlite', '.db')
+
 
 def main(window=None):
-    hk_storage, learning_results_storage = init_storages()
+    storages = init_storages(window)
+    if storages is None:
+        return
+    hk_storage, learning_results_storage = storages
     tutor: vhkt.basic.BasicTutor
     if args.interface_mode == vhkt.basic.InterfaceMode.SIMPLE_TEXT:
-        tutor = vhkt.simpletext.SimpleTextTutor(hk_storage, learning_results_storage)
+        from vhkt.simpletext import SimpleTextTutor
+        tutor = SimpleTextTutor(hk_storage, learning_results_storage)
     elif args.interface_mode == vhkt.basic.InterfaceMode.CURSES_TEXT:
-        tutor = vhkt.cursestext.CursesTextTutor(hk_storage, learning_results_storage, window)
+        from vhkt.cursestext import CursesTextTutor
+        tutor = CursesTextTutor(hk_storage, learning_results_storage, window)
     elif args.interface_mode == vhkt.basic.InterfaceMode.CURSES_TUI:
-        tutor = vhkt.cursestui.CursesTuiTutor(hk_storage, learning_results_storage, args.answer_mode, window)
+        from vhkt.cursestui import CursesTuiTutor
+        tutor = CursesTuiTutor(hk_storage,
+                               learning_results_storage,
+                               args.answer_mode,
+                               window,
+                               options_count=args.options_count,
+                               prefetch_depth=args.prefetch_depth,
+                               show_timings=args.debug,
+                               question_time_limit=args.question_time_limit)
+    elif args.interface_mode == vhkt.basic.InterfaceMode.BATCH:
+        from vhkt.batch import BatchTutor
+        with open_batch_file(args.batch_input, 'r', sys.stdin) as fin, \
+                open_batch_file(args.batch_output, 'w', sys.stdout) as fout:
+            tutor = BatchTutor(hk_storage, learning_results_storage, fin, fout)
+            try:
+                tutor.tutor()
+            finally:
+                learning_results_storage.close()
+        return
     else:
         raise NotImplementedError(f'Invalid interface mode "{args.interface_mode}"')
-    tutor.tutor()
+    try:
+        tutor.tutor()
+    finally:
+        learning_results_storage.close()
+
 
+def open_batch_file(path, mode, std_file):
+    # "-" means stdin or stdout, which should not be closed
+    if path == '-':
+        import contextlib
+        return contextlib.nullcontext(std_file)
+    return open(path, mode)
 
-def init_storages():
+
+def select_app_from_catalog(catalog_dir_path, window):
+    from vhkt.catalog import HotKeysCatalog
+    catalog = HotKeysCatalog(catalog_dir_path, use_cache=not args.no_cache)
+    catalog_entries = catalog.refresh()
+    logger.debug(f'Hot keys catalog loaded, {len(catalog_entries)} application(s) found')
+    if not catalog_entries:
+        raise ValueError(f'No hot keys files found in "{catalog_dir_path}"')
+    if not any(entry.available for entry in catalog_entries):
+        raise ValueError(f'No hot keys file in "{catalog_dir_path}" could be loaded')
+    if args.interface_mode == vhkt.basic.InterfaceMode.SIMPLE_TEXT:
+        from vhkt.simpletext import SimpleTextTutor
+        catalog_entry = SimpleTextTutor.select_app(catalog_entries)
+    else:
+        from vhkt.cursestui import CursesTuiTutor
+        catalog_entry = CursesTuiTutor.select_app(window, catalog_entries)
+    if catalog_entry is None:
+        return None
+    return catalog.file_path(catalog_entry)
+
+
+def init_storages(window=None):
     hk_storage_file_path = Path(args.APP_HOT_KEYS_STORAGE_FILE)
-    hk_storage = vhkt.filestorage.FileHotKeysStorage(hk_storage_file_path)
+    if args.purge_cache:
+        vhkt.filecache.FileCache.purge(hk_storage_file_path)
+        logger.info('Hot keys storage cache purged')
+    if hk_storage_file_path.is_dir():
+        hk_storage_file_path = select_app_from_catalog(hk_storage_file_path, window)
+        if hk_storage_file_path is None:
+            return None
+    hk_storage: vhkt.basic.BasicHotKeysStorage
+    if hk_storage_file_path.suffix in SQLITE_SUFFIXES:
+        from vhkt.sqlitestorage import SqliteHotKeysStorage
+        hk_storage = SqliteHotKeysStorage(hk_storage_file_path)
+        for import_hotkeys_file_path in args.import_hotkeys or []:
+            from vhkt.filestorage import FileHotKeysStorage
+            hk_storage.import_app(FileHotKeysStorage(Path(import_hotkeys_file_path), use_cache=not args.no_cache))
+            logger.info(f'Hot keys imported from "{import_hotkeys_file_path}"')
+        apps_names = hk_storage.apps_names
+        if args.app is None and len(apps_names) != 1:
+            raise ValueError(f'Application should be selected with "--app" option, available ones: {", ".join(apps_names)}')
+        hk_storage.select_app(args.app if args.app is not None else apps_names[0], args.search)
+        if not hk_storage.actions_keys:
+            raise ValueError(f'No actions found for "{hk_storage.app_name}"')
+        results_file_stem = f'{hk_storage_file_path.stem}-{hk_storage.app_name}'
+    elif args.streaming:
+        from vhkt.streamingstorage import StreamingFileHotKeysStorage
+        hk_storage = StreamingFileHotKeysStorage(hk_storage_file_path)
+        results_file_stem = hk_storage_file_path.stem
+    else:
+        from vhkt.filestorage import FileHotKeysStorage
+        hk_storage = FileHotKeysStorage(hk_storage_file_path, use_cache=not args.no_cache)
+        results_file_stem = hk_storage_file_path.stem
     logger.debug('Hot keys storage loaded')
 
     if args.learning_results_file:
         learning_results_file_path = Path(args.learning_results_file)
     else:
-        learning_results_file_path = hk_storage_file_path.parent / f'.results-for-{hk_storage_file_path.stem}.yaml'
+        suffix = vhkt.basic.RESULTS_BACKENDS_SUFFIXES[args.results_backend]
+        learning_results_file_path = hk_storage_file_path.parent / f'.results-for-{results_file_stem}{suffix}'
         logger.info(f'Learning results file path not passed, using "{learning_results_file_path}"')
-    learning_results_storage = vhkt.filestorage.FileLearningResultsStorage(learning_results_file_path, hk_storage)
+    learning_results_storage: vhkt.basic.BasicLearningResultsStorage
+    if args.results_backend == vhkt.basic.ResultsBackend.SQLITE:
+        from vhkt.sqlitestorage import SqliteLearningResultsStorage
+        learning_results_storage = SqliteLearningResultsStorage(learning_results_file_path, hk_storage)
+        if args.import_results:
+            from vhkt.filestorage import FileLearningResultsStorage
+            imported_learning_results_storage = FileLearningResultsStorage(Path(args.import_results), hk_storage)
+            learning_results_storage.import_results(imported_learning_results_storage)
+            logger.info(f'Learning results imported from "{args.import_results}"')
+    elif args.results_backend == vhkt.basic.ResultsBackend.COLUMNAR:
+        from vhkt.columnarstorage import ColumnarLearningResultsStorage
+        learning_results_storage = ColumnarLearningResultsStorage(learning_results_file_path,
+                                                                  hk_storage,
+                                                                  save_interval=args.save_interval)
+        if args.import_results:
+            from vhkt.filestorage import FileLearningResultsStorage
+            imported_learning_results_storage = FileLearningResultsStorage(Path(args.import_results), hk_storage)
+            learning_results_storage.import_results(imported_learning_results_storage)
+            logger.info(f'Learning results imported from "{args.import_results}"')
+    elif args.results_backend == vhkt.basic.ResultsBackend.YAML:
+        from vhkt.filestorage import FileLearningResultsStorage
+        learning_results_storage = FileLearningResultsStorage(learning_results_file_path,
+                                                              hk_storage,
+                                                              journal=args.journal,
+                                                              save_interval=args.save_interval)
+    else:
+        raise NotImplementedError(f'Invalid learning results backend "{args.results_backend}"')
     if not args.learning_results_file:
         learning_results_storage.save()
+    scheduler_class = vhkt.scheduler.SCHEDULERS_CLASSES[args.scheduler]
+    learning_results_storage.set_scheduler(scheduler_class())
+    logger.debug(f'Using "{args.scheduler.value}" scheduler')
 
     return hk_storage, learning_results_storage
 
 
+def init_signal_handlers():
+    # Turn termination signals into SystemExit so learning results are flushed on the way out
+    def handle_signal(signum, frame):
+        raise SystemExit(128 + signum)
+    for signal_name in ('SIGTERM', 'SIGHUP'):
+        if hasattr(signal, signal_name):
+            signal.signal(getattr(signal, signal_name), handle_signal)
+
+
 def init_custom_logger(logging_level):
     lgr = logging.getLogger('custom_logger')
 
@@ -64,7 +191,15 @@ def init_custom_logger(logging_level):
 def init_args():
     parser = argparse.ArgumentParser(description='Learn hotkeys for popular programs')
     parser.add_argument('APP_HOT_KEYS_STORAGE_FILE',
-                        help='Path to application hot keys info storage file')
+                        help=f'Path to application hot keys info storage file, YAML or SQLite catalog with one of {", ".join(SQLITE_SUFFIXES)} extensions, or directory with YAML files to choose application from')
+    parser.add_argument('--app',
+                        help='Application to learn hotkeys for from SQLite catalog, may be omitted if catalog contains only one application')
+    parser.add_argument('--search',
+                        help='Learn only actions with descriptions matching this full text search query, e.g. "tab" or "window", SQLite catalog only')
+    parser.add_argument('--import-hotkeys',
+                        nargs='+',
+                        metavar='YAML_FILE',
+                        help='Import (or replace) applications hot keys from YAML files into SQLite catalog before start')
     parser.add_argument('-l',
                         '--learning-results-file',
                         help='Path to learning results storage file',
@@ -83,17 +218,108 @@ def init_args():
                         choices=[m.value for m in vhkt.basic.AnswerMode],
                         default=vhkt.basic.AnswerMode.SELECT,
                         help=f'Answer mode. Currently only "{vhkt.basic.AnswerMode.SELECT.value}", meaning select hot key from options, is supported. "{vhkt.basic.AnswerMode.INPUT}" mode, i.e. enter hot key directly, is not actively supported and may be considered deprecated and removed in future.')
+    parser.add_argument('-o',
+                        '--options-count',
+                        type=int,
+                        default=vhkt.basic.SELECT_ANSWER_MODE_OPTIONS_COUNT,
+                        help=f'Number of hot keys options to select from in "{vhkt.basic.AnswerMode.SELECT.value}" answer mode, from 2 to 9')
+    parser.add_argument('--prefetch-depth',
+                        type=int,
+                        default=vhkt.prefetch.QuestionsPrefetcher.DEFAULT_DEPTH,
+                        help=f'Number of next questions to prepare while current one is answered in "{vhkt.basic.InterfaceMode.CURSES_TUI.value}" interface mode, 0 disables preparing questions ahead')
+    parser.add_argument('--question-time-limit',
+                        type=float,
+                        metavar='SECONDS',
+                        help=f'Count question as answered wrong if it is not answered in this number of seconds in "{vhkt.basic.InterfaceMode.CURSES_TUI.value}" interface mode, remaining time is shown in status bar')
+    parser.add_argument('--batch-input',
+                        default='-',
+                        help=f'File with answers as JSON lines in "{vhkt.basic.InterfaceMode.BATCH.value}" interface mode, "-" means stdin')
+    parser.add_argument('--batch-output',
+                        default='-',
+                        help=f'File to write graded answers as JSON lines to in "{vhkt.basic.InterfaceMode.BATCH.value}" interface mode, "-" means stdout')
+    parser.add_argument('-s',
+                        '--scheduler',
+                        choices=[m.value for m in vhkt.scheduler.SchedulerMode],
+                        default=vhkt.scheduler.SchedulerMode.RANDOM.value,
+                        help=f'Questions scheduler. "{vhkt.scheduler.SchedulerMode.RANDOM.value}" asks random not learned actions, "{vhkt.scheduler.SchedulerMode.LEITNER.value}" and "{vhkt.scheduler.SchedulerMode.SM2.value}" use spaced repetition and ask learned actions again for review when they are due')
+    parser.add_argument('-b',
+                        '--results-backend',
+                        choices=[b.value for b in vhkt.basic.ResultsBackend],
+                        default=vhkt.basic.ResultsBackend.YAML.value,
+                        help='Learning results storage backend')
+    parser.add_argument('--import-results',
+                        help=f'Path to YAML learning results file to import into "{vhkt.basic.ResultsBackend.SQLITE.value}" learning results storage before start')
+    parser.add_argument('-j',
+                        '--journal',
+                        action='store_true',
+                        help='Append learning results changes to journal file near learning results file instead of rewriting whole file after each answer, journal is merged into learning results file when it grows big and on exit')
+    parser.add_argument('--save-interval',
+                        type=float,
+                        default=1.0,
+                        help='Save learning results in background not more often than once per this number of seconds, 0 means save synchronously after each answer')
+    parser.add_argument('--profile',
+                        metavar='STATS_FILE',
+                        help='Run session under cProfile and write its stats to this file on exit, it could be viewed e.g. with "python3 -m pstats STATS_FILE"')
+    parser.add_argument('--timings-file',
+                        help='Write JSON summary of storages loads and saves, questions preparation and interface states handling durations to this file on exit. Last interface state duration is also shown in status bar in debug mode')
+    parser.add_argument('--streaming',
+                        action='store_true',
+                        help='Do not load whole YAML hot keys storage file into memory, only index it and read actions from it when they are asked, for very large files')
+    parser.add_argument('--no-cache',
+                        action='store_true',
+                        help=f'Do not use (and do not update) compiled hot keys storage cache in "{vhkt.filecache.FileCache.CACHE_DIR_NAME}" directory near hot keys storage file')
+    parser.add_argument('--purge-cache',
+                        action='store_true',
+                        help='Remove compiled hot keys storage cache before loading')
     global args
     args = parser.parse_args()
     args.interface_mode = vhkt.basic.InterfaceMode(args.interface_mode)
     args.answer_mode = vhkt.basic.AnswerMode(args.answer_mode)
+    args.scheduler = vhkt.scheduler.SchedulerMode(args.scheduler)
+    args.results_backend = vhkt.basic.ResultsBackend(args.results_backend)
+    if not 2 <= args.options_count <= 9:
+        parser.error('--options-count should be from 2 to 9')
+    if args.prefetch_depth < 0:
+        parser.error('--prefetch-depth should not be negative')
+    if args.question_time_limit is not None and args.question_time_limit <= 0:
+        parser.error('--question-time-limit should be positive')
+    if Path(args.APP_HOT_KEYS_STORAGE_FILE).suffix not in SQLITE_SUFFIXES:
+        for option, value in (('--app', args.app), ('--search', args.search), ('--import-hotkeys', args.import_hotkeys)):
+            if value:
+                parser.error(f'{option} could be used only with SQLite hot keys catalog')
+    if args.interface_mode == vhkt.basic.InterfaceMode.BATCH and Path(args.APP_HOT_KEYS_STORAGE_FILE).is_dir():
+        parser.error(f'Hot keys file, not directory, should be passed in "{vhkt.basic.InterfaceMode.BATCH.value}" interface mode')
+    if args.streaming:
+        from vhkt.formats import YamlFormat
+        if Path(args.APP_HOT_KEYS_STORAGE_FILE).suffix.lower() not in YamlFormat.extensions:
+            parser.error('--streaming could be used only with YAML hot keys storage')
+    if args.import_results and args.results_backend == vhkt.basic.ResultsBackend.YAML:
+        parser.error(f'--import-results requires "{vhkt.basic.ResultsBackend.SQLITE.value}" or "{vhkt.basic.ResultsBackend.COLUMNAR.value}" learning results backend')
 
 
 if __name__ == '__main__':
     init_args()
     logging_level = logging.DEBUG if args.debug else logging.INFO
     logger = init_custom_logger(logging_level)
-    if args.interface_mode == vhkt.basic.InterfaceMode.SIMPLE_TEXT:
-        main()
-    else:
-        curses.wrapper(main)
+    init_signal_handlers()
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        if args.interface_mode in (vhkt.basic.InterfaceMode.SIMPLE_TEXT, vhkt.basic.InterfaceMode.BATCH):
+            main()
+        else:
+            import curses
+            curses.wrapper(main)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            logger.info(f'Profile stats written to "{args.profile}"')
+        if args.timings_file:
+            import json
+            with open(args.timings_file, 'w') as fout:
+                json.dump(vhkt.timing.timings.summary(), fout, indent=1)
+            logger.info(f'Timings written to "{args.timings_file}"')
@@ -3,12 +3,17 @@
 
 from enum import Enum
 from abc import ABC, abstractmethod, abstractproperty
+from typing import Tuple
+
+from vhkt.keycombo import Hotkey
+from vhkt.timing import timed
 
 
 class InterfaceMode(Enum):
     SIMPLE_TEXT = 'simple-text'
     CURSES_TEXT = 'curses-text'
     CURSES_TUI = 'curses-tui'
+    BATCH = 'batch'
 
 
 class AnswerMode(Enum):
@@ -16,6 +21,24 @@ class AnswerMode(Enum):
     INPUT = 'input'
 
 
+# Number of hot keys options to choose from in "select" answer mode
+SELECT_ANSWER_MODE_OPTIONS_COUNT = 4
+
+
+class ResultsBackend(Enum):
+    YAML = 'yaml'
+    SQLITE = 'sqlite'
+    COLUMNAR = 'columnar'
+
+
+# Suffixes of learning results files which are created if path is not passed
+RESULTS_BACKENDS_SUFFIXES = {
+    ResultsBackend.YAML: '.yaml',
+    ResultsBackend.SQLITE: '.sqlite3',
+    ResultsBackend.COLUMNAR: '.columns',
+}
+
+
 class BasicHotKeysStorage(ABC):
 
     @property
@@ -37,14 +60,22 @@ class BasicHotKeysStorage(ABC):
         pass
 
     @abstractmethod
-    def action_hotkeys_by_key(self, key):
+    def action_hotkeys_by_key(self, key) -> Tuple[Hotkey, ...]:
         pass
 
+    def action_has_hotkey(self, key, hotkey: Hotkey) -> bool:
+        return hotkey in self.action_hotkeys_by_key(key)
+
 
 class BasicLearningResultsStorage(ABC):
 
     CORRECT_ANSWERS_TO_LEARN = 3
 
+    # True if "save" could be called from other thread while storage is changed, e.g. because data is guarded by lock
+    THREAD_SAFE_SAVE = False
+
+    scheduler = None
+
     @property
     @abstractmethod
     def actions_keys(self):
@@ -58,6 +89,10 @@ class BasicLearningResultsStorage(ABC):
     def action_guesses(self, action_key) -> int:
         pass
 
+    @abstractmethod
+    def action_correct_guesses(self, action_key) -> int:
+        pass
+
     @abstractmethod
     def action_error_guesses(self, action_key) -> int:
         pass
@@ -66,6 +101,22 @@ class BasicLearningResultsStorage(ABC):
     def action_learning_in_process(self, action_key) -> bool:
         pass
 
+    @abstractmethod
+    def action_skipped(self, action_key) -> bool:
+        pass
+
+    @abstractmethod
+    def action_schedule(self, action_key) -> dict:
+        pass
+
+    @abstractmethod
+    def set_action_schedule(self, action_key, schedule: dict):
+        pass
+
+    def set_scheduler(self, scheduler):
+        self.scheduler = scheduler
+        scheduler.attach(self)
+
     @property
     def actions_count(self) -> int:
         return len(self.actions_keys)
@@ -143,10 +194,22 @@ class BasicLearningResultsStorage(ABC):
     def random_nonlearned_action_key(self):
         pass
 
+    @property
+    def next_action_key(self):
+        if self.scheduler is not None:
+            return self.scheduler.next_action_key()
+        return self.random_nonlearned_action_key
+
     @abstractmethod
     def save(self):
         pass
 
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
 
 class BasicTutor(ABC):
 
@@ -208,12 +271,9 @@ class BasicTutor(ABC):
             elif answer_type == self.AnswerType.EXIT:
                 return 0
             elif answer_type == self.AnswerType.REGULAR_ANSWER:
-                if len(answer_blocks) > 1 and answer_blocks in self.hk_storage.action_hotkeys_by_key(action_key) \
-                        or len(answer_blocks) == 1 and answer_blocks[0] in self.hk_storage.action_hotkeys_by_key(action_key):
-                    self.learning_results_storage.set_action_guess_correct(action_key)
+                if self.check_answer(action_key, answer_blocks):
                     self.print('Correct!')
                 else:
-                    self.learning_results_storage.set_action_guess_wrong(action_key)
                     self.print('Wrong!')
                     while True:
                         question = f'{self.question_for_correct_answer}: '
@@ -242,15 +302,15 @@ class BasicTutor(ABC):
                 self.on_exit()
                 return
 
+    def check_answer(self, action_key, answer_blocks) -> bool:
+        correctness = self.hk_storage.action_has_hotkey(action_key, Hotkey.from_answer(answer_blocks))
+        self.learning_results_storage.set_action_guess_correctness(action_key, correctness)
+        return correctness
+
     def help_for_action(self, action_key):
         helps = []
         for hotkey in self.hk_storage.action_hotkeys_by_key(action_key):
-            if isinstance(hotkey, list):
-                helps.append('"' + ','.join([f'{h}' for h in hotkey]) + '"')
-            elif isinstance(hotkey, str):
-                helps.append(f'"{hotkey}"')
-            else:
-                raise NotImplementedError
+            helps.append(f'"{hotkey}"')
         hotkeys_str = ' or '.join(helps)
         return f'Key combination(s) for "{self.hk_storage.action_description_by_key(action_key)}": {hotkeys_str}'
 
@@ -268,9 +328,10 @@ class BasicTutor(ABC):
     def on_exit(self):
         pass
 
+    @timed('prepare_question')
     def prepare_question(self):
         while True:
-            random_action_key = self.learning_results_storage.random_nonlearned_action_key
+            random_action_key = self.learning_results_storage.next_action_key
             if random_action_key is None:
                 raise Exception('Unexpected error, random_action_key is None')
             try:
@@ -0,0 +1,110 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import json
+
+from vhkt.basic import BasicTutor
+from vhkt.keycombo import split_sequence
+
+
+class BatchTutor(BasicTutor):
+
+    # Non-interactive tutor for scripted drills and load tests. Reads answers as JSON lines and writes graded
+    # results as JSON lines, nothing is printed to terminal. Answer record is
+    #   {"answer": "Ctrl+w"} or {"answer": ["d", "d"]} to answer next question, which is selected as in other modes,
+    #   {"action": "delete_current_line", "answer": "d,d"} to answer question for given action,
+    #   {"skip": true} or {"action": "...", "skip": true} to skip action.
+    # String answer is split by "," like in simple text mode. Results are written in chunks of "buffer_lines"
+    # lines and summary record with "done" key is written last
+
+    DEFAULT_BUFFER_LINES = 1000
+
+    def __init__(self, hk_storage, learning_results_storage, fin, fout, buffer_lines: int = DEFAULT_BUFFER_LINES):
+        super().__init__(hk_storage, learning_results_storage)
+        self._fin = fin
+        self._fout = fout
+        self._buffer_lines = buffer_lines
+        self._buffer = []
+        self.answers_count = 0
+        self.correct_answers_count = 0
+
+    def print(self, msg):
+        pass
+
+    def show_welcome_message(self):
+        pass
+
+    def show_obsolete_interface_mode_warning(self):
+        pass
+
+    def answer_for_question(self, question):
+        raise NotImplementedError('Batch tutor reads answers in "tutor" method')
+
+    def _write(self, result: dict):
+        self._buffer.append(json.dumps(result, ensure_ascii=False) + '\n')
+        if len(self._buffer) >= self._buffer_lines:
+            self._flush()
+
+    def _flush(self):
+        self._fout.writelines(self._buffer)
+        self._buffer.clear()
+        self._fout.flush()
+
+    def process_record(self, record: dict) -> dict:
+        if not isinstance(record, dict):
+            raise ValueError('Answer record should be JSON object')
+        action_key = record.get('action')
+        result = {}
+        if action_key is None:
+            if self.learning_results_storage.all_actions_learned_successfully:
+                raise ValueError(self.success_string)
+            action_key, question, _ = self.prepare_question()
+            result['question'] = question
+        else:
+            try:
+                self.hk_storage.key_combination_type_by_key(action_key)
+            except (KeyError, TypeError):
+                raise ValueError(f'Unknown action "{action_key}"')
+        result['action'] = action_key
+        if record.get('skip'):
+            self.learning_results_storage.skip_action(action_key)
+            result['skipped'] = True
+        else:
+            answer = record.get('answer')
+            if isinstance(answer, str):
+                answer_blocks = split_sequence(answer)
+            elif isinstance(answer, list) and answer and all(isinstance(block, str) for block in answer):
+                answer_blocks = answer
+            else:
+                raise ValueError('Answer should be string or list of strings')
+            correctness = self.check_answer(action_key, answer_blocks)
+            self.answers_count += 1
+            self.correct_answers_count += correctness
+            result['answer'] = answer_blocks
+            result['correct'] = correctness
+            result['hotkeys'] = [str(hotkey) for hotkey in self.hk_storage.action_hotkeys_by_key(action_key)]
+        result['learned'] = self.learning_results_storage.action_success(action_key)
+        self.learning_results_storage.save()
+        return result
+
+    def tutor(self):
+        try:
+            for line_number, line in enumerate(self._fin, 1):
+                if not line.strip():
+                    continue
+                try:
+                    result = self.process_record(json.loads(line))
+                except (ValueError, KeyError) as err:
+                    result = {'error': str(err)}
+                result['line'] = line_number
+                self._write(result)
+            self._write({
+                'done': True,
+                'answers': self.answers_count,
+                'correct_answers': self.correct_answers_count,
+                'all_learned': self.learning_results_storage.all_actions_learned_successfully,
+                'stats': self.learning_stats,
+            })
+        finally:
+            self._flush()
+        return 0
@@ -0,0 +1,139 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from vhkt.filecache import FileCache
+from vhkt.filestorage import FileHotKeysStorage
+from vhkt.formats import FORMATS
+from vhkt.writer import write_file_atomically
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogEntry(NamedTuple):
+
+    # File which could not be loaded has "error" set and file name as application name, it is shown as unavailable
+
+    file_name: str
+    app_name: str
+    actions_count: int
+    sha256: str
+    mtime_ns: int
+    size: int
+    error: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return self.error is None
+
+    @property
+    def title(self) -> str:
+        if not self.available:
+            return f'{self.app_name} (unavailable: {self.error})'
+        return f'{self.app_name} ({self.actions_count} action(s))'
+
+
+class HotKeysCatalog:
+
+    # Applications found in hot keys directory, described by manifest which is updated only for changed files,
+    # so listing applications does not require parsing all hot keys files. Hidden files, e.g. default learning
+    # results files, are not hot keys files. Broken files are kept in manifest too, so they are not parsed again
+    # until changed. Manifest is not used if cache is disabled
+
+    MANIFEST_FILE_NAME = 'manifest.json'
+    MANIFEST_VERSION = 2
+
+    def __init__(self, dir_path, use_cache: bool = True):
+        self.dir_path = Path(dir_path)
+        self.manifest_file_path = self.dir_path / FileCache.CACHE_DIR_NAME / self.MANIFEST_FILE_NAME
+        self._use_cache = use_cache
+        self._entries: Dict[str, CatalogEntry] = self._load_manifest() if use_cache else {}
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_file_path, 'r') as fin:
+                manifest = json.load(fin)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != self.MANIFEST_VERSION:
+            return {}
+        return {
+            file_name: CatalogEntry(file_name=file_name, **entry)
+            for file_name, entry in manifest['entries'].items()
+        }
+
+    def _save_manifest(self):
+        manifest = {
+            'version': self.MANIFEST_VERSION,
+            'entries': {
+                entry.file_name: {k: v for k, v in entry._asdict().items() if k != 'file_name'}
+                for entry in self._entries.values()
+            },
+        }
+        try:
+            self.manifest_file_path.parent.mkdir(exist_ok=True)
+            write_file_atomically(self.manifest_file_path, json.dumps(manifest, indent=1))
+        except OSError:
+            # Manifest is optional, e.g. hot keys directory may be read-only
+            pass
+
+    def refresh(self) -> List[CatalogEntry]:
+        changed = False
+        entries = {}
+        hkdb_files_paths = [
+            file_path
+            for file_path in self.dir_path.iterdir()
+            if not file_path.name.startswith('.') and file_path.suffix.lower() in FORMATS and file_path.is_file()
+        ]
+        for hkdb_file_path in sorted(hkdb_files_paths):
+            stat = os.stat(hkdb_file_path)
+            entry = self._entries.get(hkdb_file_path.name)
+            if entry is None or entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                with open(hkdb_file_path, 'rb') as fin:
+                    sha256 = hashlib.sha256(fin.read()).hexdigest()
+                if entry is None or entry.sha256 != sha256:
+                    try:
+                        hk_storage = FileHotKeysStorage(hkdb_file_path, use_cache=self._use_cache)
+                    except Exception as e:
+                        # One broken file should not hide other applications
+                        logger.warning(f'"{hkdb_file_path}" could not be loaded as hot keys file: {e!r}')
+                        entry = CatalogEntry(file_name=hkdb_file_path.name,
+                                             app_name=hkdb_file_path.name,
+                                             actions_count=0,
+                                             sha256=sha256,
+                                             mtime_ns=stat.st_mtime_ns,
+                                             size=stat.st_size,
+                                             error=f'{type(e).__name__}: {e}')
+                    else:
+                        entry = CatalogEntry(file_name=hkdb_file_path.name,
+                                             app_name=hk_storage.app_name,
+                                             actions_count=len(hk_storage.actions_keys),
+                                             sha256=sha256,
+                                             mtime_ns=stat.st_mtime_ns,
+                                             size=stat.st_size)
+                else:
+                    # File was touched but not changed
+                    entry = entry._replace(mtime_ns=stat.st_mtime_ns)
+                changed = True
+            entries[hkdb_file_path.name] = entry
+        if changed or entries.keys() != self._entries.keys():
+            self._entries = entries
+            if self._use_cache:
+                self._save_manifest()
+        return self.entries
+
+    @property
+    def entries(self) -> List[CatalogEntry]:
+        return sorted(self._entries.values(), key=lambda entry: entry.app_name.lower())
+
+    def file_path(self, entry: CatalogEntry) -> Path:
+        return self.dir_path / entry.file_name
+
+    def open(self, entry: CatalogEntry) -> FileHotKeysStorage:
+        return FileHotKeysStorage(self.file_path(entry), use_cache=self._use_cache)
@@ -0,0 +1,319 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import json
+import os
+import sys
+import threading
+from array import array
+from typing import Dict, List
+
+from vhkt.basic import BasicHotKeysStorage, BasicLearningResultsStorage
+from vhkt.sampling import RandomPool
+from vhkt.timing import timed
+from vhkt.writer import BackgroundWriter, synchronized, write_file_atomically
+
+
+class ColumnarLearningResultsStorage(BasicLearningResultsStorage):
+
+    # Learning results kept as columns, one array of numbers per field. Actions get dense integer indexes into
+    # columns, so whole storage is several flat arrays instead of object per action and snapshot is just their bytes.
+    # Aggregates are sums of columns, computed on load and then updated by each change. Actions which were never
+    # guessed have zero guesses, correct and error guesses of such actions are reported as None like in other
+    # storages. Snapshot file consists of header, actions keys and schedules as JSON and raw columns bytes:
+    # MAGIC, header JSON line, keys JSON, schedules JSON, columns
+
+    lrnres_file_path: str = None
+
+    MAGIC = b'VHKTCOL\n'
+    FORMAT_VERSION = 1
+
+    THREAD_SAFE_SAVE = True
+    # Column name and array type code, counters are 64 bit and flags are 8 bit
+    COLUMNS = (
+        ('guesses', 'q'),
+        ('correct_guesses', 'q'),
+        ('error_guesses', 'q'),
+        ('success', 'B'),
+        ('skip', 'B'),
+        # Derived from columns above and kept to count actions in process with sum as well
+        ('in_process', 'B'),
+    )
+
+    @timed('learning_results_storage_load')
+    def __init__(self,
+                 lrnres_file_path: str,
+                 hk_storage: BasicHotKeysStorage,
+                 save_interval: float = None):
+        self.lrnres_file_path = lrnres_file_path
+        self.hk_storage: BasicHotKeysStorage = hk_storage
+        # Guards columns against background writer, which serializes them while UI thread mutates them
+        self._lock = threading.RLock()
+        self._keys: List[str] = []
+        self._indexes: Dict[str, int] = {}
+        self._columns: Dict[str, array] = {name: array(typecode) for name, typecode in self.COLUMNS}
+        self._schedules: Dict[str, dict] = {}
+        # Encoded actions keys, reused by snapshots until actions are added or removed
+        self._keys_blob = None
+        # Sums of columns, computed once on load and then updated by each change
+        self._sums: Dict[str, int] = {}
+        if os.path.isfile(lrnres_file_path):
+            with open(lrnres_file_path, 'rb') as fin:
+                raw_data = fin.read()
+            if raw_data:
+                self._load(raw_data)
+        for key in hk_storage.actions_keys:
+            if key not in self._indexes:
+                self._add_action(key)
+        self._sums = {name: sum(self._columns[name]) for name, _ in self.COLUMNS if name != 'correct_guesses'}
+        self._prev_action_key = None
+        self._hk_actions_keys = frozenset(hk_storage.actions_keys)
+        self._nonlearned_actions_keys = RandomPool()
+        for action_key in self._keys:
+            self._update_action_eligibility(action_key)
+        self._writer = BackgroundWriter(self._save_now, save_interval) if save_interval else None
+
+    def _load(self, raw_data: bytes):
+        if not raw_data.startswith(self.MAGIC):
+            raise ValueError(f'"{self.lrnres_file_path}" is not columnar learning results file')
+        header_end = raw_data.index(b'\n', len(self.MAGIC))
+        header = json.loads(raw_data[len(self.MAGIC):header_end])
+        if header.get('format_version') != self.FORMAT_VERSION:
+            raise ValueError(f'Unsupported columnar learning results format version "{header.get("format_version")}"')
+        view = memoryview(raw_data)
+        offset = header_end + 1
+        self._keys = json.loads(bytes(view[offset:offset + header['keys_size']]))
+        offset += header['keys_size']
+        self._schedules = json.loads(bytes(view[offset:offset + header['schedules_size']]))
+        offset += header['schedules_size']
+        self._indexes = {key: i for i, key in enumerate(self._keys)}
+        # Columns missing in file, e.g. added in later version, are filled with zeros
+        for name, typecode in self.COLUMNS:
+            column = self._columns[name]
+            if name in header['columns']:
+                if header['columns'][name] != typecode:
+                    raise ValueError(f'Unexpected type "{header["columns"][name]}" of column "{name}" in "{self.lrnres_file_path}"')
+                size = column.itemsize * len(self._keys)
+                column.frombytes(view[offset:offset + size])
+                offset += size
+                if header['byteorder'] != sys.byteorder:
+                    column.byteswap()
+            else:
+                column.frombytes(bytes(column.itemsize * len(self._keys)))
+
+    def _serialize(self) -> bytes:
+        with self._lock:
+            if self._keys_blob is None:
+                self._keys_blob = json.dumps(self._keys, ensure_ascii=False).encode('utf-8')
+            schedules_blob = json.dumps(self._schedules, ensure_ascii=False).encode('utf-8')
+            header = {
+                'format_version': self.FORMAT_VERSION,
+                'byteorder': sys.byteorder,
+                'columns': {name: typecode for name, typecode in self.COLUMNS},
+                'keys_size': len(self._keys_blob),
+                'schedules_size': len(schedules_blob),
+            }
+            chunks = [self.MAGIC, json.dumps(header).encode('utf-8'), b'\n', self._keys_blob, schedules_blob]
+            chunks.extend(self._columns[name].tobytes() for name, _ in self.COLUMNS)
+        return b''.join(chunks)
+
+    def _add_action(self, action_key):
+        self._indexes[action_key] = len(self._keys)
+        self._keys.append(action_key)
+        for column in self._columns.values():
+            column.append(0)
+        self._keys_blob = None
+
+    def _index(self, action_key) -> int:
+        index = self._indexes.get(action_key)
+        if index is None:
+            self._add_action(action_key)
+            index = self._indexes[action_key]
+        return index
+
+    def _update_action_eligibility(self, action_key):
+        index = self._indexes.get(action_key)
+        if index is not None \
+                and action_key in self._hk_actions_keys \
+                and not self._columns['skip'][index] \
+                and not self._columns['success'][index]:
+            self._nonlearned_actions_keys.add(action_key)
+        else:
+            self._nonlearned_actions_keys.discard(action_key)
+
+    def _set(self, name, index, value):
+        column = self._columns[name]
+        if name in self._sums:
+            self._sums[name] += value - column[index]
+        column[index] = value
+
+    def _update_in_process(self, index):
+        self._set('in_process', index, int(self._columns['guesses'][index] > 0 and not self._columns['success'][index]))
+
+    @property
+    def actions_keys(self):
+        return list(self._keys)
+
+    @property
+    def actions_count(self) -> int:
+        return len(self._keys)
+
+    def _guesses_column(self, action_key, name):
+        index = self._indexes[action_key]
+        if not self._columns['guesses'][index]:
+            return None
+        return self._columns[name][index]
+
+    def action_success(self, action_key) -> bool:
+        return bool(self._columns['success'][self._indexes[action_key]])
+
+    def action_guesses(self, action_key) -> int:
+        return self._guesses_column(action_key, 'guesses')
+
+    def action_correct_guesses(self, action_key) -> int:
+        return self._guesses_column(action_key, 'correct_guesses')
+
+    def action_error_guesses(self, action_key) -> int:
+        return self._guesses_column(action_key, 'error_guesses')
+
+    def action_learning_in_process(self, action_key) -> bool:
+        return bool(self._columns['in_process'][self._indexes[action_key]])
+
+    def action_skipped(self, action_key) -> bool:
+        return bool(self._columns['skip'][self._indexes[action_key]])
+
+    def action_schedule(self, action_key) -> dict:
+        if action_key not in self._indexes:
+            raise KeyError(action_key)
+        return self._schedules.get(action_key, {})
+
+    @synchronized
+    def set_action_schedule(self, action_key, schedule: dict):
+        self._index(action_key)
+        self._schedules[action_key] = schedule
+
+    @property
+    def actions_learned_count(self) -> int:
+        return self._sums['success']
+
+    @property
+    def actions_learning_in_process_count(self) -> int:
+        return self._sums['in_process']
+
+    @property
+    def actions_guesses_count(self) -> int:
+        return self._sums['guesses']
+
+    @property
+    def actions_error_guesses_count(self) -> int:
+        return self._sums['error_guesses']
+
+    @property
+    def skipped_actions_count(self):
+        return self._sums['skip']
+
+    @synchronized
+    def remove_results_for_action(self, action_key):
+        # Last action takes place of removed one, so ids stay dense
+        index = self._indexes.pop(action_key)
+        last_key = self._keys.pop()
+        for name, column in self._columns.items():
+            if name in self._sums:
+                self._sums[name] -= column[index]
+            last_value = column.pop()
+            if index < len(self._keys):
+                column[index] = last_value
+        if index < len(self._keys):
+            self._keys[index] = last_key
+            self._indexes[last_key] = index
+        self._schedules.pop(action_key, None)
+        self._keys_blob = None
+        self._nonlearned_actions_keys.discard(action_key)
+        if self.scheduler is not None:
+            self.scheduler.on_remove(action_key)
+
+    @synchronized
+    def set_action_learned_successfully(self, action_key):
+        index = self._index(action_key)
+        self._set('success', index, 1)
+        self._update_in_process(index)
+        self._update_action_eligibility(action_key)
+        if self.scheduler is not None:
+            self.scheduler.on_learned(action_key)
+
+    @synchronized
+    def set_action_guess_correctness(self, action_key, correctness):
+        index = self._index(action_key)
+        guesses = self._columns['guesses']
+        correct_guesses = self._columns['correct_guesses']
+        # Action becomes learned only after correct guesses counting started, like in other storages
+        if correctness and guesses[index] > 0:
+            correct_guesses[index] += 1
+            if correct_guesses[index] >= self.CORRECT_ANSWERS_TO_LEARN:
+                self._set('success', index, 1)
+        elif correctness:
+            correct_guesses[index] = 1
+        elif correct_guesses[index] > 0:
+            correct_guesses[index] -= 1
+        if not correctness:
+            self._set('error_guesses', index, self._columns['error_guesses'][index] + 1)
+        self._set('guesses', index, guesses[index] + 1)
+        self._update_in_process(index)
+        self._update_action_eligibility(action_key)
+        if self.scheduler is not None:
+            self.scheduler.on_guess(action_key, correctness)
+
+    @synchronized
+    def skip_action(self, action_key):
+        index = self._indexes[action_key]
+        self._set('skip', index, 1)
+        self._update_action_eligibility(action_key)
+        if self.scheduler is not None:
+            self.scheduler.on_skip(action_key)
+
+    @property
+    def all_actions_learned_successfully(self) -> bool:
+        return len(self._keys) > 0 \
+            and len(self._nonlearned_actions_keys) == 0 \
+            and (self.scheduler is None or not self.scheduler.has_due_reviews)
+
+    @property
+    def random_nonlearned_action_key(self):
+        random_action_key = self._nonlearned_actions_keys.choice(exclude=self._prev_action_key)
+        if random_action_key is not None:
+            self._prev_action_key = random_action_key
+        return random_action_key
+
+    @synchronized
+    def import_results(self, learning_results_storage: BasicLearningResultsStorage):
+        for key in learning_results_storage.actions_keys:
+            index = self._index(key)
+            self._set('guesses', index, learning_results_storage.action_guesses(key) or 0)
+            self._set('correct_guesses', index, learning_results_storage.action_correct_guesses(key) or 0)
+            self._set('error_guesses', index, learning_results_storage.action_error_guesses(key) or 0)
+            self._set('success', index, int(learning_results_storage.action_success(key)))
+            self._set('skip', index, int(learning_results_storage.action_skipped(key)))
+            self._update_in_process(index)
+            schedule = learning_results_storage.action_schedule(key)
+            if schedule:
+                self._schedules[key] = schedule
+            self._update_action_eligibility(key)
+
+    def save(self):
+        if self._writer is not None:
+            self._writer.request()
+        else:
+            self._save_now()
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    @timed('learning_results_storage_save')
+    def _save_now(self):
+        write_file_atomically(self.lrnres_file_path, self._serialize())
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,38 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+# Converts hot keys or learning results file between formats selected by files extensions, e.g. human editable YAML
+# hot keys file from repository to format which is faster to load
+# python3 -m vhkt.convert hotkeys/vim.yaml vim.marshal
+
+import argparse
+import sys
+
+from vhkt.formats import FORMATS, format_for_path
+from vhkt.writer import write_file_atomically
+
+
+def convert(src_file_path, dst_file_path):
+    src_format = format_for_path(src_file_path)
+    dst_format = format_for_path(dst_file_path)
+    with open(src_file_path, 'rb') as fin:
+        data = src_format.load(fin.read())
+    write_file_atomically(dst_file_path, dst_format.dump(data))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hot keys and learning results files formats converter')
+    parser.add_argument('SRC_FILE',
+                        help=f'File to convert, supported extensions: {", ".join(FORMATS)}')
+    parser.add_argument('DST_FILE',
+                        help='File to write converted data to')
+    args = parser.parse_args(argv)
+    try:
+        convert(args.SRC_FILE, args.DST_FILE)
+    except (OSError, ValueError) as err:
+        print(f'ERROR: {err}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import curses
+import textwrap
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, NamedTuple, Tuple
+
+
+class ScreenLine(NamedTuple):
+    y: int
+    x: int
+    text: str
+    attr: int
+
+
+class Alignment(Enum):
+    # Text is wrapped to width and goes down from given row
+    TOP = 'top'
+    # Text is wrapped to width, padded with spaces to fill whole rows and ends at given row
+    BOTTOM = 'bottom'
+    # Text is split to lines by newlines and wrapped to width, each line is centered and goes down from given row
+    CENTER = 'center'
+
+
+class LayoutCache:
+
+    # Screen lines of laid out texts, so unchanged texts are not wrapped and centered again on each frame
+
+    def __init__(self, maxsize=256):
+        self._maxsize = maxsize
+        self._layouts: Dict[tuple, Tuple[ScreenLine, ...]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._layouts)
+
+    def clear(self):
+        self._layouts.clear()
+
+    def layout(self, text: str, width: int, y: int, attr: int, alignment: Alignment) -> Tuple[ScreenLine, ...]:
+        key = (text, width, y, attr, alignment)
+        lines = self._layouts.get(key)
+        if lines is not None:
+            self._layouts.move_to_end(key)
+            return lines
+        if alignment == Alignment.TOP:
+            lines = tuple(ScreenLine(y + line_i, 0, line, attr)
+                          for line_i, line in enumerate(textwrap.wrap(text, width=width - 1)))
+        elif alignment == Alignment.BOTTOM:
+            wrapped_lines = textwrap.wrap(text, width=width - 1)
+            lines = tuple(ScreenLine(y - len(wrapped_lines) + 1 + line_i, 0, line.ljust(width - 1), attr)
+                          for line_i, line in enumerate(wrapped_lines))
+        elif alignment == Alignment.CENTER:
+            # Lines longer than screen are wrapped, otherwise they would start left of screen
+            centered_lines = [wrapped_line
+                              for line in text.split('\n')
+                              for wrapped_line in ([line] if len(line) < width else textwrap.wrap(line, width=width - 1))]
+            lines = tuple(ScreenLine(y + line_i, width // 2 - len(line) // 2, line, attr)
+                          for line_i, line in enumerate(centered_lines))
+        else:
+            raise ValueError(f'Invalid alignment "{alignment}"')
+        self._layouts[key] = lines
+        if len(self._layouts) > self._maxsize:
+            self._layouts.popitem(last=False)
+        return lines
+
+
+class DifferentialRenderer:
+
+    # Keeps lines of previous frame grouped by named regions and on each frame redraws only regions which changed.
+    # Regions occupy whole rows, so old region content is erased by clearing its rows, and curses sends
+    # to terminal only changed cells because screen is never cleared entirely except after resize
+
+    def __init__(self, window, doupdate=None):
+        self.window = window
+        self._doupdate = doupdate if doupdate is not None else curses.doupdate
+        self._regions: Dict[str, Tuple[ScreenLine, ...]] = {}
+        self._frame: Dict[str, Tuple[ScreenLine, ...]] = {}
+        self._size = None
+        self.layout_cache = LayoutCache()
+
+    def invalidate(self):
+        self._size = None
+
+    def begin_frame(self):
+        size = self.window.getmaxyx()
+        if size != self._size:
+            self._size = size
+            self._regions = {}
+            self.layout_cache.clear()
+            self.window.erase()
+        self._frame = {}
+
+    def set_region(self, name, lines):
+        self._frame[name] = tuple(lines)
+
+    def end_frame(self):
+        changed_regions_names = [
+            name
+            for name in self._regions.keys() | self._frame.keys()
+            if self._regions.get(name) != self._frame.get(name)
+        ]
+        cleared_rows = set()
+        for name in changed_regions_names:
+            for line in self._regions.get(name, ()):
+                if line.y not in cleared_rows:
+                    self.window.move(line.y, 0)
+                    self.window.clrtoeol()
+                    cleared_rows.add(line.y)
+        for name, lines in self._frame.items():
+            if name in changed_regions_names or any(line.y in cleared_rows for line in lines):
+                for line in lines:
+                    self.window.addstr(line.y, line.x, line.text, line.attr)
+        self._regions = self._frame
+        self.window.noutrefresh()
+        self._doupdate()
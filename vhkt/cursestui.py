@@ -1,15 +1,25 @@
 # Copyleft GPLv3 or later
 # 2020 Dmitriy Vinokurov gim6626@gmail.com
 
+import asyncio
 import curses
+import math
+import sys
 import textwrap
 import random
 from typing import List, Sequence
 from enum import Enum
 import string
+import time
 
 import vhkt.basic
 from vhkt.basic import BasicTutor
+from vhkt.cursesrender import Alignment, DifferentialRenderer
+from vhkt.distractors import DistractorIndex
+from vhkt.keycombo import Hotkey
+from vhkt.keyreader import KeyReader
+from vhkt.prefetch import PreparedQuestion, QuestionsPrefetcher
+from vhkt.timing import timings
 
 
 class ColorMode(Enum):
@@ -27,6 +37,7 @@ class InterfaceState(Enum):
     CHECKING_ANSWER = 'check-answer'
     CORRECT_ANSWER = 'correct-answer'
     INCORRECT_ANSWER = 'incorrect-answer'
+    TIME_IS_OUT = 'time-is-out'
     CHECKING_IF_HELP_IS_NEEDED = 'checking-if-help-is-needed'
     SHOWING_HELP = 'showing-help'
     ALL_SUCCESS = 'all-success'
@@ -86,7 +97,7 @@ class AnswerOptionsDisplayBlock(DisplayBlock):
     def __init__(self, correct_answer, options: Sequence[str]):
         lines = []
         for i, option in enumerate(options):
-            option_str = " or ".join(option) if isinstance(option, list) else option
+            option_str = ' or '.join(str(hotkey) for hotkey in option)
             line = f'{i + 1}. {str(option_str)}'
             lines.append(line)
         text = '\n'.join(lines)
@@ -126,9 +137,21 @@ class CursesTuiTutor(BasicTutor):
 
     OBSOLETE_ANSWER_MODE_WARNING = f'WARNING: "{vhkt.basic.AnswerMode.INPUT.value}" answer mode is deprecated, may not work properly and possibly will be removed in future versions. Please use "{vhkt.basic.AnswerMode.SELECT.value}" answer mode instead.'
 
-    def __init__(self, hk_storage, learning_results_storage, answer_mode, window):
+    DEFAULT_OPTIONS_COUNT = vhkt.basic.SELECT_ANSWER_MODE_OPTIONS_COUNT
+
+    def __init__(self,
+                 hk_storage,
+                 learning_results_storage,
+                 answer_mode,
+                 window,
+                 options_count=DEFAULT_OPTIONS_COUNT,
+                 prefetch_depth=QuestionsPrefetcher.DEFAULT_DEPTH,
+                 show_timings=False,
+                 question_time_limit: float = None,
+                 key_reader: KeyReader = None):
         super().__init__(hk_storage, learning_results_storage)
         self.window = window
+        self._renderer = DifferentialRenderer(window)
         self._input_string = ''
         self._display_blocks: List[DisplayBlock] = []
         self._interface_state: InterfaceState = InterfaceState.ASKING_QUESTION
@@ -136,6 +159,26 @@ class CursesTuiTutor(BasicTutor):
         self._action_key = None
         self._next_interface_state: InterfaceState = None  # Used only to choose next step for PENDING_ENTER_TO_PROCEED_TO_NEXT_STEP
         self._answer_mode = answer_mode
+        self._options_count = options_count
+        self._distractor_index: DistractorIndex = None
+        self._prefetcher = QuestionsPrefetcher(self._prepare_question_with_options,
+                                               learning_results_storage,
+                                               prefetch_depth)
+        self._show_timings = show_timings
+        # Interface state handler being timed, handlers are timed from start of loop iteration
+        # till screen update or till next iteration if handler continues loop
+        self._timed_state: InterfaceState = None
+        self._timed_state_started = None
+        # Default reader watching stdin is created when tutor starts, stdin may be replaced till then
+        self._key_reader = key_reader
+        self._question_time_limit = question_time_limit
+        # Response time is measured from screen update with question till reading of key which completed answer
+        self._question_shown_time = None
+        self._last_key_time = None
+        self.last_response_seconds = None
+        self._prefetch_task: asyncio.Task = None
+        self._save_task: asyncio.Task = None
+        self._save_pending = False
 
     def show_welcome_message(self):
         self._display_blocks = (
@@ -143,8 +186,9 @@ class CursesTuiTutor(BasicTutor):
             DisplayBlock(ColorMode.REGULAR, self.selected_application_string),
             DisplayBlock(ColorMode.REGULAR, 'Press any key to continue'),
         )
+        self._renderer.begin_frame()
         self._render_display_blocks()
-        self.window.getch()
+        self._renderer.end_frame()
 
     def show_obsolete_interface_mode_warning(self):
         pass
@@ -154,17 +198,33 @@ class CursesTuiTutor(BasicTutor):
             DisplayBlock(ColorMode.REGULAR, self.OBSOLETE_ANSWER_MODE_WARNING),
             DisplayBlock(ColorMode.REGULAR, 'Press any key to continue'),
         )
+        self._renderer.begin_frame()
         self._render_display_blocks()
-        self.window.getch()
+        self._renderer.end_frame()
+
+    @property
+    def interface_state(self) -> InterfaceState:
+        return self._interface_state
 
     @property
     def _statusbar_str(self):
         s = f'Press "Ctrl+e" to exit, "Ctrl+h" for help about hotkey for current action or "Ctrl+k" to skip this action and do not ask hotkeys for it'
         # TODO: Align debug message right
+        deadline = self._answer_deadline
+        if deadline is not None:
+            s += f' | {max(math.ceil(deadline - self._key_reader.clock()), 0)} s left'
         if self._debug_msg is not None:
             s += ' | ' + self._debug_msg
         return s
 
+    @property
+    def _answer_deadline(self):
+        if self._question_time_limit is None \
+                or self._question_shown_time is None \
+                or self._interface_state not in (InterfaceState.ANSWER_INPUT, InterfaceState.CHECKING_ANSWER):
+            return None
+        return self._question_shown_time + self._question_time_limit
+
     def print(self, msg):
         raise NotImplementedError
 
@@ -191,50 +251,194 @@ class CursesTuiTutor(BasicTutor):
         # Disable cursor
         curses.curs_set(0)
 
+        self._init_colors()
+
+    @classmethod
+    def _init_colors(cls):
         # Start colors in curses
         curses.start_color()
-        for color_mode, (fg_color, bg_color) in self.COLOR_MODE_MAP.items():
+        for color_mode, (fg_color, bg_color) in cls.COLOR_MODE_MAP.items():
             curses.init_pair(color_mode.value, fg_color,  bg_color)
 
+    @classmethod
+    def select_app(cls, window, catalog_entries):
+        # Shows applications from hot keys catalog and returns selected entry or None if user exits
+        curses.curs_set(0)
+        cls._init_colors()
+        window.keypad(True)
+        title = 'Select application to learn hotkeys for'
+        statusbar_str = 'Use arrows to choose application, press ENTER to start learning or "Ctrl+e" to exit'
+        selected_i = 0
+        while True:
+            height, width = window.getmaxyx()
+            window.clear()
+            window.addstr(0, 0, title[:width - 1], curses.color_pair(ColorMode.QUESTION.value))
+            statusbar_lines = textwrap.wrap(statusbar_str, width=width - 1)
+            for line_i, line in enumerate(statusbar_lines):
+                window.addstr(height - len(statusbar_lines) + line_i,
+                              0,
+                              line.ljust(width - 1),
+                              curses.color_pair(ColorMode.STATUS_BAR.value))
+            list_top_y = 2
+            list_height = max(1, height - list_top_y - len(statusbar_lines) - 1)
+            first_i = max(0, min(selected_i - list_height // 2, len(catalog_entries) - list_height))
+            for row_i, entry in enumerate(catalog_entries[first_i:first_i + list_height]):
+                line = entry.title[:width - 1]
+                if first_i + row_i == selected_i:
+                    color_mode = ColorMode.STATUS_BAR
+                elif not entry.available:
+                    color_mode = ColorMode.ERROR
+                else:
+                    color_mode = ColorMode.REGULAR
+                window.addstr(list_top_y + row_i, 0, line, curses.color_pair(color_mode.value))
+            window.refresh()
+            k = window.getch()
+            if k == 5:
+                # "Ctrl+e" pressed
+                return None
+            elif k in (10, curses.KEY_ENTER):
+                if catalog_entries[selected_i].available:
+                    return catalog_entries[selected_i]
+            elif k in (curses.KEY_UP, ord('k')):
+                selected_i -= 1
+            elif k in (curses.KEY_DOWN, ord('j')):
+                selected_i += 1
+            elif k == curses.KEY_PPAGE:
+                selected_i -= list_height
+            elif k == curses.KEY_NPAGE:
+                selected_i += list_height
+            elif k == curses.KEY_HOME:
+                selected_i = 0
+            elif k == curses.KEY_END:
+                selected_i = len(catalog_entries) - 1
+            selected_i = max(0, min(selected_i, len(catalog_entries) - 1))
+
     def _render_statistics(self):
         statistics_str = ', '.join(self.learning_stats)
-        lines = textwrap.wrap(statistics_str, width=self._width - 1)
-        for line_i, line in enumerate(lines):
-            self.window.addstr(line_i, 0, line, curses.color_pair(ColorMode.STATISTICS.value))
+        self._renderer.set_region('statistics', self._renderer.layout_cache.layout(
+            statistics_str,
+            self._width,
+            0,
+            curses.color_pair(ColorMode.STATISTICS.value),
+            Alignment.TOP,
+        ))
 
     def _render_statusbar(self):
-        self.window.attron(curses.color_pair(ColorMode.STATUS_BAR.value))
-        lines = textwrap.wrap(self._statusbar_str, width=self._width - 1)
-        for line_i, line in enumerate(lines):
-            self.window.addstr(self._height - len(lines) + line_i, 0, line)
-            self.window.addstr(self._height - len(lines) + line_i, len(line), " " * (self._width - len(line) - 1))
-        self.window.attroff(curses.color_pair(ColorMode.STATUS_BAR.value))
+        self._renderer.set_region('statusbar', self._renderer.layout_cache.layout(
+            self._statusbar_str,
+            self._width,
+            self._height - 1,
+            curses.color_pair(ColorMode.STATUS_BAR.value),
+            Alignment.BOTTOM,
+        ))
 
     def tutor(self):
         try:
-            self._tutor_internal()
+            asyncio.run(self._tutor_internal())
         except Exception as e:
             if str(e) == 'addwstr() returned ERR':
                 raise Exception('Curses error, possible too small screen. If not - sorry and contact developers please.')
             else:
                 raise e
 
-    def _tutor_internal(self):
+    async def _tutor_internal(self):
         # TODO: Think about implementing more universal basic tutor
+        # Keys are read without blocking event loop, so questions are prepared and learning results are saved
+        # in tasks while user reads screen
         self._prepare()
-        k = 0
-        self.show_welcome_message()
-        if self._answer_mode == vhkt.basic.AnswerMode.INPUT:
-            self.window.clear()
-            self.show_obsolete_answer_mode_warning()
+        if self._key_reader is None:
+            self._key_reader = KeyReader(self.window, sys.stdin.fileno())
+        self._key_reader.start()
+        try:
+            self.show_welcome_message()
+            await self._after_frame()
+            await self._key_reader.read_key()
+            if self._answer_mode == vhkt.basic.AnswerMode.INPUT:
+                self.show_obsolete_answer_mode_warning()
+                await self._after_frame()
+                await self._key_reader.read_key()
+            k = 0
+            while self._process_key(k):
+                await self._after_frame()
+                k = await self._read_key()
+        finally:
+            self._key_reader.stop()
+            if self._prefetch_task is not None:
+                self._prefetch_task.cancel()
+            if self._save_task is not None:
+                await self._save_task
+
+    async def _after_frame(self):
+        if self._question_shown_time is None and self._interface_state == InterfaceState.ANSWER_INPUT:
+            self._question_shown_time = self._key_reader.clock()
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.get_running_loop().create_task(self._prefetch())
+        # Next question is prepared while user reads current screen, pressed keys wait meanwhile
+        await asyncio.sleep(0)
+
+    async def _prefetch(self):
+        while True:
+            with timings.timer('prefetch'):
+                prefetched = self._prefetcher.prefetch_one()
+            if not prefetched:
+                return
+            await asyncio.sleep(0)
+
+    async def _read_key(self):
+        while True:
+            deadline = self._answer_deadline
+            if deadline is None:
+                key = await self._key_reader.read_key()
+            else:
+                # Woken up at least each second to update countdown in status bar
+                remaining = deadline - self._key_reader.clock()
+                key = await self._key_reader.read_key(min(remaining, remaining % 1 or 1)) if remaining > 0 else None
+            if key is not None:
+                k, self._last_key_time = key
+                return k
+            if deadline is not None and self._key_reader.clock() >= deadline:
+                self._interface_state = InterfaceState.TIME_IS_OUT
+                return 0
+            self._renderer.begin_frame()
+            self._render_statistics()
+            self._render_statusbar()
+            self._render_display_blocks()
+            self._renderer.end_frame()
+
+    def _save_learning_results(self):
+        # Slow disk does not delay next screen if storage could be saved in other thread
+        if not self.learning_results_storage.THREAD_SAFE_SAVE:
+            self.learning_results_storage.save()
+            return
+        self._save_pending = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.get_running_loop().create_task(self._save())
+
+    async def _save(self):
+        while self._save_pending:
+            self._save_pending = False
+            await asyncio.get_running_loop().run_in_executor(None, self.learning_results_storage.save)
+
+    def _finish_response_timer(self):
+        if self._question_shown_time is None or self._last_key_time is None:
+            return
+        self.last_response_seconds = self._last_key_time - self._question_shown_time
+        timings.add('response', self.last_response_seconds)
+
+    def _process_key(self, k) -> bool:
+        # Handles pressed key till screen update, returns False if tutor should exit
         while True:
-            self.window.clear()
+            self._finish_state_timer()
+            self._timed_state_started = time.perf_counter()
+            if k == curses.KEY_RESIZE:
+                self._renderer.invalidate()
+            self._renderer.begin_frame()
             self._render_statistics()
             self._render_statusbar()
 
             if k == 5:
                 # "Ctrl+e" pressed
-                break
+                return False
 
             all_success = self.learning_results_storage.all_actions_learned_successfully
             if all_success \
@@ -242,6 +446,7 @@ class CursesTuiTutor(BasicTutor):
                     and self._interface_state != InterfaceState.QUIT:
                 self._interface_state = InterfaceState.ALL_SUCCESS
 
+            self._timed_state = self._interface_state
             if self._interface_state == InterfaceState.ALL_SUCCESS:
                 self._display_blocks = [
                     DisplayBlock(ColorMode.SUCCESS,
@@ -252,7 +457,11 @@ class CursesTuiTutor(BasicTutor):
                 self._interface_state = InterfaceState.PENDING_ENTER_TO_PROCEED_TO_NEXT_STEP
                 self._next_interface_state = InterfaceState.QUIT
             elif self._interface_state == InterfaceState.ASKING_QUESTION:
-                self._action_key, question, notes = self.prepare_question()
+                prepared_question = self._prefetcher.next_question()
+                self._question_shown_time = None
+                self._action_key = prepared_question.action_key
+                question = prepared_question.question
+                notes = prepared_question.notes
                 if self._answer_mode == vhkt.basic.AnswerMode.SELECT:
                     tip_text = 'Press correct hotkey index'
                 else:
@@ -276,14 +485,8 @@ class CursesTuiTutor(BasicTutor):
                                              for note in notes_mod]
                 self._display_blocks += [EmptyDisplayBlock()]
                 if self._answer_mode == vhkt.basic.AnswerMode.SELECT:
-                    correct_answer = self.hk_storage.action_hotkeys_by_key(self._action_key)
-                    other_random_keys_count = min(len(self.hk_storage.actions_keys) - 1, 3)
-                    actions_keys_without_correct_one = [action_key for action_key in self.hk_storage.actions_keys if action_key != self._action_key]
-                    other_random_keys = random.sample(actions_keys_without_correct_one, other_random_keys_count)
-                    other_answers = [self.hk_storage.action_hotkeys_by_key(action_key) for action_key in other_random_keys]
-                    answers = [correct_answer] + other_answers
-                    random.shuffle(answers)
-                    answer_options_display_block = AnswerOptionsDisplayBlock(correct_answer, answers)
+                    answer_options_display_block = AnswerOptionsDisplayBlock(prepared_question.correct_answer,
+                                                                             prepared_question.options)
                     self._display_blocks += [answer_options_display_block]
                     self._display_blocks += [EmptyDisplayBlock()]
                 self._display_blocks += [InputAnswerDisplayBlock()]
@@ -347,7 +550,7 @@ class CursesTuiTutor(BasicTutor):
                                  'Press ENTER to continue')
                 ]
                 self.learning_results_storage.skip_action(self._action_key)
-                self.learning_results_storage.save()
+                self._save_learning_results()
                 self._interface_state = InterfaceState.PENDING_ENTER_TO_PROCEED_TO_NEXT_STEP
                 self._next_interface_state = InterfaceState.ASKING_QUESTION
             elif self._interface_state == InterfaceState.CHECKING_ANSWER:
@@ -369,14 +572,8 @@ class CursesTuiTutor(BasicTutor):
                     continue
                 elif isinstance(self._display_blocks[-1], InputAnswerDisplayBlock):
                     input_answer_display_block: InputAnswerDisplayBlock = self._display_blocks[-1]
-                    if len(input_answer_display_block.input_key_combinations) > 1 \
-                                and input_answer_display_block.input_key_combinations in self.hk_storage.action_hotkeys_by_key(self._action_key) \
-                                and ':' not in input_answer_display_block.input_key_combinations \
-                            or len(input_answer_display_block.input_key_combinations) > 1 \
-                                and ':' in input_answer_display_block.input_key_combinations \
-                                and ''.join(input_answer_display_block.input_key_combinations) in self.hk_storage.action_hotkeys_by_key(self._action_key) \
-                            or len(input_answer_display_block.input_key_combinations) == 1 \
-                                and input_answer_display_block.input_key_combinations[0] in self.hk_storage.action_hotkeys_by_key(self._action_key):
+                    input_hotkey = Hotkey.from_answer(input_answer_display_block.input_key_combinations)
+                    if self.hk_storage.action_has_hotkey(self._action_key, input_hotkey):
                         self._interface_state = InterfaceState.CORRECT_ANSWER
                         continue
                     else:
@@ -391,17 +588,27 @@ class CursesTuiTutor(BasicTutor):
                     DisplayBlock(ColorMode.REGULAR,
                                  'Press ENTER to continue')
                 ]
+                self._finish_response_timer()
                 self.learning_results_storage.set_action_guess_correct(self._action_key)
-                self.learning_results_storage.save()
+                self._save_learning_results()
                 self._interface_state = InterfaceState.PENDING_ENTER_TO_PROCEED_TO_NEXT_STEP
                 self._next_interface_state = InterfaceState.ASKING_QUESTION
-            elif self._interface_state == InterfaceState.INCORRECT_ANSWER:
-                self._display_blocks = [
-                    DisplayBlock(ColorMode.ERROR, 'Incorrect!'),
-                    DisplayBlock(ColorMode.REGULAR, self.question_for_correct_answer),
-                ]
+            elif self._interface_state in (InterfaceState.INCORRECT_ANSWER, InterfaceState.TIME_IS_OUT):
+                if self._interface_state == InterfaceState.TIME_IS_OUT:
+                    # Question was not answered in time, which counts as wrong answer
+                    self._input_string = ''
+                    self._display_blocks = [
+                        DisplayBlock(ColorMode.ERROR, 'Time is out!'),
+                        DisplayBlock(ColorMode.REGULAR, self.question_for_correct_answer),
+                    ]
+                else:
+                    self._finish_response_timer()
+                    self._display_blocks = [
+                        DisplayBlock(ColorMode.ERROR, 'Incorrect!'),
+                        DisplayBlock(ColorMode.REGULAR, self.question_for_correct_answer),
+                    ]
                 self.learning_results_storage.set_action_guess_wrong(self._action_key)
-                self.learning_results_storage.save()
+                self._save_learning_results()
                 self._interface_state = InterfaceState.CHECKING_IF_HELP_IS_NEEDED
             elif self._interface_state == InterfaceState.CHECKING_IF_HELP_IS_NEEDED:
                 key = chr(k)
@@ -434,25 +641,46 @@ class CursesTuiTutor(BasicTutor):
                     self._next_interface_state = None
                     continue
             elif self._interface_state == InterfaceState.QUIT:
-                break
+                return False
             else:
                 raise ValueError(f'Invalid interface state "{self._interface_state}"')
 
             self._render_display_blocks()
 
-            self.window.refresh()
-            k = self.window.getch()
+            self._renderer.end_frame()
+            self._finish_state_timer()
+            return True
+
+    def _finish_state_timer(self):
+        if self._timed_state is None:
+            return
+        timer_name = f'state:{self._timed_state.value}'
+        timings.add(timer_name, time.perf_counter() - self._timed_state_started)
+        if self._show_timings:
+            timer = timings.get(timer_name)
+            self._debug_msg = f'{self._timed_state.value} {timer.last_seconds * 1000:.2f} ms, max {timer.max_seconds * 1000:.2f} ms'
+        self._timed_state = None
+
+    def _prepare_question_with_options(self):
+        action_key, question, notes = self.prepare_question()
+        if self._answer_mode != vhkt.basic.AnswerMode.SELECT:
+            return PreparedQuestion(action_key, question, notes)
+        if self._distractor_index is None:
+            self._distractor_index = DistractorIndex(self.hk_storage)
+        correct_answer = self.hk_storage.action_hotkeys_by_key(action_key)
+        other_answers = self._distractor_index.distractors(action_key, self._options_count - 1)
+        answers = [correct_answer] + other_answers
+        random.shuffle(answers)
+        return PreparedQuestion(action_key, question, notes, correct_answer, answers)
 
     def _render_display_blocks(self):
-        start_y = int((self._height // 2) - len(self._display_blocks) // 2)
+        y = int((self._height // 2) - len(self._display_blocks) // 2) + 1
         display_block: DisplayBlock
-        cumulative_item_i = 1
         for display_block_i, display_block in enumerate(self._display_blocks):
-            if '\n' in display_block.text:
-                lines = display_block.text.split('\n')
-            else:
-                lines = (display_block.text,)
-            for line_i, line in enumerate(lines):
-                start_x = self._width // 2 - len(line) // 2
-                self.window.addstr(start_y + cumulative_item_i, start_x, line, curses.color_pair(display_block.color_mode.value))
-                cumulative_item_i += 1
+            screen_lines = self._renderer.layout_cache.layout(display_block.text,
+                                                              self._width,
+                                                              y,
+                                                              curses.color_pair(display_block.color_mode.value),
+                                                              Alignment.CENTER)
+            self._renderer.set_region(f'display-block-{display_block_i}', screen_lines)
+            y += len(screen_lines)
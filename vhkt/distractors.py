@@ -0,0 +1,55 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import random
+from typing import Dict, List, Tuple
+
+from vhkt.basic import BasicHotKeysStorage
+from vhkt.keycombo import Hotkey
+
+
+def random_unique_items(items, rnd=random):
+    # Lazily yields items in random order without copying them, swaps of Fisher-Yates shuffle are kept in dict
+    swapped_indexes = {}
+    items_count = len(items)
+    for i in range(items_count):
+        j = rnd.randrange(i, items_count)
+        index_j = swapped_indexes.get(j, j)
+        swapped_indexes[j] = swapped_indexes.get(i, i)
+        yield items[index_j]
+
+
+class DistractorIndex:
+
+    # Wrong answer options for answer selection mode. Each option is tuple of all action hot keys, actions are
+    # grouped by key combination type so that e.g. commands are offered together with commands. Only types are
+    # indexed and hot keys are requested only for drawn actions, so lazy storages do not load all actions
+
+    def __init__(self, hk_storage: BasicHotKeysStorage):
+        self.hk_storage = hk_storage
+        self._actions_keys_by_type: Dict[Tuple[str, ...], List[str]] = {}
+        self._all_actions_keys: List[str] = hk_storage.actions_keys
+        for action_key in self._all_actions_keys:
+            self._actions_keys_by_type.setdefault(self._type_key(action_key), []).append(action_key)
+
+    def _type_key(self, action_key):
+        key_combination_type = self.hk_storage.key_combination_type_by_key(action_key)
+        if isinstance(key_combination_type, str):
+            return (key_combination_type,)
+        return tuple(sorted(key_combination_type))
+
+    def distractors(self, action_key, count, rnd=random) -> List[Tuple[Hotkey, ...]]:
+        # Actions of other type are used only if there are not enough distinct options among actions of the same type
+        correct_option = self.hk_storage.action_hotkeys_by_key(action_key)
+        distractors = []
+        if count <= 0:
+            return distractors
+        for actions_keys in (self._actions_keys_by_type[self._type_key(action_key)], self._all_actions_keys):
+            for other_action_key in random_unique_items(actions_keys, rnd):
+                option = self.hk_storage.action_hotkeys_by_key(other_action_key)
+                # Options sharing hot key with correct one would be correct answers too
+                if not any(hotkey in correct_option for hotkey in option) and option not in distractors:
+                    distractors.append(option)
+                    if len(distractors) == count:
+                        return distractors
+        return distractors
@@ -0,0 +1,77 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import hashlib
+import json
+import marshal
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+class FileCache:
+
+    # Cache file is JSON signature of source file on first line followed by marshalled data. Signature is checked
+    # before data is read, and data could consist only of builtin types, so cache file can not run any code
+
+    CACHE_DIR_NAME = '.vhkt-cache'
+    FORMAT_VERSION = 2
+
+    def __init__(self, source_file_path, data_version=0):
+        self.data_version = data_version
+        self.source_file_path = Path(source_file_path).resolve()
+        self.cache_dir_path = self.source_file_path.parent / self.CACHE_DIR_NAME
+        path_hash = hashlib.sha1(str(self.source_file_path).encode('utf-8')).hexdigest()[:16]
+        self.cache_file_path = self.cache_dir_path / f'{self.source_file_path.name}.{path_hash}.marshal'
+
+    def _source_signature(self, raw_data: bytes):
+        stat = os.stat(self.source_file_path)
+        return {
+            'version': self.FORMAT_VERSION,
+            'data_version': self.data_version,
+            'path': str(self.source_file_path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': hashlib.sha256(raw_data).hexdigest(),
+        }
+
+    def load(self, raw_data: bytes):
+        try:
+            with open(self.cache_file_path, 'rb') as fin:
+                signature = json.loads(fin.readline())
+                if signature != self._source_signature(raw_data):
+                    return None
+                return marshal.loads(fin.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def store(self, raw_data: bytes, data):
+        signature = json.dumps(self._source_signature(raw_data)).encode('utf-8')
+        try:
+            payload = marshal.dumps(data)
+        except ValueError:
+            # Data has values of types which could not be cached, e.g. dates
+            return
+        try:
+            self.cache_dir_path.mkdir(exist_ok=True)
+            fd, tmp_file_path = tempfile.mkstemp(dir=self.cache_dir_path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as fout:
+                    fout.write(signature + b'\n')
+                    fout.write(payload)
+                os.replace(tmp_file_path, self.cache_file_path)
+            except BaseException:
+                os.unlink(tmp_file_path)
+                raise
+        except OSError:
+            # Cache is optional, e.g. hot keys directory may be read-only
+            pass
+
+    @classmethod
+    def purge(cls, source_path):
+        # Both hot keys file path and hot keys directory path are accepted
+        source_path = Path(source_path).resolve()
+        cache_dir_path = (source_path if source_path.is_dir() else source_path.parent) / cls.CACHE_DIR_NAME
+        if cache_dir_path.is_dir():
+            shutil.rmtree(cache_dir_path)
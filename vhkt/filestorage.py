@@ -1,213 +1,402 @@
 # Copyleft GPLv3 or later
 # 2020 Dmitriy Vinokurov gim6626@gmail.com
-import re
-
-import yaml
+import json
+import threading
 import os
-import random
+from typing import Dict
 
 from vhkt.basic import (
     BasicHotKeysStorage,
     BasicLearningResultsStorage,
 )
+from vhkt.filecache import FileCache
+from vhkt.formats import YAML_FORMAT, DataFormat, format_for_path
+from vhkt.records import EMPTY_PROGRESS, Action, ActionProgress, actions_from_dicts, actions_from_tuples, actions_to_tuples, progresses_from_dicts, progresses_to_dicts
+from vhkt.sampling import RandomPool
+from vhkt.timing import timed
+from vhkt.writer import BackgroundWriter, fsync_dir, synchronized, write_file_atomically
 
 
 class FileHotKeysStorage(BasicHotKeysStorage):
 
     hkdb_file_path: str = None
 
-    def __init__(self, hkdb_file_path: str):
+    CACHE_VERSION = 5
+
+    @timed('hk_storage_load')
+    def __init__(self, hkdb_file_path: str, use_cache: bool = True):
         self.hkdb_file_path = hkdb_file_path
-        with open(hkdb_file_path, 'r') as config_file:
+        with open(hkdb_file_path, 'rb') as config_file:
             raw_data = config_file.read()
-            self._data = yaml.safe_load(raw_data)
-            for action_key in self._data['actions'].keys():
-                if 'type' not in self._data['actions'][action_key]:
-                    self._data['actions'][action_key]['type'] = 'hotkey'
+        cache = FileCache(hkdb_file_path, self.CACHE_VERSION) if use_cache else None
+        cached_data = cache.load(raw_data) if cache is not None else None
+        self._data = None
+        if cached_data is not None:
+            try:
+                self._data = {**cached_data, 'actions': actions_from_tuples(cached_data['actions'])}
+            except (TypeError, ValueError, IndexError, KeyError, AttributeError):
+                # Cache payload is truncated or of other shape, so it is treated as absent and rebuilt
+                pass
+        if self._data is None:
+            self._data = self._parse(raw_data, format_for_path(hkdb_file_path, YAML_FORMAT))
+            if cache is not None:
+                cache.store(raw_data, {**self._data, 'actions': actions_to_tuples(self._data['actions'])})
+        self._actions: Dict[str, Action] = self._data['actions']
+
+    @staticmethod
+    def _parse(raw_data: bytes, data_format: DataFormat):
+        data = data_format.load(raw_data)
+        data['actions'] = actions_from_dicts(data['actions'])
+        return data
 
     @property
     def actions_keys(self):
-        return list(self._data['actions'].keys())
+        return list(self._actions.keys())
 
     @property
     def app_name(self):
         return self._data['app']
 
     def action_description_by_key(self, key):
-        return self._data['actions'][key]['description']
+        return self._actions[key].description
 
     def key_combination_type_by_key(self, key):
-        return self._data['actions'][key]['type']
+        return self._actions[key].type
 
     def action_hotkeys_by_key(self, key):
-        hotkeys_mod = []
-        for hotkey in self._data['actions'][key]['hotkeys']:
-            if isinstance(hotkey, list):
-                hotkeys_mod.append(hotkey)
-            elif isinstance(hotkey, str):
-                if (len(hotkey) == 1
-                        or ':' in hotkey
-                        or 'Ctrl' in hotkey
-                        or 'Shift' in hotkey
-                        or 'Alt' in hotkey
-                        or 'Space' in hotkey
-                        or 'Home' in hotkey
-                        or 'End' in hotkey
-                        or 'Esc' in hotkey
-                        or 'PgUp' in hotkey
-                        or 'PgDn' in hotkey
-                        or 'Tab' in hotkey
-                        or re.search(r'F\d+', hotkey)):
-                    hotkeys_mod.append(hotkey)
-                else:
-                    hotkeys_mod.append(list(hotkey))
-        return hotkeys_mod
+        return self._actions[key].hotkeys
+
+    def action_has_hotkey(self, key, hotkey):
+        # Actions have one or two hot keys which are interned, so scanning tuple is faster than set lookup
+        return hotkey in self._actions[key].hotkeys
 
 
 class FileLearningResultsStorage(BasicLearningResultsStorage):
 
     lrnres_file_path: str = None
 
-    def __init__(self, lrnres_file_path: str, hk_storage: BasicHotKeysStorage):
+    JOURNAL_COMPACTION_SIZE = 1024 * 1024
+
+    THREAD_SAFE_SAVE = True
+
+    @timed('learning_results_storage_load')
+    def __init__(self,
+                 lrnres_file_path: str,
+                 hk_storage: BasicHotKeysStorage,
+                 journal: bool = False,
+                 journal_compaction_size: int = None,
+                 save_interval: float = None):
         self.lrnres_file_path = lrnres_file_path
+        self._data_format = format_for_path(lrnres_file_path, YAML_FORMAT)
+        # Guards data against background writer, which serializes it while UI thread mutates it
+        self._lock = threading.RLock()
+        self.journal_file_path = f'{lrnres_file_path}.journal'
+        self._journal_compaction_size = journal_compaction_size \
+            if journal_compaction_size is not None \
+            else self.JOURNAL_COMPACTION_SIZE
+        # Mutations not written to journal yet, None if journal mode is disabled
+        self._journal_records = None
         if os.path.isfile(self.lrnres_file_path):
-            with open(lrnres_file_path, 'r') as fin:
+            with open(lrnres_file_path, 'rb') as fin:
                 raw_data = fin.read()
-                self._data = yaml.safe_load(raw_data)
+            self._data = self._data_format.load(raw_data) if raw_data.strip() else None
         else:
             self._data = None
         if not self._data:
-            self._data = {'actions': {}}
+            self._data = {}
+        # Actions are kept as records, data keeps the rest of file content, e.g. journal generation
+        self._actions: Dict[str, ActionProgress] = progresses_from_dicts(self._data.pop('actions', None) or {})
         for key in hk_storage.actions_keys:
-            if key not in self.actions_keys:
-                self._data['actions'][key] = {}
+            if key not in self._actions:
+                self._actions[key] = EMPTY_PROGRESS
         self._prev_action_key = None
         self.hk_storage: BasicHotKeysStorage = hk_storage
+        self._hk_actions_keys = frozenset(hk_storage.actions_keys)
+        self._recount_aggregates()
+        self._nonlearned_actions_keys = RandomPool()
+        for action_key in self._actions:
+            self._update_action_eligibility(action_key)
+        # Journal is replayed even if journal mode is disabled now, it may be left from previous run
+        self._replay_journal()
+        if journal:
+            self._journal_records = []
+        self._writer = BackgroundWriter(self._save_now, save_interval) if save_interval else None
+
+    @property
+    def _journal_generation(self):
+        return self._data.get('journal_generation', 0)
+
+    def _replay_journal(self):
+        if not os.path.isfile(self.journal_file_path):
+            return
+        with open(self.journal_file_path, 'r') as fin:
+            lines = fin.readlines()
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            header = {}
+        if header.get('generation') != self._journal_generation:
+            # Journal was already compacted into snapshot but not removed, e.g. due to crash
+            os.remove(self.journal_file_path)
+            return
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Last record may be partially written if app crashed
+                break
+            self._apply_journal_record(record)
+
+    def _apply_journal_record(self, record):
+        action_key = record['key']
+        if record['op'] == 'remove':
+            if action_key in self._actions:
+                self.remove_results_for_action(action_key)
+            return
+        if action_key not in self._actions:
+            self._actions[action_key] = EMPTY_PROGRESS
+            self._count_action(action_key, 1)
+        if record['op'] == 'guess':
+            self.set_action_guess_correctness(action_key, record['correct'])
+        elif record['op'] == 'learned':
+            self.set_action_learned_successfully(action_key)
+        elif record['op'] == 'skip':
+            self.skip_action(action_key)
+        elif record['op'] == 'schedule':
+            self.set_action_schedule(action_key, record['schedule'])
+        else:
+            raise ValueError(f'Invalid journal record operation "{record["op"]}"')
+
+    def _journal(self, op, action_key, **kwargs):
+        if self._journal_records is not None:
+            self._journal_records.append({'op': op, 'key': action_key, **kwargs})
+
+    def _recount_aggregates(self):
+        self._learned_count = 0
+        self._learning_in_process_count = 0
+        self._guesses_count = 0
+        self._error_guesses_count = 0
+        self._skipped_count = 0
+        for action_key in self._actions:
+            self._count_action(action_key, 1)
 
+    def _count_action(self, action_key, sign):
+        # Adds (sign=1) or subtracts (sign=-1) action contribution to aggregate counters,
+        # mutating methods subtract it before changing action and add it back after
+        progress = self._actions[action_key]
+        success = bool(progress.success)
+        guesses = progress.guesses or 0
+        self._learned_count += sign * success
+        self._learning_in_process_count += sign * (guesses > 0 and not success)
+        self._guesses_count += sign * guesses
+        self._error_guesses_count += sign * (progress.error_guesses or 0)
+        self._skipped_count += sign * bool(progress.skip)
+
+    def _progress_for_update(self, action_key) -> ActionProgress:
+        progress = self._actions.get(action_key, EMPTY_PROGRESS)
+        if progress is EMPTY_PROGRESS:
+            progress = self._actions[action_key] = ActionProgress()
+        return progress
+
+    def _update_action_eligibility(self, action_key):
+        progress = self._actions.get(action_key)
+        if progress is not None \
+                and action_key in self._hk_actions_keys \
+                and not progress.skip \
+                and not progress.success:
+            self._nonlearned_actions_keys.add(action_key)
+        else:
+            self._nonlearned_actions_keys.discard(action_key)
+
+    @synchronized
     def remove_results_for_action(self, action_key):
-        del self._data['actions'][action_key]
+        self._count_action(action_key, -1)
+        del self._actions[action_key]
+        self._update_action_eligibility(action_key)
+        self._journal('remove', action_key)
+        if self.scheduler is not None:
+            self.scheduler.on_remove(action_key)
 
     @property
     def actions_keys(self):
-        return list(self._data['actions'].keys())
+        return list(self._actions.keys())
 
     def action_success(self, action_key) -> bool:
-        if 'success' in self._data['actions'][action_key] \
-                and self._data['actions'][action_key]['success']:
-            return True
-        else:
-            return False
+        return bool(self._actions[action_key].success)
 
     def action_guesses(self, action_key) -> int:
-        if 'guesses' in self._data['actions'][action_key]:
-            return self._data['actions'][action_key]['guesses']
-        else:
-            return None
+        return self._actions[action_key].guesses
+
+    def action_correct_guesses(self, action_key) -> int:
+        return self._actions[action_key].correct_guesses
 
     def action_error_guesses(self, action_key) -> int:
-        if 'error_guesses' in self._data['actions'][action_key]:
-            return self._data['actions'][action_key]['error_guesses']
-        else:
-            return None
+        return self._actions[action_key].error_guesses
 
     def action_learning_in_process(self, action_key) -> bool:
-        if 'guesses' in self._data['actions'][action_key] \
-                and self._data['actions'][action_key]['guesses'] > 0 \
-                and ('success' not in self._data['actions'][action_key]
-                     or not self._data['actions'][action_key]['success']):
-            return True
-        else:
-            return False
+        progress = self._actions[action_key]
+        return (progress.guesses or 0) > 0 and not progress.success
 
+    @property
+    def actions_count(self) -> int:
+        return len(self._actions)
+
+    @property
+    def actions_learned_count(self) -> int:
+        return self._learned_count
+
+    @property
+    def actions_guesses_count(self) -> int:
+        return self._guesses_count
+
+    @property
+    def actions_error_guesses_count(self) -> int:
+        return self._error_guesses_count
+
+    @property
+    def actions_learning_in_process_count(self) -> int:
+        return self._learning_in_process_count
+
+    def action_skipped(self, action_key) -> bool:
+        return bool(self._actions[action_key].skip)
+
+    def action_schedule(self, action_key) -> dict:
+        schedule = self._actions[action_key].schedule
+        return schedule if schedule is not None else {}
+
+    @synchronized
+    def set_action_schedule(self, action_key, schedule: dict):
+        self._progress_for_update(action_key).schedule = schedule
+        self._journal('schedule', action_key, schedule=schedule)
+
+    @synchronized
     def set_action_learned_successfully(self, action_key):
-        if action_key not in self._data['actions']:
-            self._data['actions'][action_key] = {}
-        self._data['actions'][action_key]['success'] = True
+        if action_key not in self._actions:
+            self._actions[action_key] = EMPTY_PROGRESS
+        self._count_action(action_key, -1)
+        self._progress_for_update(action_key).success = True
+        self._count_action(action_key, 1)
+        self._update_action_eligibility(action_key)
+        self._journal('learned', action_key)
+        if self.scheduler is not None:
+            self.scheduler.on_learned(action_key)
 
+    @synchronized
     def set_action_guess_correctness(self, action_key, correctness):
-        if action_key not in self._data['actions']:
-            self._data['actions'][action_key] = {}
-        guesses_key = 'guesses'
-        if guesses_key not in self._data['actions'][action_key]:
-            self._data['actions'][action_key][guesses_key] = 1
-        else:
-            self._data['actions'][action_key][guesses_key] += 1
-        correct_guesses_key = 'correct_guesses'
-        if correct_guesses_key not in self._data['actions'][action_key]:
-            if correctness:
-                self._data['actions'][action_key][correct_guesses_key] = 1
-            else:
-                self._data['actions'][action_key][correct_guesses_key] = 0
+        if action_key not in self._actions:
+            self._actions[action_key] = EMPTY_PROGRESS
+        self._count_action(action_key, -1)
+        progress = self._progress_for_update(action_key)
+        if progress.guesses is None:
+            progress.guesses = 1
         else:
-            if correctness:
-                self._data['actions'][action_key][correct_guesses_key] += 1
-                if self._data['actions'][action_key][correct_guesses_key] >= self.CORRECT_ANSWERS_TO_LEARN:
-                    self.set_action_learned_successfully(action_key)
-            else:
-                if self._data['actions'][action_key][correct_guesses_key] > 0:
-                    self._data['actions'][action_key][correct_guesses_key] -= 1
-        error_guesses_key = 'error_guesses'
-        if error_guesses_key not in self._data['actions'][action_key]:
-            if not correctness:
-                self._data['actions'][action_key][error_guesses_key] = 1
-            else:
-                self._data['actions'][action_key][error_guesses_key] = 0
-        else:
-            if not correctness:
-                self._data['actions'][action_key][error_guesses_key] += 1
+            progress.guesses += 1
+        if progress.correct_guesses is None:
+            progress.correct_guesses = 1 if correctness else 0
+        elif correctness:
+            progress.correct_guesses += 1
+            if progress.correct_guesses >= self.CORRECT_ANSWERS_TO_LEARN:
+                progress.success = True
+        elif progress.correct_guesses > 0:
+            progress.correct_guesses -= 1
+        if progress.error_guesses is None:
+            progress.error_guesses = 0 if correctness else 1
+        elif not correctness:
+            progress.error_guesses += 1
+        self._count_action(action_key, 1)
+        self._update_action_eligibility(action_key)
+        self._journal('guess', action_key, correct=correctness)
+        if self.scheduler is not None:
+            self.scheduler.on_guess(action_key, correctness)
 
+    @synchronized
     def skip_action(self, action_key):
-        self._data['actions'][action_key]['skip'] = True
+        self._count_action(action_key, -1)
+        self._progress_for_update(action_key).skip = True
+        self._count_action(action_key, 1)
+        self._update_action_eligibility(action_key)
+        self._journal('skip', action_key)
+        if self.scheduler is not None:
+            self.scheduler.on_skip(action_key)
 
     @property
     def skipped_actions_count(self):
-        return len([
-            action_key
-            for action_key in self._data['actions'].keys()
-            if self._data['actions'][action_key].get('skip')
-        ])
+        return self._skipped_count
 
     @property
     def all_actions_learned_successfully(self) -> bool:
-        all_success = True
-        if self._data['actions'] == {}:
-            all_success = False
-        else:
-            for action_key, action_value in self._data['actions'].items():
-                if action_key not in self.hk_storage.actions_keys:
-                    continue
-                if self._data['actions'][action_key].get('skip'):
-                    continue
-                if 'success' in self._data['actions'][action_key] \
-                        and not self._data['actions'][action_key]['success'] \
-                        or action_key not in self._data['actions'] \
-                        or 'success' not in self._data['actions'][action_key]:
-                    all_success = False
-        return all_success
+        return len(self._actions) > 0 \
+            and len(self._nonlearned_actions_keys) == 0 \
+            and (self.scheduler is None or not self.scheduler.has_due_reviews)
 
     @property
     def random_nonlearned_action_key(self):
-        repeats = 0
-        repeats_limit = 5
-        while True:
-            if self.all_actions_learned_successfully:
-                return None
-            random_action_key_index = random.randint(0, len(self.actions_keys) - 1)
-            random_action_key = self.actions_keys[random_action_key_index]
-            if self._data['actions'][random_action_key].get('skip'):
-                continue
-            if random_action_key in self.actions_keys \
-                    and self.action_success(random_action_key):
-                continue
-            if random_action_key == self._prev_action_key \
-                    and repeats < repeats_limit:
-                repeats += 1
-                continue
+        random_action_key = self._nonlearned_actions_keys.choice(exclude=self._prev_action_key)
+        if random_action_key is not None:
             self._prev_action_key = random_action_key
-            return random_action_key
-        return None
+        return random_action_key
 
     def save(self):
-        with open(self.lrnres_file_path, 'w') as learning_results_file:
-            learning_results_file_data = yaml.safe_dump(self._data)
-            learning_results_file.write(learning_results_file_data)
+        if self._writer is not None:
+            self._writer.request()
+        else:
+            self._save_now()
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    @timed('learning_results_storage_save')
+    def _save_now(self):
+        if self._journal_records is None:
+            if os.path.isfile(self.journal_file_path):
+                self.compact()
+            else:
+                self._write_snapshot()
+            return
+        with self._lock:
+            records, self._journal_records = self._journal_records, []
+        if records:
+            journal_exists = os.path.isfile(self.journal_file_path)
+            with open(self.journal_file_path, 'a') as journal_file:
+                if not journal_exists:
+                    journal_file.write(json.dumps({'generation': self._journal_generation}) + '\n')
+                for record in records:
+                    journal_file.write(json.dumps(record) + '\n')
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            if not journal_exists:
+                fsync_dir(os.path.dirname(os.path.abspath(self.journal_file_path)))
+        if not os.path.isfile(self.lrnres_file_path) \
+                or os.path.isfile(self.journal_file_path) \
+                and os.path.getsize(self.journal_file_path) >= self._journal_compaction_size:
+            self.compact()
+
+    @timed('learning_results_storage_compact')
+    def compact(self):
+        # New snapshot gets next generation, so if app crashes before journal removal stale journal is ignored.
+        # Records not written to journal yet are dropped because snapshot already contains their changes
+        with self._lock:
+            if self._journal_records is not None:
+                self._journal_records = []
+            self._data['journal_generation'] = self._journal_generation + 1
+            learning_results_file_data = self._data_format.dump(self._serialized_data())
+        write_file_atomically(self.lrnres_file_path, learning_results_file_data)
+        if os.path.isfile(self.journal_file_path):
+            os.remove(self.journal_file_path)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._journal_records is not None:
+            self._save_now()
+            self.compact()
+
+    def _write_snapshot(self):
+        with self._lock:
+            learning_results_file_data = self._data_format.dump(self._serialized_data())
+        write_file_atomically(self.lrnres_file_path, learning_results_file_data)
+
+    def _serialized_data(self) -> dict:
+        return {'actions': progresses_to_dicts(self._actions), **self._data}
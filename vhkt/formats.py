@@ -0,0 +1,106 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import json
+import marshal
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List
+
+
+class DataFormat(ABC):
+
+    # Serialization format of hot keys and learning results storages files, selected by file extension
+
+    name: str = None
+    extensions: List[str] = []
+
+    @abstractmethod
+    def load(self, raw_data: bytes):
+        pass
+
+    @abstractmethod
+    def dump(self, data) -> bytes:
+        pass
+
+
+class YamlFormat(DataFormat):
+
+    # Human editable format of hot keys files in repository, libyaml based loader and dumper are used if PyYAML
+    # is built with them, they are several times faster than pure Python ones
+
+    name = 'yaml'
+    extensions = ['.yaml', '.yml']
+
+    @staticmethod
+    def loader():
+        # YAML parser is imported only when needed, see deferred imports in vhkt.py
+        import yaml
+        return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+    @staticmethod
+    def dumper():
+        import yaml
+        return getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+    def load(self, raw_data):
+        import yaml
+        return yaml.load(raw_data, Loader=self.loader())
+
+    def dump(self, data):
+        import yaml
+        return yaml.dump(data, Dumper=self.dumper()).encode('utf-8')
+
+
+class JsonFormat(DataFormat):
+
+    name = 'json'
+    extensions = ['.json']
+
+    def load(self, raw_data):
+        return json.loads(raw_data)
+
+    def dump(self, data):
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class MarshalFormat(DataFormat):
+
+    # Compact binary format which is fastest to load, it is specific to Python and, as marshal module docs say,
+    # not protected against malicious data, so only files converted by yourself should be loaded
+
+    name = 'marshal'
+    extensions = ['.marshal']
+    MAGIC = b'VHKT\x01'
+    MARSHAL_VERSION = 4
+
+    def load(self, raw_data):
+        if not raw_data.startswith(self.MAGIC):
+            raise ValueError('Not a VHKT marshal file or unsupported version')
+        return marshal.loads(raw_data[len(self.MAGIC):])
+
+    def dump(self, data):
+        return self.MAGIC + marshal.dumps(data, self.MARSHAL_VERSION)
+
+
+FORMATS: Dict[str, DataFormat] = {}
+
+
+def register_format(data_format: DataFormat):
+    for extension in data_format.extensions:
+        FORMATS[extension] = data_format
+
+
+YAML_FORMAT = YamlFormat()
+
+for _data_format in (YAML_FORMAT, JsonFormat(), MarshalFormat()):
+    register_format(_data_format)
+
+
+def format_for_path(file_path, default: DataFormat = None) -> DataFormat:
+    # Storages pass YAML as default because all files were YAML ones regardless of extension before formats were added
+    suffix = Path(file_path).suffix.lower()
+    data_format = FORMATS.get(suffix, default)
+    if data_format is None:
+        raise ValueError(f'Unsupported file extension "{suffix}" of "{file_path}", supported ones: {", ".join(FORMATS)}')
+    return data_format
@@ -0,0 +1,192 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import contextlib
+import curses
+import time
+from typing import Callable, Iterable, List, NamedTuple, Union
+
+import vhkt.basic
+from vhkt.cursestui import CursesTuiTutor, InterfaceState
+from vhkt.keyreader import KeyReader
+
+KEYS_CODES = {
+    'enter': 10,
+    'backspace': curses.KEY_BACKSPACE,
+    'resize': curses.KEY_RESIZE,
+    'ctrl+e': 5,
+    'ctrl+h': 8,
+    'ctrl+k': 11,
+    # No key pressed yet, window is polled again a bit later
+    'idle': curses.ERR,
+}
+
+EXIT_KEY_CODE = KEYS_CODES['ctrl+e']
+
+
+def parse_keys(script: str) -> List[int]:
+    # Whitespace separated keys, either names from KEYS_CODES (case insensitive) or single characters
+    keys_codes = []
+    for token in script.split():
+        if token.lower() in KEYS_CODES:
+            keys_codes.append(KEYS_CODES[token.lower()])
+        elif len(token) == 1:
+            keys_codes.append(ord(token))
+        else:
+            raise ValueError(f'Invalid key "{token}"')
+    return keys_codes
+
+
+class FakeCursesWindow:
+
+    # Implements part of curses window interface used by TUI, keeping screen content in memory.
+    # Keys are taken from "next_key" callable, exit key is returned when it returns None
+
+    def __init__(self, next_key: Callable[[], Union[int, None]], height: int = 24, width: int = 80):
+        self._next_key = next_key
+        self._height = height
+        self._width = width
+        self._rows = [[' '] * width for _ in range(height)]
+        self._cursor = (0, 0)
+
+    def getmaxyx(self):
+        return self._height, self._width
+
+    def resize(self, height, width):
+        self._height = height
+        self._width = width
+        self._rows = [[' '] * width for _ in range(height)]
+
+    def getch(self):
+        key = self._next_key()
+        return EXIT_KEY_CODE if key is None else key
+
+    def keypad(self, flag):
+        pass
+
+    def nodelay(self, flag):
+        pass
+
+    def addstr(self, y, x, text, attr=0):
+        if not 0 <= y < self._height or not 0 <= x < self._width:
+            raise curses.error('addwstr() returned ERR')
+        row = self._rows[y]
+        for i, char in enumerate(text[:self._width - x]):
+            row[x + i] = char
+        self._cursor = (y, min(x + len(text), self._width - 1))
+
+    def move(self, y, x):
+        self._cursor = (y, x)
+
+    def clrtoeol(self):
+        y, x = self._cursor
+        self._rows[y][x:] = [' '] * (self._width - x)
+
+    def erase(self):
+        for row in self._rows:
+            row[:] = [' '] * self._width
+
+    def clear(self):
+        self.erase()
+
+    def refresh(self):
+        pass
+
+    def noutrefresh(self):
+        pass
+
+    def screen_text(self) -> str:
+        return '\n'.join(''.join(row).rstrip() for row in self._rows)
+
+
+@contextlib.contextmanager
+def headless_curses(doupdate=lambda: None):
+    # Replaces curses module functions which require initialized terminal
+    replacements = {
+        'curs_set': lambda visibility: None,
+        'start_color': lambda: None,
+        'init_pair': lambda pair_number, fg, bg: None,
+        'color_pair': lambda pair_number: pair_number << 8,
+        'doupdate': doupdate,
+    }
+    originals = {name: getattr(curses, name) for name in replacements}
+    for name, replacement in replacements.items():
+        setattr(curses, name, replacement)
+    try:
+        yield
+    finally:
+        for name, original in originals.items():
+            setattr(curses, name, original)
+
+
+class Transition(NamedTuple):
+    from_state: InterfaceState
+    to_state: InterfaceState
+    key: int
+    seconds: float
+
+
+class HeadlessTuiDriver:
+
+    # Plays keys to CursesTuiTutor in fake window and measures latency of each key, i.e. time from returning key
+    # from "getch" till screen update, or till next "getch" call if screen was not updated. Work done after
+    # screen update, e.g. preparing next question, is not seen by user and is not counted
+
+    def __init__(self,
+                 hk_storage,
+                 learning_results_storage,
+                 answer_mode=vhkt.basic.AnswerMode.SELECT,
+                 height: int = 24,
+                 width: int = 80,
+                 clock=time.perf_counter,
+                 **tutor_kwargs):
+        self._clock = clock
+        self._keys = iter(())
+        self._last_key = None
+        self._last_key_time = None
+        self._last_key_state = None
+        self._last_frame_time = None
+        self.transitions: List[Transition] = []
+        self.window = FakeCursesWindow(self._next_key, height, width)
+        with headless_curses(self._on_frame):
+            self.tutor = CursesTuiTutor(hk_storage,
+                                        learning_results_storage,
+                                        answer_mode,
+                                        self.window,
+                                        key_reader=KeyReader(self.window),
+                                        **tutor_kwargs)
+
+    def _on_frame(self):
+        self._last_frame_time = self._clock()
+
+    def _next_key(self):
+        now = self._clock()
+        state = self.tutor.interface_state
+        if self._last_key_time is not None:
+            if self._last_frame_time is not None and self._last_frame_time >= self._last_key_time:
+                now = self._last_frame_time
+            self.transitions.append(Transition(self._last_key_state, state, self._last_key, now - self._last_key_time))
+        key = next(self._keys, None)
+        if key == curses.ERR:
+            # Nothing to measure till next key
+            self._last_key_time = None
+            return key
+        self._last_key = key
+        self._last_key_state = state
+        self._last_key_time = self._clock()
+        return key
+
+    def play(self, keys: Union[str, Iterable[int], Callable[[CursesTuiTutor], int]]) -> List[Transition]:
+        # Keys are script for "parse_keys", keys codes or callable choosing next key for tutor,
+        # session ends with exit key when keys are over
+        if isinstance(keys, str):
+            keys = parse_keys(keys)
+        if callable(keys):
+            choose_key = keys
+            keys = iter(lambda: choose_key(self.tutor), None)
+        self._keys = iter(keys)
+        self._last_key_time = None
+        self.transitions = []
+        with headless_curses(self._on_frame):
+            self.tutor.tutor()
+        return self.transitions
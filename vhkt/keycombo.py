@@ -0,0 +1,192 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import re
+from enum import IntFlag
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class Modifier(IntFlag):
+    NONE = 0
+    CTRL = 1
+    ALT = 2
+    SHIFT = 4
+
+
+MODIFIERS_NAMES = {
+    'Ctrl': Modifier.CTRL,
+    'Alt': Modifier.ALT,
+    'Shift': Modifier.SHIFT,
+}
+
+# Names which mean that hot key string is single key combination and not keys sequence like "dd"
+SPECIAL_KEYS_NAMES = (
+    'Space',
+    'Home',
+    'End',
+    'Esc',
+    'PgUp',
+    'PgDn',
+    'Tab',
+)
+
+FUNCTION_KEY_REGEX = re.compile(r'F\d+')
+
+COMMAND_PREFIX = ':'
+SEQUENCE_SEPARATOR = ','
+
+# Separator right after modifier is the key itself, e.g. "Ctrl+,"
+SEQUENCE_SEPARATOR_REGEX = re.compile(''.join(f'(?<!{name}\\+)' for name in MODIFIERS_NAMES) + SEQUENCE_SEPARATOR)
+
+
+def split_sequence(s: str) -> List[str]:
+    return SEQUENCE_SEPARATOR_REGEX.split(s)
+
+
+# Both classes below are interned, i.e. there is exactly one instance for each distinct value. Key combinations
+# use default identity based equality and hashing, so comparing them never touches their contents. Hot keys keep
+# spelling from hot keys file for display, so equal hot keys spelled differently are different instances
+
+
+class KeyCombo:
+
+    __slots__ = ('modifiers', 'key')
+
+    _interned: Dict[Tuple[int, str], 'KeyCombo'] = {}
+
+    def __new__(cls, modifiers: Modifier, key: str):
+        ident = (int(modifiers), key)
+        combo = cls._interned.get(ident)
+        if combo is None:
+            combo = super().__new__(cls)
+            object.__setattr__(combo, 'modifiers', Modifier(modifiers))
+            object.__setattr__(combo, 'key', key)
+            combo = cls._interned.setdefault(ident, combo)
+        return combo
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __repr__(self):
+        return f'KeyCombo({str(self)!r})'
+
+    def __str__(self):
+        return '+'.join([name for name, modifier in MODIFIERS_NAMES.items() if self.modifiers & modifier] + [self.key])
+
+    @classmethod
+    def from_tuple(cls, data: tuple) -> 'KeyCombo':
+        return cls(*data)
+
+    def to_tuple(self) -> tuple:
+        return int(self.modifiers), self.key
+
+    @property
+    def is_command(self) -> bool:
+        return len(self.key) > 1 and self.key.startswith(COMMAND_PREFIX)
+
+    @classmethod
+    def parse(cls, s: str) -> 'KeyCombo':
+        if s.startswith(COMMAND_PREFIX):
+            return cls(Modifier.NONE, s)
+        modifiers = Modifier.NONE
+        parts = s.split('+')
+        while len(parts) > 1 and parts[0] in MODIFIERS_NAMES:
+            modifiers |= MODIFIERS_NAMES[parts.pop(0)]
+        return cls(modifiers, '+'.join(parts))
+
+
+class Hotkey:
+
+    __slots__ = ('combos', 'text')
+
+    _interned: Dict[Tuple[Tuple[KeyCombo, ...], Optional[str]], 'Hotkey'] = {}
+
+    def __new__(cls, combos: Iterable[KeyCombo], text: str = None):
+        # "text" is spelling to display, None if it is same as canonical one
+        combos = tuple(combos)
+        if text is not None and text == SEQUENCE_SEPARATOR.join(str(combo) for combo in combos):
+            text = None
+        ident = (combos, text)
+        hotkey = cls._interned.get(ident)
+        if hotkey is None:
+            hotkey = super().__new__(cls)
+            object.__setattr__(hotkey, 'combos', combos)
+            object.__setattr__(hotkey, 'text', text)
+            hotkey = cls._interned.setdefault(ident, hotkey)
+        return hotkey
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Hotkey):
+            return NotImplemented
+        return self.combos == other.combos
+
+    def __hash__(self):
+        return hash(self.combos)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __repr__(self):
+        return f'Hotkey({str(self)!r})'
+
+    def __str__(self):
+        if self.text is not None:
+            return self.text
+        return SEQUENCE_SEPARATOR.join(str(combo) for combo in self.combos)
+
+    def __len__(self):
+        return len(self.combos)
+
+    def __iter__(self):
+        return iter(self.combos)
+
+    @classmethod
+    def from_tuple(cls, data: tuple) -> 'Hotkey':
+        combos, text = data
+        return cls((KeyCombo.from_tuple(combo) for combo in combos), text)
+
+    def to_tuple(self) -> tuple:
+        return tuple(combo.to_tuple() for combo in self.combos), self.text
+
+    @property
+    def is_sequence(self) -> bool:
+        return len(self.combos) > 1
+
+    def has_modifier(self, modifier: Modifier) -> bool:
+        return any(combo.modifiers & modifier for combo in self.combos)
+
+    @classmethod
+    def parse(cls, hotkey) -> 'Hotkey':
+        if isinstance(hotkey, list):
+            return cls((KeyCombo.parse(h) for h in hotkey), SEQUENCE_SEPARATOR.join(hotkey))
+        elif isinstance(hotkey, str):
+            if hotkey.startswith(COMMAND_PREFIX):
+                return cls((KeyCombo.parse(hotkey),), hotkey)
+            elif SEQUENCE_SEPARATOR in hotkey and len(hotkey) > 1:
+                return cls((KeyCombo.parse(h) for h in split_sequence(hotkey)), hotkey)
+            elif (len(hotkey) == 1
+                  or any(name in hotkey for name in MODIFIERS_NAMES)
+                  or any(name in hotkey for name in SPECIAL_KEYS_NAMES)
+                  or FUNCTION_KEY_REGEX.search(hotkey)):
+                return cls((KeyCombo.parse(hotkey),), hotkey)
+            else:
+                return cls((KeyCombo(Modifier.NONE, key) for key in hotkey), hotkey)
+        else:
+            raise ValueError(f'Bad hot key "{hotkey}", expected str or list')
+
+    @classmethod
+    def from_answer(cls, answer_blocks: Sequence[str]) -> 'Hotkey':
+        if len(answer_blocks) > 1 and answer_blocks[0] == COMMAND_PREFIX:
+            return cls((KeyCombo.parse(''.join(answer_blocks)),))
+        elif len(answer_blocks) == 1:
+            return cls.parse(answer_blocks[0])
+        else:
+            return cls(KeyCombo.parse(block) for block in answer_blocks)
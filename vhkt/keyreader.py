@@ -0,0 +1,60 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import asyncio
+import curses
+import time
+from typing import Optional, Tuple
+
+
+class KeyReader:
+
+    # Reads keys from curses window without blocking event loop. Window is switched to no-delay mode and input
+    # file descriptor is watched by event loop, so other tasks run while user thinks. If descriptor could not be
+    # watched, e.g. on Windows or for fake window, window is polled instead. Watched window is still checked
+    # once per IDLE_CHECK_INTERVAL seconds because terminal resize does not make input readable
+
+    POLL_INTERVAL = 0.01
+    IDLE_CHECK_INTERVAL = 0.5
+
+    def __init__(self, window, fd: int = None, clock=time.perf_counter):
+        self.window = window
+        self.clock = clock
+        self._fd = fd
+        self._readable: asyncio.Event = None
+        self._watching = False
+
+    def start(self):
+        self.window.nodelay(True)
+        self._readable = asyncio.Event()
+        if self._fd is not None:
+            try:
+                asyncio.get_running_loop().add_reader(self._fd, self._readable.set)
+                self._watching = True
+            except (NotImplementedError, ValueError, OSError):
+                pass
+
+    def stop(self):
+        if self._watching:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            self._watching = False
+        self.window.nodelay(False)
+
+    async def read_key(self, timeout: float = None) -> Optional[Tuple[int, float]]:
+        # Returns pressed key and time it was read at, or None if no key was pressed in "timeout" seconds
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            key = self.window.getch()
+            if key != curses.ERR:
+                return key, self.clock()
+            wait = self.IDLE_CHECK_INTERVAL if self._watching else self.POLL_INTERVAL
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+            self._readable.clear()
+            try:
+                await asyncio.wait_for(self._readable.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
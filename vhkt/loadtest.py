@@ -0,0 +1,179 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+# Simulates many concurrent learners of tutor server and reports throughput and latency of question and answer
+# round trips, e.g. for server started with python3 -m vhkt.server hotkeys/vim.yaml --results-dir results
+# python3 -m vhkt.loadtest --learners 100 --questions 50
+# Server with synthetic hot keys file of given size is started in same process if --synthetic-actions is passed
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import vhkt.basic
+from vhkt.timing import percentile
+
+PERCENTILES = (50, 95, 99)
+
+# Probability of correct answer for action which correct hot key is already known to learner
+CORRECT_PROBABILITY = 0.7
+
+
+class _Connection:
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    async def request(self, request: dict) -> dict:
+        self._writer.write((json.dumps(request) + '\n').encode('utf-8'))
+        await self._writer.drain()
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by server')
+        response = json.loads(line)
+        if not response['ok']:
+            raise ValueError(f'Request {request} failed: {response["error"]}')
+        return response
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def _connect(host, port, unix_socket_path) -> _Connection:
+    if unix_socket_path is not None:
+        return _Connection(*await asyncio.open_unix_connection(unix_socket_path))
+    return _Connection(*await asyncio.open_connection(host, port))
+
+
+async def _learner(user, app_name, questions_count, connect, rnd, round_trips_seconds):
+    # Answers wrong until correct hot key of action is seen in result, then mostly answers right
+    connection = await connect()
+    known_hotkeys = {}
+    try:
+        await connection.request({'op': 'login', 'user': user, 'app': app_name})
+        for _ in range(questions_count):
+            started = time.perf_counter()
+            question = await connection.request({'op': 'question'})
+            if question.get('all_learned'):
+                break
+            hotkey = known_hotkeys.get(question['action'])
+            answer = hotkey if hotkey is not None and rnd.random() < CORRECT_PROBABILITY else 'no such hot key'
+            result = await connection.request({'op': 'answer', 'answer': answer})
+            round_trips_seconds.append(time.perf_counter() - started)
+            known_hotkeys[result['action']] = result['hotkeys'][0]
+    finally:
+        await connection.close()
+
+
+async def run_load_test(learners_count: int,
+                        questions_count: int,
+                        host: str = '127.0.0.1',
+                        port: int = None,
+                        unix_socket_path: str = None,
+                        app_name: str = None,
+                        seed: int = 0) -> dict:
+    rnd = random.Random(seed)
+    round_trips_seconds = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _learner(f'learner-{i}',
+                 app_name,
+                 questions_count,
+                 lambda: _connect(host, port, unix_socket_path),
+                 random.Random(rnd.random()),
+                 round_trips_seconds)
+        for i in range(learners_count)
+    ))
+    duration = time.perf_counter() - started
+    round_trips_seconds.sort()
+    report = {
+        'learners': learners_count,
+        'round_trips': len(round_trips_seconds),
+        'duration_s': round(duration, 3),
+        'round_trips_per_s': round(len(round_trips_seconds) / duration, 1),
+    }
+    if round_trips_seconds:
+        for p in PERCENTILES:
+            report[f'p{p}_ms'] = round(percentile(round_trips_seconds, p) * 1000, 3)
+    return report
+
+
+async def _run_with_synthetic_server(args):
+    from vhkt.filestorage import FileHotKeysStorage
+    from vhkt.server import HotKeysServer
+    from vhkt.synthetic import write_synthetic_hotkeys_file
+    with tempfile.TemporaryDirectory() as dir_path:
+        hkdb_file_path = Path(dir_path) / 'hotkeys.yaml'
+        write_synthetic_hotkeys_file(hkdb_file_path, args.synthetic_actions, random.Random(args.seed))
+        server = HotKeysServer([FileHotKeysStorage(hkdb_file_path, use_cache=False)],
+                               dir_path,
+                               vhkt.basic.ResultsBackend(args.results_backend))
+        asyncio_server = await server.start(args.host, 0)
+        try:
+            port = asyncio_server.sockets[0].getsockname()[1]
+            return await run_load_test(args.learners, args.questions, args.host, port, None, args.app, args.seed)
+        finally:
+            asyncio_server.close()
+            await asyncio_server.wait_closed()
+            server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test of hot keys tutor server')
+    parser.add_argument('--host',
+                        default='127.0.0.1')
+    parser.add_argument('--port',
+                        type=int,
+                        default=8765)
+    parser.add_argument('--unix-socket',
+                        help='Path to Unix socket of server to connect to instead of TCP port')
+    parser.add_argument('--app',
+                        help='Application to learn, could be omitted if server serves one')
+    parser.add_argument('--learners',
+                        type=int,
+                        default=10,
+                        help='Number of concurrent learners')
+    parser.add_argument('--questions',
+                        type=int,
+                        default=100,
+                        help='Number of questions answered by each learner')
+    parser.add_argument('--synthetic-actions',
+                        type=int,
+                        help='Start server in this process with synthetic hot keys file with this number of actions')
+    parser.add_argument('-b',
+                        '--results-backend',
+                        choices=[b.value for b in vhkt.basic.ResultsBackend],
+                        default=vhkt.basic.ResultsBackend.YAML.value,
+                        help='Learning results storage backend of server started with --synthetic-actions')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0)
+    parser.add_argument('--json',
+                        action='store_true',
+                        help='Print results as JSON')
+    args = parser.parse_args(argv)
+    if args.synthetic_actions is not None:
+        report = asyncio.run(_run_with_synthetic_server(args))
+    else:
+        report = asyncio.run(run_load_test(args.learners,
+                                           args.questions,
+                                           args.host,
+                                           args.port,
+                                           args.unix_socket,
+                                           args.app,
+                                           args.seed))
+    if args.json:
+        print(json.dumps(report, indent=1))
+    else:
+        for name, value in report.items():
+            print(f'{name}: {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+from collections import deque
+from typing import Callable, Deque, List, NamedTuple, Optional, Tuple
+
+from vhkt.basic import BasicLearningResultsStorage
+from vhkt.keycombo import Hotkey
+
+
+class PreparedQuestion(NamedTuple):
+    action_key: str
+    question: str
+    notes: List[str]
+    correct_answer: Optional[Tuple[Hotkey, ...]] = None
+    options: Optional[List[Tuple[Hotkey, ...]]] = None
+
+
+class QuestionsPrefetcher:
+
+    # Questions are prepared ahead while user answers current one, so moving to next question only takes
+    # prepared one from queue. Prepared question is dropped if its action was learned or skipped after preparation
+
+    DEFAULT_DEPTH = 1
+
+    def __init__(self,
+                 prepare_question: Callable[[], PreparedQuestion],
+                 learning_results_storage: BasicLearningResultsStorage,
+                 depth: int = DEFAULT_DEPTH):
+        self._prepare_question = prepare_question
+        self.learning_results_storage = learning_results_storage
+        self.depth = depth
+        self._queue: Deque[Tuple[PreparedQuestion, tuple]] = deque()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _action_eligibility(self, action_key):
+        return (self.learning_results_storage.action_success(action_key),
+                self.learning_results_storage.action_skipped(action_key))
+
+    def prefetch(self):
+        while self.prefetch_one():
+            pass
+
+    def prefetch_one(self) -> bool:
+        # Prepares one question, returns False if queue is already full
+        if len(self._queue) >= self.depth \
+                or self.learning_results_storage.all_actions_learned_successfully:
+            return False
+        question = self._prepare_question()
+        self._queue.append((question, self._action_eligibility(question.action_key)))
+        return True
+
+    def next_question(self) -> PreparedQuestion:
+        while self._queue:
+            question, eligibility = self._queue.popleft()
+            if self._action_eligibility(question.action_key) == eligibility:
+                return question
+        return self._prepare_question()
+
+    def clear(self):
+        self._queue.clear()
@@ -0,0 +1,149 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import sys
+from typing import Dict, Tuple
+
+from vhkt.keycombo import Hotkey
+
+
+def intern_action_key(action_key):
+    # Hot keys and learning results storages share action keys objects instead of keeping own copies
+    return sys.intern(action_key) if isinstance(action_key, str) else action_key
+
+
+def intern_key_combination_type(key_combination_type, interned: Dict[object, object]):
+    # Types are repeated for many actions, so one object is kept for each distinct one, list types are shared too
+    # and should not be mutated
+    if isinstance(key_combination_type, str):
+        return sys.intern(key_combination_type)
+    type_ident = tuple(key_combination_type) if isinstance(key_combination_type, list) else key_combination_type
+    return interned.setdefault(type_ident, key_combination_type)
+
+
+class Action:
+
+    # Action of hot keys storage, kept instead of dict loaded from file because dict per action with its keys
+    # takes several times more memory
+
+    __slots__ = ('description', 'type', 'hotkeys')
+
+    def __init__(self, description: str, key_combination_type, hotkeys: Tuple[Hotkey, ...]):
+        self.description = description
+        self.type = key_combination_type
+        self.hotkeys = hotkeys
+
+    @classmethod
+    def from_dict(cls, data: dict, interned_types: Dict[object, object]) -> 'Action':
+        return cls(sys.intern(data['description']),
+                   intern_key_combination_type(data.get('type', 'hotkey'), interned_types),
+                   tuple(Hotkey.parse(hotkey) for hotkey in data['hotkeys']))
+
+    def to_dict(self) -> dict:
+        return {
+            'description': self.description,
+            'type': self.type,
+            'hotkeys': [str(hotkey) for hotkey in self.hotkeys],
+        }
+
+    @classmethod
+    def from_tuple(cls, data: tuple, interned_types: Dict[object, object]) -> 'Action':
+        description, key_combination_type, hotkeys = data
+        return cls(sys.intern(description),
+                   intern_key_combination_type(key_combination_type, interned_types),
+                   tuple(Hotkey.from_tuple(hotkey) for hotkey in hotkeys))
+
+    def to_tuple(self) -> tuple:
+        # Builtin types only, for cache, hot keys are kept parsed
+        return self.description, self.type, tuple(hotkey.to_tuple() for hotkey in self.hotkeys)
+
+    def __eq__(self, other):
+        if not isinstance(other, Action):
+            return NotImplemented
+        return (self.description, self.type, self.hotkeys) == (other.description, other.type, other.hotkeys)
+
+    def __repr__(self):
+        return f'Action({self.description!r}, {self.type!r}, {self.hotkeys!r})'
+
+
+def actions_from_dicts(actions_data: dict) -> Dict[str, Action]:
+    interned_types = {}
+    return {intern_action_key(action_key): Action.from_dict(action_data, interned_types)
+            for action_key, action_data in actions_data.items()}
+
+
+def actions_from_tuples(actions_data: dict) -> Dict[str, Action]:
+    interned_types = {}
+    return {intern_action_key(action_key): Action.from_tuple(action_data, interned_types)
+            for action_key, action_data in actions_data.items()}
+
+
+def actions_to_tuples(actions: Dict[str, Action]) -> dict:
+    return {action_key: action.to_tuple() for action_key, action in actions.items()}
+
+
+class ActionProgress:
+
+    # Learning state of one action, fields which are None are absent in learning results file, as they were absent
+    # in dicts in which learning results were kept before. Keys of file unknown to this version are kept in "extra"
+    # to be written back
+
+    __slots__ = ('guesses', 'correct_guesses', 'error_guesses', 'success', 'skip', 'schedule', 'extra')
+
+    FIELDS = ('guesses', 'correct_guesses', 'error_guesses', 'success', 'skip', 'schedule')
+
+    def __init__(self,
+                 guesses: int = None,
+                 correct_guesses: int = None,
+                 error_guesses: int = None,
+                 success: bool = None,
+                 skip: bool = None,
+                 schedule: dict = None,
+                 extra: dict = None):
+        self.guesses = guesses
+        self.correct_guesses = correct_guesses
+        self.error_guesses = error_guesses
+        self.success = success
+        self.skip = skip
+        self.schedule = schedule
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ActionProgress':
+        if not data:
+            return EMPTY_PROGRESS
+        progress = cls(*(data.get(field) for field in cls.FIELDS))
+        if len(data) > sum(getattr(progress, field) is not None for field in cls.FIELDS):
+            progress.extra = {k: v for k, v in data.items() if k not in cls.FIELDS}
+        return progress
+
+    def to_dict(self) -> dict:
+        data = {field: getattr(self, field) for field in self.FIELDS if getattr(self, field) is not None}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self) -> 'ActionProgress':
+        return ActionProgress(*(getattr(self, field) for field in self.FIELDS), self.extra)
+
+    def __eq__(self, other):
+        if not isinstance(other, ActionProgress):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f'ActionProgress({self.to_dict()!r})'
+
+
+# Progress of all not answered yet actions, which are most of actions of large storages, it is shared and
+# should be replaced with copy before changing
+EMPTY_PROGRESS = ActionProgress()
+
+
+def progresses_from_dicts(actions_data: dict) -> Dict[str, ActionProgress]:
+    return {intern_action_key(action_key): ActionProgress.from_dict(action_data)
+            for action_key, action_data in actions_data.items()}
+
+
+def progresses_to_dicts(progresses: Dict[str, ActionProgress]) -> dict:
+    return {action_key: progress.to_dict() for action_key, progress in progresses.items()}
@@ -0,0 +1,54 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import random
+from typing import Dict, Hashable, List
+
+
+class RandomPool:
+
+    # Set of items supporting O(1) add, discard and uniform random choice,
+    # items are kept in array and removed by swapping with last one
+
+    def __init__(self, items=(), rnd: random.Random = None):
+        self._items: List[Hashable] = []
+        self._indexes: Dict[Hashable, int] = {}
+        self._random = rnd if rnd is not None else random
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._indexes
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, item):
+        if item in self._indexes:
+            return
+        self._indexes[item] = len(self._items)
+        self._items.append(item)
+
+    def discard(self, item):
+        index = self._indexes.pop(item, None)
+        if index is None:
+            return
+        last_item = self._items.pop()
+        if index < len(self._items):
+            self._items[index] = last_item
+            self._indexes[last_item] = index
+
+    def choice(self, exclude=None):
+        # Returns random item other than "exclude" if possible
+        if not self._items:
+            return None
+        exclude_index = self._indexes.get(exclude)
+        if exclude_index is None or len(self._items) == 1:
+            return self._items[self._random.randrange(len(self._items))]
+        index = self._random.randrange(len(self._items) - 1)
+        if index >= exclude_index:
+            index += 1
+        return self._items[index]
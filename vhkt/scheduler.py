@@ -0,0 +1,253 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import heapq
+import itertools
+import time
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Dict, List
+
+
+class SchedulerMode(Enum):
+    RANDOM = 'random'
+    LEITNER = 'leitner'
+    SM2 = 'sm2'
+
+
+class DueQueue:
+
+    # Priority queue of actions keys ordered by due time, entries are removed lazily as in heapq docs
+
+    REMOVED = None
+
+    def __init__(self):
+        self._heap: List[list] = []
+        self._entries: Dict[str, list] = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, action_key):
+        return action_key in self._entries
+
+    def push(self, action_key, due):
+        self.remove(action_key)
+        entry = [due, next(self._counter), action_key]
+        self._entries[action_key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def extend(self, actions_dues):
+        for action_key, due in actions_dues:
+            self.remove(action_key)
+            entry = [due, next(self._counter), action_key]
+            self._entries[action_key] = entry
+            self._heap.append(entry)
+        heapq.heapify(self._heap)
+
+    def remove(self, action_key):
+        entry = self._entries.pop(action_key, None)
+        if entry is not None:
+            entry[-1] = self.REMOVED
+
+    def _drop_removed(self):
+        while self._heap and self._heap[0][-1] is self.REMOVED:
+            heapq.heappop(self._heap)
+
+    def peek(self, exclude=None):
+        # Returns (due, action_key) of earliest action, "exclude" is skipped if there is any other action
+        self._drop_removed()
+        if not self._heap:
+            return None
+        due, _, action_key = self._heap[0]
+        if action_key != exclude or len(self._entries) == 1:
+            return due, action_key
+        # Second earliest entry is one of the root children, but some of them may be removed ones
+        entry = heapq.heappop(self._heap)
+        self._drop_removed()
+        second = self._heap[0]
+        heapq.heappush(self._heap, entry)
+        return second[0], second[-1]
+
+
+class BasicScheduler(ABC):
+
+    def __init__(self, clock=time.time):
+        self.learning_results_storage = None
+        self._clock = clock
+
+    def attach(self, learning_results_storage):
+        self.learning_results_storage = learning_results_storage
+
+    @abstractmethod
+    def next_action_key(self):
+        pass
+
+    @property
+    @abstractmethod
+    def has_due_reviews(self) -> bool:
+        pass
+
+    def on_guess(self, action_key, correctness):
+        pass
+
+    def on_learned(self, action_key):
+        pass
+
+    def on_skip(self, action_key):
+        pass
+
+    def on_remove(self, action_key):
+        pass
+
+
+class RandomScheduler(BasicScheduler):
+
+    def next_action_key(self):
+        return self.learning_results_storage.random_nonlearned_action_key
+
+    @property
+    def has_due_reviews(self) -> bool:
+        return False
+
+
+class SpacedRepetitionScheduler(BasicScheduler):
+
+    # Not learned actions are asked earliest due first, learned ones are moved to review queue
+    # and asked again when their due time comes
+
+    def __init__(self, clock=time.time):
+        super().__init__(clock)
+        self._learning_queue = DueQueue()
+        self._review_queue = DueQueue()
+        self._prev_action_key = None
+
+    def attach(self, learning_results_storage):
+        super().attach(learning_results_storage)
+        learning_actions_dues = []
+        review_actions_dues = []
+        for action_key in learning_results_storage.actions_keys:
+            if learning_results_storage.action_skipped(action_key):
+                continue
+            due = learning_results_storage.action_schedule(action_key).get('due', 0)
+            if learning_results_storage.action_success(action_key):
+                review_actions_dues.append((action_key, due))
+            else:
+                learning_actions_dues.append((action_key, due))
+        self._learning_queue.extend(learning_actions_dues)
+        self._review_queue.extend(review_actions_dues)
+
+    def next_action_key(self):
+        review = self._review_queue.peek(exclude=self._prev_action_key)
+        if review is not None and review[0] <= self._clock():
+            action_key = review[1]
+        else:
+            learning = self._learning_queue.peek(exclude=self._prev_action_key)
+            if learning is None:
+                return None
+            action_key = learning[1]
+        self._prev_action_key = action_key
+        return action_key
+
+    @property
+    def has_due_reviews(self) -> bool:
+        review = self._review_queue.peek()
+        return review is not None and review[0] <= self._clock()
+
+    @abstractmethod
+    def _next_schedule(self, schedule: dict, correctness: bool, now: float) -> dict:
+        pass
+
+    def on_guess(self, action_key, correctness):
+        schedule = self._next_schedule(dict(self.learning_results_storage.action_schedule(action_key)),
+                                       correctness,
+                                       self._clock())
+        self.learning_results_storage.set_action_schedule(action_key, schedule)
+        self._requeue(action_key)
+
+    def on_learned(self, action_key):
+        self._requeue(action_key)
+
+    def on_skip(self, action_key):
+        self._learning_queue.remove(action_key)
+        self._review_queue.remove(action_key)
+
+    def on_remove(self, action_key):
+        self.on_skip(action_key)
+
+    def _requeue(self, action_key):
+        self.on_skip(action_key)
+        if self.learning_results_storage.action_skipped(action_key):
+            return
+        due = self.learning_results_storage.action_schedule(action_key).get('due', 0)
+        if self.learning_results_storage.action_success(action_key):
+            self._review_queue.push(action_key, due)
+        else:
+            self._learning_queue.push(action_key, due)
+
+
+class LeitnerScheduler(SpacedRepetitionScheduler):
+
+    # Seconds to wait before asking action from box again, index is box number
+    BOXES_INTERVALS = (
+        0,
+        10 * 60,
+        24 * 60 * 60,
+        3 * 24 * 60 * 60,
+        7 * 24 * 60 * 60,
+        21 * 24 * 60 * 60,
+    )
+
+    def _next_schedule(self, schedule, correctness, now):
+        box = schedule.get('box', 0)
+        if correctness:
+            box = min(box + 1, len(self.BOXES_INTERVALS) - 1)
+        else:
+            box = 0
+        return {
+            'box': box,
+            'due': now + self.BOXES_INTERVALS[box],
+        }
+
+
+class Sm2Scheduler(SpacedRepetitionScheduler):
+
+    INITIAL_EASE = 2.5
+    MIN_EASE = 1.3
+    CORRECT_ANSWER_QUALITY = 5
+    WRONG_ANSWER_QUALITY = 2
+    # SM-2 counts intervals in days, first two repetitions intervals are fixed
+    INTERVAL_UNIT = 24 * 60 * 60
+    FIRST_INTERVALS = (1, 6)
+
+    def _next_schedule(self, schedule, correctness, now):
+        ease = schedule.get('ease', self.INITIAL_EASE)
+        repetitions = schedule.get('repetitions', 0)
+        interval = schedule.get('interval', 0)
+        quality = self.CORRECT_ANSWER_QUALITY if correctness else self.WRONG_ANSWER_QUALITY
+        ease = max(self.MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        if correctness:
+            if repetitions < len(self.FIRST_INTERVALS):
+                interval = self.FIRST_INTERVALS[repetitions]
+            else:
+                interval = interval * ease
+            repetitions += 1
+            due = now + interval * self.INTERVAL_UNIT
+        else:
+            repetitions = 0
+            interval = 0
+            due = now
+        return {
+            'ease': round(ease, 2),
+            'repetitions': repetitions,
+            'interval': interval,
+            'due': due,
+        }
+
+
+SCHEDULERS_CLASSES = {
+    SchedulerMode.RANDOM: RandomScheduler,
+    SchedulerMode.LEITNER: LeitnerScheduler,
+    SchedulerMode.SM2: Sm2Scheduler,
+}
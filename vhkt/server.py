@@ -0,0 +1,264 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+# Serves many learners from one process, each hot keys file is loaded once and shared by all sessions, e.g.
+# python3 -m vhkt.server hotkeys/vim.yaml hotkeys/bash.yaml --results-dir results --port 8765
+# Each request and response is JSON object on separate line:
+#   {"op": "login", "user": "alice", "app": "Vim"} -> {"ok": true, "app": "Vim", "stats": [...]},
+#       "app" could be omitted if only one hot keys file is served
+#   {"op": "question"} -> {"ok": true, "action": "undo", "question": "WHAT IS HOTKEY FOR \"UNDO\"?"}
+#       or {"ok": true, "all_learned": true}
+#   {"op": "answer", "answer": "u"} -> {"ok": true, "action": "undo", "correct": true, "hotkeys": ["u"], ...},
+#       answers last asked question, string answer is split by "," like in simple text mode
+#   {"op": "skip"} -> {"ok": true, "action": "undo", "skipped": true, ...}, skips last asked question
+#   {"op": "stats"} -> {"ok": true, "stats": [...]}
+#   {"op": "apps"} -> {"ok": true, "apps": ["Bash", "Vim"]}
+# Failed request gets {"ok": false, "error": "..."} response, session stays open
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import vhkt.basic
+import vhkt.scheduler
+from vhkt.basic import BasicHotKeysStorage, BasicLearningResultsStorage
+from vhkt.batch import BatchTutor
+
+logger = logging.getLogger(__name__)
+
+# User names are parts of learning results files names
+USER_NAME_PATTERN = re.compile(r'[A-Za-z0-9_.-]{1,64}')
+
+# Request fields which should be strings if given, "answer" could also be list of strings
+STRING_REQUEST_FIELDS = ('op', 'user', 'app')
+
+# Saving learning results synchronously would block all sessions while file is written
+DEFAULT_SAVE_INTERVAL = 1.0
+
+
+class _Learner:
+
+    # Learning results of user for one application, shared by all sessions of this user
+
+    def __init__(self, storage: BasicLearningResultsStorage):
+        self.storage = storage
+        self.sessions_count = 0
+
+
+class LearnerSession:
+
+    def __init__(self):
+        self.learner_ident: Tuple[str, str] = None
+        self.tutor: BatchTutor = None
+        self.action_key = None
+
+
+class HotKeysServer:
+
+    def __init__(self,
+                 hk_storages: List[BasicHotKeysStorage],
+                 results_dir_path,
+                 results_backend: vhkt.basic.ResultsBackend = vhkt.basic.ResultsBackend.YAML,
+                 scheduler_mode: vhkt.scheduler.SchedulerMode = vhkt.scheduler.SchedulerMode.RANDOM,
+                 save_interval: float = DEFAULT_SAVE_INTERVAL):
+        self.hk_storages: Dict[str, BasicHotKeysStorage] = {}
+        for hk_storage in hk_storages:
+            if hk_storage.app_name in self.hk_storages:
+                raise ValueError(f'Application "{hk_storage.app_name}" is served twice')
+            self.hk_storages[hk_storage.app_name] = hk_storage
+        self.results_dir_path = Path(results_dir_path)
+        self.results_backend = results_backend
+        self.scheduler_mode = scheduler_mode
+        self.save_interval = save_interval
+        self._learners: Dict[Tuple[str, str], _Learner] = {}
+        self.sessions_count = 0
+
+    def _open_learning_results_storage(self, user, hk_storage) -> BasicLearningResultsStorage:
+        suffix = vhkt.basic.RESULTS_BACKENDS_SUFFIXES[self.results_backend]
+        app_file_name = re.sub(r'[^A-Za-z0-9_.-]', '_', hk_storage.app_name)
+        file_path = self.results_dir_path / f'{user}-{app_file_name}{suffix}'
+        storage: BasicLearningResultsStorage
+        if self.results_backend == vhkt.basic.ResultsBackend.SQLITE:
+            from vhkt.sqlitestorage import SqliteLearningResultsStorage
+            storage = SqliteLearningResultsStorage(file_path, hk_storage)
+        elif self.results_backend == vhkt.basic.ResultsBackend.COLUMNAR:
+            from vhkt.columnarstorage import ColumnarLearningResultsStorage
+            storage = ColumnarLearningResultsStorage(file_path, hk_storage, save_interval=self.save_interval)
+        elif self.results_backend == vhkt.basic.ResultsBackend.YAML:
+            from vhkt.filestorage import FileLearningResultsStorage
+            storage = FileLearningResultsStorage(file_path, hk_storage, save_interval=self.save_interval)
+        else:
+            raise NotImplementedError(f'Invalid learning results backend "{self.results_backend}"')
+        storage.set_scheduler(vhkt.scheduler.SCHEDULERS_CLASSES[self.scheduler_mode]())
+        return storage
+
+    def login(self, session: LearnerSession, user, app_name):
+        if not isinstance(user, str) or not USER_NAME_PATTERN.fullmatch(user):
+            raise ValueError(f'User name should match "{USER_NAME_PATTERN.pattern}"')
+        if app_name is None and len(self.hk_storages) == 1:
+            app_name, = self.hk_storages
+        if app_name not in self.hk_storages:
+            raise ValueError(f'Unknown application "{app_name}", available ones: {", ".join(self.hk_storages)}')
+        self.logout(session)
+        hk_storage = self.hk_storages[app_name]
+        learner_ident = (user, app_name)
+        learner = self._learners.get(learner_ident)
+        if learner is None:
+            learner = self._learners[learner_ident] = _Learner(self._open_learning_results_storage(user, hk_storage))
+        learner.sessions_count += 1
+        session.learner_ident = learner_ident
+        session.tutor = BatchTutor(hk_storage, learner.storage, None, None)
+
+    def logout(self, session: LearnerSession):
+        if session.learner_ident is None:
+            return
+        learner = self._learners[session.learner_ident]
+        learner.sessions_count -= 1
+        if learner.sessions_count == 0:
+            del self._learners[session.learner_ident]
+            learner.storage.close()
+        session.learner_ident = None
+        session.tutor = None
+        session.action_key = None
+
+    def close(self):
+        for learner in self._learners.values():
+            learner.storage.close()
+        self._learners.clear()
+
+    def handle_request(self, session: LearnerSession, request) -> dict:
+        if not isinstance(request, dict):
+            raise ValueError('Request should be JSON object')
+        for field in STRING_REQUEST_FIELDS:
+            if request.get(field) is not None and not isinstance(request[field], str):
+                raise ValueError(f'Request field "{field}" should be string')
+        answer = request.get('answer')
+        if answer is not None and not isinstance(answer, str) \
+                and not (isinstance(answer, list) and all(isinstance(block, str) for block in answer)):
+            raise ValueError('Request field "answer" should be string or list of strings')
+        op = request.get('op')
+        if op == 'apps':
+            return {'apps': list(self.hk_storages)}
+        if op == 'login':
+            self.login(session, request.get('user'), request.get('app'))
+            return {'app': session.learner_ident[1], 'stats': session.tutor.learning_stats}
+        if op not in ('question', 'answer', 'skip', 'stats'):
+            raise ValueError(f'Unknown operation "{op}"')
+        if session.tutor is None:
+            raise ValueError('Login first')
+        if op == 'stats':
+            return {'stats': session.tutor.learning_stats}
+        if op == 'question':
+            if session.tutor.learning_results_storage.all_actions_learned_successfully:
+                session.action_key = None
+                return {'all_learned': True}
+            session.action_key, question, notes = session.tutor.prepare_question()
+            return {'action': session.action_key, 'question': question, 'notes': notes}
+        if session.action_key is None:
+            raise ValueError('Ask question first')
+        record = {'action': session.action_key, 'answer': request.get('answer'), 'skip': op == 'skip'}
+        result = session.tutor.process_record(record)
+        session.action_key = None
+        return result
+
+    def handle_line(self, session: LearnerSession, line: bytes) -> bytes:
+        try:
+            response = {'ok': True, **self.handle_request(session, json.loads(line))}
+        except (ValueError, KeyError) as err:
+            response = {'ok': False, 'error': str(err)}
+        except Exception:
+            # Bad request must not close session of learner, so it is only logged
+            logger.exception(f'Failed to handle request {line!r}')
+            response = {'ok': False, 'error': 'Internal error'}
+        return (json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8')
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = LearnerSession()
+        self.sessions_count += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line is longer than stream reader limit, stream position is lost so session is closed
+                    writer.write(b'{"ok": false, "error": "Request is too long"}\n')
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    writer.write(self.handle_line(session, line))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions_count -= 1
+            self.logout(session)
+            writer.close()
+
+    async def start(self, host: str = None, port: int = None, unix_socket_path: str = None) -> asyncio.AbstractServer:
+        if unix_socket_path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, unix_socket_path)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(server: HotKeysServer, host, port, unix_socket_path):
+    asyncio_server = await server.start(host, port, unix_socket_path)
+    addresses = ', '.join(str(sock.getsockname()) for sock in asyncio_server.sockets)
+    logger.info(f'Serving {", ".join(server.hk_storages)} on {addresses}')
+    try:
+        async with asyncio_server:
+            await asyncio_server.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hot keys tutor server for many concurrent learners')
+    parser.add_argument('HOT_KEYS_FILES',
+                        nargs='+',
+                        help='Hot keys files to serve, each one is loaded once and shared by all learners')
+    parser.add_argument('--results-dir',
+                        default='.',
+                        help='Directory to keep learning results of users in')
+    parser.add_argument('--host',
+                        default='127.0.0.1')
+    parser.add_argument('--port',
+                        type=int,
+                        default=8765)
+    parser.add_argument('--unix-socket',
+                        help='Path to Unix socket to listen on instead of TCP port')
+    parser.add_argument('-b',
+                        '--results-backend',
+                        choices=[b.value for b in vhkt.basic.ResultsBackend],
+                        default=vhkt.basic.ResultsBackend.YAML.value,
+                        help='Learning results storage backend')
+    parser.add_argument('-s',
+                        '--scheduler',
+                        choices=[m.value for m in vhkt.scheduler.SchedulerMode],
+                        default=vhkt.scheduler.SchedulerMode.RANDOM.value,
+                        help='Questions scheduler')
+    parser.add_argument('--save-interval',
+                        type=float,
+                        default=DEFAULT_SAVE_INTERVAL,
+                        help='Save learning results in background not more often than once per this number of seconds, 0 means save synchronously after each answer')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    from vhkt.filestorage import FileHotKeysStorage
+    server = HotKeysServer([FileHotKeysStorage(file_path) for file_path in args.HOT_KEYS_FILES],
+                           args.results_dir,
+                           vhkt.basic.ResultsBackend(args.results_backend),
+                           vhkt.scheduler.SchedulerMode(args.scheduler),
+                           args.save_interval or None)
+    Path(args.results_dir).mkdir(parents=True, exist_ok=True)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
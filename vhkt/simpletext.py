@@ -2,10 +2,27 @@
 # 2020 Dmitriy Vinokurov gim6626@gmail.com
 
 from vhkt.basic import BasicTutor
+from vhkt.keycombo import Modifier, split_sequence
 
 
 class SimpleTextTutor(BasicTutor):
 
+    @staticmethod
+    def select_app(catalog_entries):
+        for i, entry in enumerate(catalog_entries):
+            print(f'{i + 1}. {entry.title}')
+        while True:
+            answer = input('Select application to learn hotkeys for or type "\\e" to exit: ')
+            if answer == '\\e':
+                return None
+            if answer.isdigit() and 0 < int(answer) <= len(catalog_entries):
+                entry = catalog_entries[int(answer) - 1]
+                if entry.available:
+                    return entry
+                print(f'"{entry.file_name}" could not be loaded, select other application')
+                continue
+            print(f'You should type number from 1 to {len(catalog_entries)}')
+
     def print(self, msg):
         print(msg)
 
@@ -21,7 +38,7 @@ class SimpleTextTutor(BasicTutor):
             answer_type = self.AnswerType.EXIT
         else:
             answer_type = self.AnswerType.REGULAR_ANSWER
-        return answer_type, answer.split(',')
+        return answer_type, split_sequence(answer)
 
     def show_welcome_message(self):
         self.print(self.WELCOME_STRING)
@@ -38,17 +55,12 @@ class SimpleTextTutor(BasicTutor):
         several_keys_note = 'If you need to type several keys combinations one by one, type them with comma separator like "a,b"'
         ctrl_note = 'If you need to use Ctrl or other special key in answer, type it\'s name plus regular key like "Ctrl+w"'
         for correct_answer in correct_answers:
-            if isinstance(correct_answer, list):
-                if not list_found:
-                    notes.append(several_keys_note)
-                    list_found = True
-                elif 'Ctrl' in correct_answer and not ctrl_found:
-                    notes.append(ctrl_note)
-                    ctrl_found = True
-            elif isinstance(correct_answer, str):
-                if 'Ctrl' in correct_answer and not ctrl_found:
-                    notes.append(ctrl_note)
-                    ctrl_found = True
+            if correct_answer.is_sequence and not list_found:
+                notes.append(several_keys_note)
+                list_found = True
+            if correct_answer.has_modifier(Modifier.CTRL) and not ctrl_found:
+                notes.append(ctrl_note)
+                ctrl_found = True
         notes.append('Type keys combination or "\\h" for help or "\\e" to exit and press ENTER')
         return notes
 
@@ -0,0 +1,395 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import json
+import sqlite3
+
+from vhkt.basic import (
+    BasicHotKeysStorage,
+    BasicLearningResultsStorage,
+)
+from vhkt.keycombo import Hotkey
+from vhkt.sampling import RandomPool
+from vhkt.timing import timed
+
+
+class SqliteHotKeysStorage(BasicHotKeysStorage):
+
+    # Catalog of many applications hot keys, actions rows are loaded only when asked for.
+    # Hot keys are stored as JSON list of hot keys strings spelled as in hot keys file
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS apps (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS actions (
+            id INTEGER PRIMARY KEY,
+            app_id INTEGER NOT NULL REFERENCES apps (id) ON DELETE CASCADE,
+            key TEXT NOT NULL,
+            description TEXT NOT NULL,
+            type TEXT NOT NULL,
+            hotkeys TEXT NOT NULL,
+            UNIQUE (app_id, key)
+        );
+    '''
+    FTS_SCHEMA = '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS actions_fts USING fts5(description, content='actions', content_rowid='id');
+        CREATE TRIGGER IF NOT EXISTS actions_fts_insert AFTER INSERT ON actions BEGIN
+            INSERT INTO actions_fts (rowid, description) VALUES (new.id, new.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS actions_fts_delete AFTER DELETE ON actions BEGIN
+            INSERT INTO actions_fts (actions_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS actions_fts_update AFTER UPDATE ON actions BEGIN
+            INSERT INTO actions_fts (actions_fts, rowid, description) VALUES ('delete', old.id, old.description);
+            INSERT INTO actions_fts (rowid, description) VALUES (new.id, new.description);
+        END;
+    '''
+
+    hkdb_file_path: str = None
+
+    @timed('hk_storage_load')
+    def __init__(self, hkdb_file_path: str, app_name: str = None, search_query: str = None):
+        self.hkdb_file_path = hkdb_file_path
+        self._connection = sqlite3.connect(str(hkdb_file_path))
+        self._connection.execute('PRAGMA foreign_keys=ON')
+        self._connection.executescript(self.SCHEMA)
+        try:
+            self._connection.executescript(self.FTS_SCHEMA)
+            self._fts_available = True
+        except sqlite3.OperationalError:
+            # SQLite is built without FTS5, plain substring search is used instead
+            self._fts_available = False
+        self._actions = {}
+        self._app_id = None
+        self._app_name = None
+        self._actions_keys = None
+        if app_name is not None or len(self.apps_names) == 1:
+            self.select_app(app_name if app_name is not None else self.apps_names[0], search_query)
+
+    @property
+    def apps_names(self):
+        return [name for name, in self._connection.execute('SELECT name FROM apps ORDER BY name')]
+
+    @timed('hk_storage_select_app')
+    def select_app(self, app_name, search_query: str = None):
+        row = self._connection.execute('SELECT id FROM apps WHERE name = ?', (app_name,)).fetchone()
+        if row is None:
+            raise ValueError(f'Application "{app_name}" not found in "{self.hkdb_file_path}"')
+        self._app_id = row[0]
+        self._app_name = app_name
+        self._actions = {}
+        if search_query is None:
+            rows = self._connection.execute('SELECT key FROM actions WHERE app_id = ? ORDER BY id', (self._app_id,))
+        elif self._fts_available:
+            try:
+                rows = self._connection.execute('''
+                    SELECT actions.key
+                    FROM actions_fts JOIN actions ON actions.id = actions_fts.rowid
+                    WHERE actions_fts MATCH ? AND actions.app_id = ?
+                    ORDER BY actions.id
+                ''', (search_query, self._app_id)).fetchall()
+            except sqlite3.OperationalError as err:
+                raise ValueError(f'Bad search query "{search_query}": {err}')
+        else:
+            rows = self._connection.execute('''
+                SELECT key FROM actions WHERE app_id = ? AND description LIKE ? ORDER BY id
+            ''', (self._app_id, f'%{search_query}%'))
+        self._actions_keys = [key for key, in rows]
+
+    def _action(self, key):
+        action = self._actions.get(key)
+        if action is None:
+            row = self._connection.execute('SELECT description, type, hotkeys FROM actions WHERE app_id = ? AND key = ?',
+                                           (self._app_id, key)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            description, key_combination_type, hotkeys = row
+            hotkeys = tuple(Hotkey.parse(hotkey) for hotkey in json.loads(hotkeys))
+            action = (description, json.loads(key_combination_type), hotkeys, frozenset(hotkeys))
+            self._actions[key] = action
+        return action
+
+    @property
+    def actions_keys(self):
+        return list(self._actions_keys)
+
+    @property
+    def app_name(self):
+        return self._app_name
+
+    def action_description_by_key(self, key):
+        return self._action(key)[0]
+
+    def key_combination_type_by_key(self, key):
+        return self._action(key)[1]
+
+    def action_hotkeys_by_key(self, key):
+        return self._action(key)[2]
+
+    def action_has_hotkey(self, key, hotkey):
+        return hotkey in self._action(key)[3]
+
+    def import_app(self, hk_storage: BasicHotKeysStorage):
+        # Application actions are replaced if it is already in catalog
+        with self._connection:
+            self._connection.execute('DELETE FROM apps WHERE name = ?', (hk_storage.app_name,))
+            app_id = self._connection.execute('INSERT INTO apps (name) VALUES (?)', (hk_storage.app_name,)).lastrowid
+            self._connection.executemany(
+                'INSERT INTO actions (app_id, key, description, type, hotkeys) VALUES (?, ?, ?, ?, ?)',
+                [
+                    (
+                        app_id,
+                        key,
+                        hk_storage.action_description_by_key(key),
+                        json.dumps(hk_storage.key_combination_type_by_key(key)),
+                        json.dumps([str(hotkey) for hotkey in hk_storage.action_hotkeys_by_key(key)]),
+                    )
+                    for key in hk_storage.actions_keys
+                ]
+            )
+        if hk_storage.app_name == self._app_name:
+            self.select_app(self._app_name)
+
+    def close(self):
+        self._connection.close()
+
+
+class SqliteLearningResultsStorage(BasicLearningResultsStorage):
+
+    # Results for several applications could be kept in one database, they are distinguished by "app" column.
+    # NULL counters mean that action was never guessed, like missing keys in YAML learning results file
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS learning_results (
+            app TEXT NOT NULL,
+            key TEXT NOT NULL,
+            guesses INTEGER,
+            correct_guesses INTEGER,
+            error_guesses INTEGER,
+            success INTEGER NOT NULL DEFAULT 0,
+            skip INTEGER NOT NULL DEFAULT 0,
+            in_process INTEGER NOT NULL DEFAULT 0,
+            schedule TEXT,
+            PRIMARY KEY (app, key)
+        );
+        CREATE INDEX IF NOT EXISTS learning_results_success ON learning_results (app, success);
+        CREATE INDEX IF NOT EXISTS learning_results_skip ON learning_results (app, skip);
+        CREATE INDEX IF NOT EXISTS learning_results_in_process ON learning_results (app, in_process);
+    '''
+
+    lrnres_file_path: str = None
+
+    @timed('learning_results_storage_load')
+    def __init__(self, lrnres_file_path: str, hk_storage: BasicHotKeysStorage):
+        self.lrnres_file_path = lrnres_file_path
+        self.hk_storage: BasicHotKeysStorage = hk_storage
+        self._app = hk_storage.app_name
+        self._connection = sqlite3.connect(str(lrnres_file_path))
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(self.SCHEMA)
+        with self._connection:
+            self._connection.executemany('INSERT OR IGNORE INTO learning_results (app, key) VALUES (?, ?)',
+                                         [(self._app, key) for key in hk_storage.actions_keys])
+        self._prev_action_key = None
+        self._hk_actions_keys = frozenset(hk_storage.actions_keys)
+        # Aggregates are counted by SQL on open and then updated by each change, see _action_counts
+        self._stats = self._recount_stats()
+        self._nonlearned_actions_keys = RandomPool(
+            key
+            for key, in self._connection.execute(
+                'SELECT key FROM learning_results WHERE app = ? AND success = 0 AND skip = 0',
+                (self._app,))
+            if key in self._hk_actions_keys
+        )
+
+    def _action_column(self, action_key, column):
+        row = self._connection.execute(f'SELECT {column} FROM learning_results WHERE app = ? AND key = ?',
+                                       (self._app, action_key)).fetchone()
+        if row is None:
+            raise KeyError(action_key)
+        return row[0]
+
+    def _recount_stats(self):
+        return [int(value) for value in self._connection.execute('''
+            SELECT
+                COUNT(*),
+                TOTAL(success),
+                TOTAL(in_process),
+                TOTAL(guesses),
+                TOTAL(error_guesses),
+                TOTAL(skip)
+            FROM learning_results
+            WHERE app = ?
+        ''', (self._app,)).fetchone()]
+
+    def _action_counts(self, action_key):
+        # Action contribution to each of aggregates, in the same order as in _recount_stats
+        row = self._connection.execute('''
+            SELECT 1, success, in_process, COALESCE(guesses, 0), COALESCE(error_guesses, 0), skip
+            FROM learning_results
+            WHERE app = ? AND key = ?
+        ''', (self._app, action_key)).fetchone()
+        return row if row is not None else (0,) * len(self._stats)
+
+    def _update_stats(self, old_counts, new_counts):
+        for i, (old_count, new_count) in enumerate(zip(old_counts, new_counts)):
+            self._stats[i] += new_count - old_count
+
+    def _update_action_eligibility(self, action_key, counts):
+        if counts[0] \
+                and action_key in self._hk_actions_keys \
+                and not counts[1] \
+                and not counts[5]:
+            self._nonlearned_actions_keys.add(action_key)
+        else:
+            self._nonlearned_actions_keys.discard(action_key)
+
+    def _execute_for_action(self, action_key, query, **params):
+        # Every change is single row transaction, so it is already saved when method returns
+        with self._connection:
+            old_counts = self._action_counts(action_key)
+            self._connection.execute('INSERT OR IGNORE INTO learning_results (app, key) VALUES (?, ?)',
+                                     (self._app, action_key))
+            self._connection.execute(query, dict(params, app=self._app, key=action_key))
+            new_counts = self._action_counts(action_key)
+        self._update_stats(old_counts, new_counts)
+        self._update_action_eligibility(action_key, new_counts)
+
+    @property
+    def actions_keys(self):
+        return [key for key, in self._connection.execute('SELECT key FROM learning_results WHERE app = ?',
+                                                          (self._app,))]
+
+    def action_success(self, action_key) -> bool:
+        return bool(self._action_column(action_key, 'success'))
+
+    def action_guesses(self, action_key) -> int:
+        return self._action_column(action_key, 'guesses')
+
+    def action_correct_guesses(self, action_key) -> int:
+        return self._action_column(action_key, 'correct_guesses')
+
+    def action_error_guesses(self, action_key) -> int:
+        return self._action_column(action_key, 'error_guesses')
+
+    def action_learning_in_process(self, action_key) -> bool:
+        return bool(self._action_column(action_key, 'in_process'))
+
+    def action_skipped(self, action_key) -> bool:
+        return bool(self._action_column(action_key, 'skip'))
+
+    def action_schedule(self, action_key) -> dict:
+        schedule = self._action_column(action_key, 'schedule')
+        return json.loads(schedule) if schedule is not None else {}
+
+    def set_action_schedule(self, action_key, schedule: dict):
+        self._execute_for_action(action_key,
+                                 'UPDATE learning_results SET schedule = :schedule WHERE app = :app AND key = :key',
+                                 schedule=json.dumps(schedule))
+
+    @property
+    def actions_count(self) -> int:
+        return self._stats[0]
+
+    @property
+    def actions_learned_count(self) -> int:
+        return self._stats[1]
+
+    @property
+    def actions_learning_in_process_count(self) -> int:
+        return self._stats[2]
+
+    @property
+    def actions_guesses_count(self) -> int:
+        return self._stats[3]
+
+    @property
+    def actions_error_guesses_count(self) -> int:
+        return self._stats[4]
+
+    @property
+    def skipped_actions_count(self):
+        return self._stats[5]
+
+    def remove_results_for_action(self, action_key):
+        with self._connection:
+            old_counts = self._action_counts(action_key)
+            self._connection.execute('DELETE FROM learning_results WHERE app = ? AND key = ?',
+                                     (self._app, action_key))
+        self._update_stats(old_counts, (0,) * len(self._stats))
+        self._nonlearned_actions_keys.discard(action_key)
+        if self.scheduler is not None:
+            self.scheduler.on_remove(action_key)
+
+    def set_action_learned_successfully(self, action_key):
+        self._execute_for_action(action_key,
+                                 'UPDATE learning_results SET success = 1, in_process = 0 WHERE app = :app AND key = :key')
+        if self.scheduler is not None:
+            self.scheduler.on_learned(action_key)
+
+    def set_action_guess_correctness(self, action_key, correctness):
+        # All right hand side expressions see old column values
+        self._execute_for_action(action_key, '''
+            UPDATE learning_results SET
+                guesses = COALESCE(guesses, 0) + 1,
+                correct_guesses = CASE
+                    WHEN :correct THEN COALESCE(correct_guesses, 0) + 1
+                    ELSE MAX(COALESCE(correct_guesses, 0) - 1, 0)
+                END,
+                error_guesses = COALESCE(error_guesses, 0) + CASE WHEN :correct THEN 0 ELSE 1 END,
+                success = success OR correct_guesses IS NOT NULL AND :correct AND correct_guesses + 1 >= :to_learn,
+                in_process = NOT (success OR correct_guesses IS NOT NULL AND :correct AND correct_guesses + 1 >= :to_learn)
+            WHERE app = :app AND key = :key
+        ''', correct=bool(correctness), to_learn=self.CORRECT_ANSWERS_TO_LEARN)
+        if self.scheduler is not None:
+            self.scheduler.on_guess(action_key, correctness)
+
+    def skip_action(self, action_key):
+        self._execute_for_action(action_key, 'UPDATE learning_results SET skip = 1 WHERE app = :app AND key = :key')
+        if self.scheduler is not None:
+            self.scheduler.on_skip(action_key)
+
+    @property
+    def all_actions_learned_successfully(self) -> bool:
+        return self.actions_count > 0 \
+            and len(self._nonlearned_actions_keys) == 0 \
+            and (self.scheduler is None or not self.scheduler.has_due_reviews)
+
+    @property
+    def random_nonlearned_action_key(self):
+        random_action_key = self._nonlearned_actions_keys.choice(exclude=self._prev_action_key)
+        if random_action_key is not None:
+            self._prev_action_key = random_action_key
+        return random_action_key
+
+    def save(self):
+        # Changes are committed right away
+        pass
+
+    def close(self):
+        self._connection.close()
+
+    def import_results(self, learning_results_storage: BasicLearningResultsStorage):
+        rows = []
+        for key in learning_results_storage.actions_keys:
+            success = learning_results_storage.action_success(key)
+            guesses = learning_results_storage.action_guesses(key)
+            schedule = learning_results_storage.action_schedule(key)
+            rows.append((
+                self._app,
+                key,
+                guesses,
+                learning_results_storage.action_correct_guesses(key),
+                learning_results_storage.action_error_guesses(key),
+                success,
+                learning_results_storage.action_skipped(key),
+                bool(guesses) and not success,
+                json.dumps(schedule) if schedule else None,
+            ))
+        with self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO learning_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                         rows)
+        self._stats = self._recount_stats()
+        for key, *_ in rows:
+            self._update_action_eligibility(key, self._action_counts(key))
@@ -0,0 +1,301 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+# Measures hot keys and learning results file storages operations with synthetic storages of given sizes, e.g.
+# python3 -m vhkt.storagebenchmark --actions-counts 1000 100000 --output results.json
+# Results of two runs, e.g. before and after change, are compared with
+# python3 -m vhkt.storagebenchmark --actions-counts 1000 100000 --compare results.json
+# Memory taken by storages actions records and by nested dicts in which they were kept before is compared with
+# python3 -m vhkt.storagebenchmark --actions-counts 1000 100000 --memory
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+import vhkt.filestorage
+from vhkt.convert import convert
+from vhkt.formats import FORMATS
+from vhkt.keycombo import Hotkey
+from vhkt.records import actions_from_dicts, progresses_from_dicts
+from vhkt.simpletext import SimpleTextTutor
+from vhkt.synthetic import (
+    synthetic_hotkeys_data,
+    synthetic_learning_results_data,
+    write_synthetic_hotkeys_file,
+    write_synthetic_learning_results_file,
+)
+
+RESULTS_FORMAT_VERSION = 1
+
+# Relative slowdown of operation which is reported as regression
+DEFAULT_TOLERANCE = 0.2
+
+
+class BenchmarkResult(NamedTuple):
+    case: str
+    actions_count: int
+    calls: int
+    repeat: int
+    # Per call times, best one is least affected by other processes and is used for comparison
+    best_seconds: float
+    median_seconds: float
+
+
+class Regression(NamedTuple):
+    case: str
+    actions_count: int
+    baseline_seconds: float
+    seconds: float
+
+    @property
+    def ratio(self):
+        return self.seconds / self.baseline_seconds
+
+
+class MemoryResult(NamedTuple):
+    case: str
+    actions_count: int
+    dicts_bytes: int
+    records_bytes: int
+
+    @property
+    def ratio(self):
+        return self.records_bytes / self.dicts_bytes
+
+
+def _measure(case, actions_count, func, repeat, calls=1) -> BenchmarkResult:
+    seconds = [t / calls for t in timeit.Timer(func).repeat(repeat, 1)]
+    return BenchmarkResult(case, actions_count, calls, repeat, min(seconds), statistics.median(seconds))
+
+
+def benchmark(actions_count: int, repeat: int = 3, calls: int = 10000, seed: int = 0) -> List[BenchmarkResult]:
+    rnd = random.Random(seed)
+    results = []
+    with tempfile.TemporaryDirectory() as dir_path:
+        hkdb_file_path = Path(dir_path) / 'hotkeys.yaml'
+        lrnres_file_path = Path(dir_path) / 'results.yaml'
+        write_synthetic_hotkeys_file(hkdb_file_path, actions_count, rnd)
+
+        def load_hk_storage(use_cache):
+            return vhkt.filestorage.FileHotKeysStorage(hkdb_file_path, use_cache=use_cache)
+
+        results.append(_measure('hk_storage_load', actions_count, lambda: load_hk_storage(False), repeat))
+        for data_format in ('json', 'marshal'):
+            converted_file_path = Path(dir_path) / f'hotkeys.{data_format}'
+            convert(hkdb_file_path, converted_file_path)
+            results.append(_measure(f'hk_storage_load_{data_format}',
+                                    actions_count,
+                                    lambda: vhkt.filestorage.FileHotKeysStorage(converted_file_path, use_cache=False),
+                                    repeat))
+        # Fills cache
+        load_hk_storage(True)
+        results.append(_measure('hk_storage_load_cached', actions_count, lambda: load_hk_storage(True), repeat))
+        hk_storage = load_hk_storage(False)
+        actions_keys = hk_storage.actions_keys
+        sampled_actions_keys = [rnd.choice(actions_keys) for _ in range(calls)]
+
+        def action_hotkeys_by_key():
+            for action_key in sampled_actions_keys:
+                hk_storage.action_hotkeys_by_key(action_key)
+
+        results.append(_measure('action_hotkeys_by_key', actions_count, action_hotkeys_by_key, repeat, calls))
+
+        write_synthetic_learning_results_file(lrnres_file_path, actions_keys, rnd)
+
+        def load_learning_results_storage():
+            return vhkt.filestorage.FileLearningResultsStorage(lrnres_file_path, hk_storage)
+
+        results.append(_measure('learning_results_storage_load', actions_count, load_learning_results_storage, repeat))
+        learning_results_storage = load_learning_results_storage()
+        results.append(_measure('learning_results_storage_save', actions_count, learning_results_storage.save, repeat))
+
+        def random_nonlearned_action_key():
+            for _ in range(calls):
+                learning_results_storage.random_nonlearned_action_key
+
+        results.append(_measure('random_nonlearned_action_key', actions_count, random_nonlearned_action_key, repeat, calls))
+
+        def all_actions_learned_successfully():
+            for _ in range(calls):
+                learning_results_storage.all_actions_learned_successfully
+
+        results.append(_measure('all_actions_learned_successfully',
+                                actions_count,
+                                all_actions_learned_successfully,
+                                repeat,
+                                calls))
+        tutor = SimpleTextTutor(hk_storage, learning_results_storage)
+
+        def learning_stats():
+            for _ in range(calls):
+                tutor.learning_stats
+
+        results.append(_measure('learning_stats', actions_count, learning_stats, repeat, calls))
+    return results
+
+
+def _traced(build):
+    # Memory taken by built objects, allocations freed during building are not counted
+    tracemalloc.start()
+    try:
+        built = build()
+        return tracemalloc.get_traced_memory()[0], built
+    finally:
+        tracemalloc.stop()
+
+
+def _hk_actions_dicts(actions_data):
+    # Layout in which hot keys storage kept actions before records were added
+    for action in actions_data.values():
+        action.setdefault('type', 'hotkey')
+        action['hotkeys'] = tuple(Hotkey.parse(hotkey) for hotkey in action['hotkeys'])
+    hotkeys_sets = {action_key: frozenset(action['hotkeys']) for action_key, action in actions_data.items()}
+    return actions_data, hotkeys_sets
+
+
+def memory_benchmark(actions_count: int, seed: int = 0) -> List[MemoryResult]:
+    # Should be run in fresh process, interned strings left from previous runs make results inexact
+    rnd = random.Random(seed)
+    json_format = FORMATS['.json']
+    hk_raw_data = json_format.dump(synthetic_hotkeys_data(actions_count, rnd))
+    actions_keys = list(json_format.load(hk_raw_data)['actions'])
+    lrnres_raw_data = json_format.dump(synthetic_learning_results_data(actions_keys, rnd))
+    # Interned hot keys are shared by all storages, so they are created before measurements
+    _hk_actions_dicts(json_format.load(hk_raw_data)['actions'])
+    hk_dicts_bytes, _ = _traced(lambda: _hk_actions_dicts(json_format.load(hk_raw_data)['actions']))
+    hk_records_bytes, hk_records = _traced(lambda: actions_from_dicts(json_format.load(hk_raw_data)['actions']))
+    # Hot keys storage is loaded first and stays in memory, learning results records share its actions keys
+    lrnres_dicts_bytes, _ = _traced(lambda: json_format.load(lrnres_raw_data)['actions'])
+    lrnres_records_bytes, _ = _traced(lambda: progresses_from_dicts(json_format.load(lrnres_raw_data)['actions']))
+    return [
+        MemoryResult('hk_storage_actions', actions_count, hk_dicts_bytes, hk_records_bytes),
+        MemoryResult('learning_results_storage_actions', actions_count, lrnres_dicts_bytes, lrnres_records_bytes),
+    ]
+
+
+def results_to_json(results: List[BenchmarkResult]) -> dict:
+    return {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'python': platform.python_version(),
+        'results': [result._asdict() for result in results],
+    }
+
+
+def results_from_json(data: dict) -> List[BenchmarkResult]:
+    if data.get('format_version') != RESULTS_FORMAT_VERSION:
+        raise ValueError(f'Unsupported benchmark results format version "{data.get("format_version")}"')
+    return [BenchmarkResult(**result) for result in data['results']]
+
+
+def compare(baseline: List[BenchmarkResult],
+            results: List[BenchmarkResult],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[Regression]:
+    # Cases missing in baseline are not compared
+    baseline_seconds: Dict[tuple, float] = {
+        (result.case, result.actions_count): result.best_seconds
+        for result in baseline
+    }
+    regressions = []
+    for result in results:
+        seconds = baseline_seconds.get((result.case, result.actions_count))
+        if seconds is not None and result.best_seconds > seconds * (1 + tolerance):
+            regressions.append(Regression(result.case, result.actions_count, seconds, result.best_seconds))
+    return regressions
+
+
+def _format_seconds(seconds):
+    for unit, multiplier in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * multiplier >= 1:
+            return f'{seconds * multiplier:.3f} {unit}'
+    return f'{seconds * 1e9:.1f} ns'
+
+
+def print_results(results: List[BenchmarkResult], fout=sys.stdout):
+    case_width = max(len(result.case) for result in results)
+    print('case'.ljust(case_width) + 'actions'.rjust(10) + 'best'.rjust(14) + 'median'.rjust(14), file=fout)
+    for result in results:
+        print(result.case.ljust(case_width)
+              + str(result.actions_count).rjust(10)
+              + _format_seconds(result.best_seconds).rjust(14)
+              + _format_seconds(result.median_seconds).rjust(14),
+              file=fout)
+
+
+def print_memory_results(results: List[MemoryResult], fout=sys.stdout):
+    case_width = max(len(result.case) for result in results)
+    print('case'.ljust(case_width) + 'actions'.rjust(10) + 'dicts'.rjust(14) + 'records'.rjust(14) + 'ratio'.rjust(8),
+          file=fout)
+    for result in results:
+        print(result.case.ljust(case_width)
+              + str(result.actions_count).rjust(10)
+              + f'{result.dicts_bytes / 1024:.1f} KiB'.rjust(14)
+              + f'{result.records_bytes / 1024:.1f} KiB'.rjust(14)
+              + f'{result.ratio:.2f}'.rjust(8),
+              file=fout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hot keys and learning results storages benchmark')
+    parser.add_argument('--actions-counts',
+                        type=int,
+                        nargs='+',
+                        default=[1000, 10000],
+                        help='Sizes of synthetic storages to run benchmark with, loading YAML storages with 100000 and more actions takes minutes')
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=3,
+                        help='Number of measurements of each operation, best one is reported')
+    parser.add_argument('--calls',
+                        type=int,
+                        default=10000,
+                        help='Number of calls of cheap operations in each measurement')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0)
+    parser.add_argument('--output',
+                        help='Path to JSON file to write results to')
+    parser.add_argument('--compare',
+                        metavar='BASELINE_FILE',
+                        help='Path to JSON file with results of previous run, exit status is 1 if any operation is slower than in it more than by tolerance')
+    parser.add_argument('--tolerance',
+                        type=float,
+                        default=DEFAULT_TOLERANCE,
+                        help='Relative slowdown reported as regression')
+    parser.add_argument('--memory',
+                        action='store_true',
+                        help='Also compare memory taken by storages actions records and by nested dicts')
+    args = parser.parse_args(argv)
+    results = []
+    for actions_count in args.actions_counts:
+        results += benchmark(actions_count, args.repeat, args.calls, args.seed)
+    print_results(results)
+    if args.memory:
+        memory_results = []
+        for actions_count in args.actions_counts:
+            memory_results += memory_benchmark(actions_count, args.seed)
+        print()
+        print_memory_results(memory_results)
+    if args.output:
+        with open(args.output, 'w') as fout:
+            json.dump(results_to_json(results), fout, indent=1)
+    if args.compare:
+        with open(args.compare, 'r') as fin:
+            baseline = results_from_json(json.load(fin))
+        regressions = compare(baseline, results, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION: {regression.case} with {regression.actions_count} action(s) is {regression.ratio:.2f} times slower, '
+                  f'{_format_seconds(regression.baseline_seconds)} -> {_format_seconds(regression.seconds)}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
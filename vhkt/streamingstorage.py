@@ -0,0 +1,180 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+from array import array
+from typing import Dict, List, Tuple
+
+import yaml
+
+from vhkt.basic import BasicHotKeysStorage
+from vhkt.formats import YamlFormat
+from vhkt.keycombo import Hotkey
+from vhkt.records import intern_key_combination_type
+from vhkt.timing import timed
+
+YAML_LOADER = YamlFormat.loader()
+
+
+class _LinesOffsets:
+
+    # Byte offsets of lines of file which is read forward only, so requested lines numbers should not decrease
+
+    def __init__(self, fin):
+        self._fin = fin
+        self._line = 0
+        self._offset = 0
+
+    def offset(self, line):
+        while self._line < line:
+            data = self._fin.readline()
+            if not data:
+                break
+            self._offset += len(data)
+            self._line += 1
+        return self._offset
+
+
+class StreamingFileHotKeysStorage(BasicHotKeysStorage):
+
+    # Hot keys storage for very large YAML files. File is parsed once as stream of events to find application name,
+    # actions keys and types and byte ranges of actions in file, action description and hot keys are read from file
+    # and parsed only when action is used, so memory is proportional to number of used actions.
+    # Each action should start on its own line, i.e. "actions" mapping should be in block style
+
+    hkdb_file_path: str = None
+
+    def __init__(self, hkdb_file_path: str):
+        self.hkdb_file_path = hkdb_file_path
+        self._app_name = None
+        self._actions_keys: List[str] = []
+        self._actions_indexes: Dict[str, int] = {}
+        # Start offset of each action and end offset of last one
+        self._offsets = array('Q')
+        self._types: List[object] = []
+        self._types_interned: Dict[object, object] = {}
+        self._actions: Dict[str, Tuple[str, Tuple[Hotkey, ...], frozenset]] = {}
+        self._index()
+
+    @timed('hk_storage_load')
+    def _index(self):
+        with open(self.hkdb_file_path, 'rb') as fin, open(self.hkdb_file_path, 'rb') as lines_fin:
+            lines_offsets = _LinesOffsets(lines_fin)
+            events = iter(yaml.parse(fin, Loader=YAML_LOADER))
+            for event_class in (yaml.StreamStartEvent, yaml.DocumentStartEvent, yaml.MappingStartEvent):
+                self._expect(next(events), event_class)
+            while True:
+                event = next(events)
+                if isinstance(event, yaml.MappingEndEvent):
+                    break
+                self._expect(event, yaml.ScalarEvent)
+                if event.value == 'app':
+                    self._app_name = self._expect(next(events), yaml.ScalarEvent).value
+                elif event.value == 'actions':
+                    self._index_actions(events, lines_offsets)
+                else:
+                    self._skip_node(next(events), events)
+        if self._app_name is None:
+            raise ValueError(f'Application name not found in "{self.hkdb_file_path}"')
+
+    def _index_actions(self, events, lines_offsets):
+        event = self._expect(next(events), yaml.MappingStartEvent)
+        if event.flow_style:
+            raise ValueError(f'Actions in "{self.hkdb_file_path}" should be in block style to be loaded by streaming')
+        prev_line = -1
+        while True:
+            event = next(events)
+            if isinstance(event, yaml.MappingEndEvent):
+                # Block mapping ends at start of next token, which is at line start if there is one
+                end_line = event.end_mark.line if event.end_mark.column == 0 else event.end_mark.line + 1
+                self._offsets.append(lines_offsets.offset(end_line))
+                return
+            self._expect(event, yaml.ScalarEvent)
+            if event.start_mark.line == prev_line:
+                raise ValueError(f'Each action in "{self.hkdb_file_path}" should start on separate line, line {event.start_mark.line + 1}')
+            prev_line = event.start_mark.line
+            if event.value in self._actions_indexes:
+                raise ValueError(f'Duplicate action "{event.value}" in "{self.hkdb_file_path}"')
+            self._actions_indexes[event.value] = len(self._actions_keys)
+            self._actions_keys.append(event.value)
+            self._offsets.append(lines_offsets.offset(event.start_mark.line))
+            self._types.append(self._index_action_type(events))
+
+    def _index_action_type(self, events):
+        self._expect(next(events), yaml.MappingStartEvent)
+        key_combination_type = 'hotkey'
+        while True:
+            event = next(events)
+            if isinstance(event, yaml.MappingEndEvent):
+                break
+            self._expect(event, yaml.ScalarEvent)
+            value_event = next(events)
+            if event.value != 'type':
+                self._skip_node(value_event, events)
+            elif isinstance(value_event, yaml.ScalarEvent):
+                key_combination_type = value_event.value
+            else:
+                self._expect(value_event, yaml.SequenceStartEvent)
+                types = []
+                for event in events:
+                    if isinstance(event, yaml.SequenceEndEvent):
+                        break
+                    types.append(self._expect(event, yaml.ScalarEvent).value)
+                key_combination_type = types
+        return intern_key_combination_type(key_combination_type, self._types_interned)
+
+    def _expect(self, event, event_class):
+        if not isinstance(event, event_class):
+            raise ValueError(f'Unexpected {type(event).__name__} at line {event.start_mark.line + 1} of "{self.hkdb_file_path}", {event_class.__name__} expected')
+        return event
+
+    @staticmethod
+    def _skip_node(event, events):
+        depth = 0
+        while True:
+            if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                depth -= 1
+            if depth == 0:
+                return
+            event = next(events)
+
+    def _action(self, key):
+        action = self._actions.get(key)
+        if action is not None:
+            return action
+        action_i = self._actions_indexes[key]
+        with open(self.hkdb_file_path, 'rb') as fin:
+            fin.seek(self._offsets[action_i])
+            raw_data = fin.read(self._offsets[action_i + 1] - self._offsets[action_i])
+        data = yaml.load(raw_data, Loader=YAML_LOADER)
+        if not isinstance(data, dict) or [str(k) for k in data.keys()] != [key]:
+            raise ValueError(f'Could not read action "{key}" from "{self.hkdb_file_path}", file changed after loading?')
+        hotkeys = tuple(Hotkey.parse(hotkey) for hotkey in data[key]['hotkeys'])
+        action = (data[key]['description'], hotkeys, frozenset(hotkeys))
+        self._actions[key] = action
+        return action
+
+    @property
+    def loaded_actions_count(self) -> int:
+        return len(self._actions)
+
+    @property
+    def actions_keys(self):
+        return list(self._actions_keys)
+
+    @property
+    def app_name(self):
+        return self._app_name
+
+    def action_description_by_key(self, key):
+        return self._action(key)[0]
+
+    def key_combination_type_by_key(self, key):
+        return self._types[self._actions_indexes[key]]
+
+    def action_hotkeys_by_key(self, key):
+        return self._action(key)[1]
+
+    def action_has_hotkey(self, key, hotkey):
+        return hotkey in self._action(key)[2]
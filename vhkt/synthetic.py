@@ -0,0 +1,72 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import random
+import string
+
+import yaml
+
+SYNTHETIC_APP_NAME = 'Synthetic'
+
+# Part of synthetic actions which are commands, the rest are hot keys
+COMMANDS_FRACTION = 0.1
+
+
+def synthetic_hotkeys_data(actions_count: int, rnd=random) -> dict:
+    # Hot keys storage data of given size for benchmarks, with same structure as real hot keys files
+    actions = {}
+    for action_i in range(actions_count):
+        if rnd.random() < COMMANDS_FRACTION:
+            actions[f'command_{action_i}'] = {
+                'description': f'Synthetic command {action_i}',
+                'type': 'command',
+                'hotkeys': [f':command{action_i}'],
+            }
+        else:
+            hotkeys = []
+            for _ in range(rnd.randint(1, 2)):
+                modifiers = rnd.choice(('', 'Ctrl+', 'Alt+', 'Ctrl+Shift+'))
+                keys = ''.join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(1, 2)))
+                hotkeys.append(f'{modifiers}{keys[0]}' if modifiers else keys)
+            actions[f'action_{action_i}'] = {
+                'description': f'Synthetic action {action_i}',
+                'type': 'hotkey',
+                'hotkeys': hotkeys,
+            }
+    return {
+        'app': SYNTHETIC_APP_NAME,
+        'actions': actions,
+    }
+
+
+def write_synthetic_hotkeys_file(hkdb_file_path, actions_count: int, rnd=random):
+    with open(hkdb_file_path, 'w') as fout:
+        yaml.safe_dump(synthetic_hotkeys_data(actions_count, rnd), fout, sort_keys=False)
+
+
+def synthetic_learning_results_data(actions_keys, rnd=random, answered_fraction: float = 0.5) -> dict:
+    # Learning results with same structure as written by FileLearningResultsStorage, part of actions is answered
+    # and some of answered ones are learned or skipped
+    actions = {}
+    for action_key in actions_keys:
+        if rnd.random() >= answered_fraction:
+            actions[action_key] = {}
+            continue
+        correct_guesses = rnd.randint(0, 3)
+        error_guesses = rnd.randint(0, 3)
+        action = {
+            'guesses': correct_guesses + error_guesses,
+            'correct_guesses': correct_guesses,
+            'error_guesses': error_guesses,
+        }
+        if correct_guesses >= 3:
+            action['success'] = True
+        elif rnd.random() < 0.05:
+            action['skip'] = True
+        actions[action_key] = action
+    return {'actions': actions}
+
+
+def write_synthetic_learning_results_file(lrnres_file_path, actions_keys, rnd=random):
+    with open(lrnres_file_path, 'w') as fout:
+        yaml.safe_dump(synthetic_learning_results_data(actions_keys, rnd), fout)
@@ -0,0 +1,108 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import bisect
+import contextlib
+import functools
+import threading
+import time
+from typing import Dict, List
+
+# Upper bounds of histogram buckets in seconds, last bucket is for longer durations
+HISTOGRAM_BOUNDS = (0.0001, 0.001, 0.01, 0.1, 1.0)
+
+
+def _bound_label(seconds):
+    return f'<{seconds * 1000:g}ms'
+
+
+HISTOGRAM_LABELS = tuple(_bound_label(bound) for bound in HISTOGRAM_BOUNDS) + (f'>={HISTOGRAM_BOUNDS[-1] * 1000:g}ms',)
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank method
+    index = max(0, -(-len(sorted_values) * p // 100) - 1)
+    return sorted_values[int(index)]
+
+
+class Timer:
+
+    # Durations of one named operation, only aggregates are kept so it could be used for whole session
+
+    __slots__ = ('count', 'total_seconds', 'max_seconds', 'last_seconds', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self.histogram: List[int] = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_seconds = seconds
+        self.histogram[bisect.bisect_right(HISTOGRAM_BOUNDS, seconds)] += 1
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_seconds * 1000, 3),
+            'mean_ms': round(self.total_seconds / self.count * 1000, 3) if self.count else 0,
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'histogram': dict(zip(HISTOGRAM_LABELS, self.histogram)),
+        }
+
+
+class Timings:
+
+    # Named timers, operations may be timed from any thread, e.g. background writer saves
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._timers: Dict[str, Timer] = {}
+
+    def add(self, name, seconds):
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = Timer()
+            timer.add(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.add(name, self._clock() - started)
+
+    def timed(self, name):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = self._clock()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add(name, self._clock() - started)
+            return wrapper
+        return decorator
+
+    def get(self, name) -> Timer:
+        return self._timers.get(name)
+
+    def clear(self):
+        with self._lock:
+            self._timers.clear()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {name: timer.summary() for name, timer in sorted(self._timers.items())}
+
+
+# Always enabled timings of whole application, timing operation costs about a microsecond
+timings = Timings()
+timed = timings.timed
@@ -0,0 +1,154 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+# Measures time spent by curses TUI on each key press with synthetic hot keys storages of given sizes, e.g.
+# python3 -m vhkt.tuibenchmark --actions-counts 100 10000 --keys-count 1000
+
+import argparse
+import json
+import random
+import string
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+import vhkt.basic
+import vhkt.filestorage
+from vhkt.cursestui import CursesTuiTutor, InterfaceState
+from vhkt.headless import KEYS_CODES, HeadlessTuiDriver
+from vhkt.synthetic import write_synthetic_hotkeys_file
+from vhkt.timing import percentile
+
+PERCENTILES = (50, 95, 99)
+
+# Probabilities of asking help and skipping action instead of answering question
+HELP_PROBABILITY = 0.05
+SKIP_PROBABILITY = 0.02
+
+
+def random_user(keys_count: int, options_count: int, answer_mode, rnd=random):
+    # Returns callable choosing next key for tutor like user answering randomly would do
+    keys_left = keys_count
+
+    def choose_key(tutor):
+        nonlocal keys_left
+        if keys_left <= 0:
+            return None
+        keys_left -= 1
+        state = tutor.interface_state
+        if state == InterfaceState.ANSWER_INPUT:
+            p = rnd.random()
+            if p < HELP_PROBABILITY:
+                return KEYS_CODES['ctrl+h']
+            elif p < HELP_PROBABILITY + SKIP_PROBABILITY:
+                return KEYS_CODES['ctrl+k']
+            elif answer_mode == vhkt.basic.AnswerMode.SELECT:
+                return ord(str(rnd.randint(1, options_count)))
+            elif p < 0.5:
+                return KEYS_CODES['enter']
+            else:
+                return ord(rnd.choice(string.ascii_lowercase))
+        elif state == InterfaceState.CHECKING_IF_HELP_IS_NEEDED:
+            return ord(rnd.choice('yn'))
+        else:
+            return KEYS_CODES['enter']
+
+    return choose_key
+
+
+def benchmark(actions_count: int,
+              keys_count: int,
+              answer_mode=vhkt.basic.AnswerMode.SELECT,
+              options_count: int = CursesTuiTutor.DEFAULT_OPTIONS_COUNT,
+              save_interval: float = None,
+              seed: int = 0) -> dict:
+    rnd = random.Random(seed)
+    with tempfile.TemporaryDirectory() as dir_path:
+        hkdb_file_path = Path(dir_path) / 'hotkeys.yaml'
+        write_synthetic_hotkeys_file(hkdb_file_path, actions_count, rnd)
+        hk_storage = vhkt.filestorage.FileHotKeysStorage(hkdb_file_path, use_cache=False)
+        learning_results_storage = vhkt.filestorage.FileLearningResultsStorage(Path(dir_path) / 'results.yaml',
+                                                                               hk_storage,
+                                                                               save_interval=save_interval)
+        driver = HeadlessTuiDriver(hk_storage, learning_results_storage, answer_mode, options_count=options_count)
+        try:
+            transitions = driver.play(random_user(keys_count, options_count, answer_mode, rnd))
+        finally:
+            learning_results_storage.close()
+    seconds_by_transition = defaultdict(list)
+    for transition in transitions:
+        seconds_by_transition[f'{transition.from_state.value} -> {transition.to_state.value}'].append(transition.seconds)
+        seconds_by_transition['all'].append(transition.seconds)
+    results = {}
+    for transition_name, seconds in seconds_by_transition.items():
+        seconds.sort()
+        results[transition_name] = {'count': len(seconds)}
+        for p in PERCENTILES:
+            results[transition_name][f'p{p}_ms'] = round(percentile(seconds, p) * 1000, 3)
+    return {
+        'actions_count': actions_count,
+        'keys_count': keys_count,
+        'answer_mode': answer_mode.value,
+        'transitions': results,
+    }
+
+
+def print_report(report, fout=sys.stdout):
+    print(f'{report["actions_count"]} action(s), {report["keys_count"]} key(s), "{report["answer_mode"]}" answer mode',
+          file=fout)
+    columns = ['count'] + [f'p{p}_ms' for p in PERCENTILES]
+    name_width = max(len(name) for name in report['transitions'])
+    print('  ' + 'transition'.ljust(name_width) + ''.join(column.rjust(12) for column in columns), file=fout)
+    for name, stats in sorted(report['transitions'].items()):
+        print('  ' + name.ljust(name_width) + ''.join(str(stats[column]).rjust(12) for column in columns),
+              file=fout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Curses TUI per key latency benchmark')
+    parser.add_argument('--actions-counts',
+                        type=int,
+                        nargs='+',
+                        default=[100, 1000, 10000],
+                        help='Sizes of synthetic hot keys storages to run benchmark with')
+    parser.add_argument('--keys-count',
+                        type=int,
+                        default=500,
+                        help='Number of keys to press in each run')
+    parser.add_argument('-a',
+                        '--answer-mode',
+                        choices=[m.value for m in vhkt.basic.AnswerMode],
+                        default=vhkt.basic.AnswerMode.SELECT.value)
+    parser.add_argument('-o',
+                        '--options-count',
+                        type=int,
+                        default=CursesTuiTutor.DEFAULT_OPTIONS_COUNT)
+    parser.add_argument('--save-interval',
+                        type=float,
+                        help='Save learning results in background not more often than once per this number of seconds, by default they are saved synchronously after each answer')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0)
+    parser.add_argument('--json',
+                        action='store_true',
+                        help='Print results as JSON')
+    args = parser.parse_args(argv)
+    reports = [
+        benchmark(actions_count,
+                  args.keys_count,
+                  vhkt.basic.AnswerMode(args.answer_mode),
+                  args.options_count,
+                  args.save_interval,
+                  args.seed)
+        for actions_count in args.actions_counts
+    ]
+    if args.json:
+        print(json.dumps(reports, indent=1))
+    else:
+        for report in reports:
+            print_report(report)
+
+
+if __name__ == '__main__':
+    main()
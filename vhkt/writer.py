@@ -0,0 +1,126 @@
+# Copyleft GPLv3 or later
+# 2020 Dmitriy Vinokurov gim6626@gmail.com
+
+import atexit
+import functools
+import os
+import tempfile
+import threading
+import time
+from typing import Union
+
+
+def write_file_atomically(file_path, data: Union[str, bytes]):
+    # Readers see either old or new file content, never truncated one, even if app or OS crashes during write
+    dir_path = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_file_path = tempfile.mkstemp(dir=dir_path, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as fout:
+            fout.write(data)
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(tmp_file_path, file_path)
+    except BaseException:
+        os.unlink(tmp_file_path)
+        raise
+    fsync_dir(dir_path)
+
+
+def fsync_dir(dir_path):
+    try:
+        dir_fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        # Directories could not be opened on some platforms, e.g. Windows
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def synchronized(method):
+    # Runs method under "_lock" of object, which guards data serialized by background writer
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class BackgroundWriter:
+
+    # Calls "write" in background thread after "request", bursts of requests are coalesced
+    # into at most one write per "interval" seconds
+
+    def __init__(self, write, interval: float):
+        self._write = write
+        self._interval = interval
+        self._condition = threading.Condition()
+        self._pending = False
+        self._writing = False
+        self._closed = False
+        self._flush_waiters = 0
+        self._last_write_time = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='vhkt-background-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def request(self):
+        with self._condition:
+            if self._closed:
+                raise ValueError('Background writer is closed')
+            self._pending = True
+            self._condition.notify_all()
+
+    def flush(self):
+        with self._condition:
+            self._flush_waiters += 1
+            self._condition.notify_all()
+            try:
+                while self._pending or self._writing:
+                    self._condition.wait()
+            finally:
+                self._flush_waiters -= 1
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        if self._closed:
+            return
+        atexit.unregister(self.close)
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                while not self._closed and self._flush_waiters == 0 and self._last_write_time is not None:
+                    delay = self._last_write_time + self._interval - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                self._pending = False
+                self._writing = True
+            try:
+                self._write()
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._last_write_time = time.monotonic()
+                    self._condition.notify_all()